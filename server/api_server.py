@@ -3,21 +3,37 @@ FastAPI server for the Hackathon Chat Agent.
 """
 
 import uuid
-from typing import Dict
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, Literal, Optional
 import os
 from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from hackathon_agent import HackathonChatAgent
 from outreach_service import OutreachService
-from helper.embeddings import create_vector_embeddings
-from helper.rag_agent import create_rag_agent
+from helper.ingest_jobs import ingest_queue
+from helper.rag_registry import rag_registry
+from helper.rag_cache import rag_cache_stats
+from helper.embedding_cache import get_embedding_cache
+from helper.rag_agent import RAG_LLM_MODEL
+from metrics import StreamTimer, latency, latency_stats
+from concurrency import limited_stream, model_limiter, limiter_stats
+from session_store import create_session_store
+from campaign_jobs import CampaignManager, CampaignStore
+from campaign_jobs import DEFAULT_DB_PATH as DEFAULT_CAMPAIGN_DB_PATH
+from log_config import configure_logging
 
 # Load environment variables from .env file
 load_dotenv()
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="Hackathon Chat API", version="1.0.0")
 
 # Add CORS middleware to allow frontend connections
@@ -32,18 +48,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store chat sessions in memory (in production, use a proper database)
-chat_sessions: Dict[str, HackathonChatAgent] = {}
+# Chat sessions, bounded by count and idle time (backend chosen by SESSION_BACKEND)
+chat_sessions = create_session_store(HackathonChatAgent.from_state)
 
 # Initialize outreach service
 outreach_service = OutreachService()
 
+# Persisted outreach campaigns, run in the background
+campaign_manager = CampaignManager(
+    outreach_service,
+    CampaignStore(os.getenv("CAMPAIGN_DB_PATH", DEFAULT_CAMPAIGN_DB_PATH)),
+)
+
 
 class ChatMessage(BaseModel):
     """Chat message model."""
 
     message: str
     session_id: str = None
+    # RAG only: override the retriever's mode and number of chunks
+    retrieval_mode: Optional[Literal["hybrid", "dense", "keyword"]] = None
+    retrieval_k: Optional[int] = Field(default=None, ge=1, le=20)
+
+
+def _retrieval_config(chat_message: ChatMessage) -> Dict:
+    """Per-request retriever settings for the RAG chain."""
+    configurable = {}
+    if chat_message.retrieval_mode is not None:
+        configurable["retrieval_mode"] = chat_message.retrieval_mode
+    if chat_message.retrieval_k is not None:
+        configurable["retrieval_k"] = chat_message.retrieval_k
+    return {"configurable": configurable}
 
 
 class ChatResponse(BaseModel):
@@ -57,6 +92,8 @@ class OutreachResponse(BaseModel):
     """Outreach campaign response model."""
 
     success: bool
+    campaign_id: str = None
+    status: str = None
     summary: Dict = None
     results: list = None
     error: str = None
@@ -80,15 +117,15 @@ class SMTPConfigResponse(BaseModel):
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(chat_message: ChatMessage):
     """Handle chat messages and return agent responses."""
+    started = time.perf_counter()
     try:
         session_id = chat_message.session_id
 
         # Create new session if none exists or session not found
-        if not session_id or session_id not in chat_sessions:
+        agent = chat_sessions.get(session_id) if session_id else None
+        if agent is None:
             session_id = str(uuid.uuid4())
-            chat_sessions[session_id] = HackathonChatAgent()
-
-        agent = chat_sessions[session_id]
+            agent = HackathonChatAgent()
 
         # Get response from agent
         if chat_message.message.lower().strip() in ["hi", "hello", "start"]:
@@ -96,31 +133,81 @@ async def chat_endpoint(chat_message: ChatMessage):
             response = agent.get_welcome_message()
         elif chat_message.message.lower().strip() == "summary":
             # Handle summary request
-            response = agent.get_hackathon_summary()
+            response = await agent.aget_hackathon_summary()
         else:
             # Regular chat
-            response = agent.chat(chat_message.message)
+            response = await agent.achat(chat_message.message)
 
+        # Persist the updated conversation
+        chat_sessions.put(session_id, agent)
+
+        latency("chat.total").record(time.perf_counter() - started)
         return ChatResponse(response=response, session_id=session_id)
 
     except Exception as e:
+        logger.exception("Error processing chat")
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 
+def _sse(payload: Dict) -> str:
+    """Format a payload as a server-sent event."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(chat_message: ChatMessage):
+    """Handle chat messages and stream the agent response as server-sent events."""
+    session_id = chat_message.session_id
+
+    # Create new session if none exists or session not found
+    agent = chat_sessions.get(session_id) if session_id else None
+    if agent is None:
+        session_id = str(uuid.uuid4())
+        agent = HackathonChatAgent()
+    message = chat_message.message.lower().strip()
+
+    async def event_stream():
+        timer = StreamTimer("chat_stream")
+        try:
+            if message in ["hi", "hello", "start"]:
+                timer.mark_first_byte()
+                yield _sse({"token": agent.get_welcome_message()})
+            else:
+                if message == "summary":
+                    tokens = agent.astream_hackathon_summary()
+                else:
+                    tokens = agent.astream_chat(chat_message.message)
+                async for token in tokens:
+                    timer.mark_first_byte()
+                    yield _sse({"token": token})
+
+            # Persist the updated conversation
+            chat_sessions.put(session_id, agent)
+            yield _sse({"done": True, "session_id": session_id})
+        except Exception as e:
+            logger.exception("Error processing chat")
+            yield _sse({"error": f"Error processing chat: {str(e)}"})
+        finally:
+            timer.finish()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/api/chat/new", response_model=ChatResponse)
 async def new_chat_session():
     """Start a new chat session."""
     try:
         session_id = str(uuid.uuid4())
         agent = HackathonChatAgent()
-        chat_sessions[session_id] = agent
 
         # Get welcome message
         welcome = agent.get_welcome_message()
+        chat_sessions.put(session_id, agent)
 
         return ChatResponse(response=welcome, session_id=session_id)
 
     except Exception as e:
+        logger.exception("Error creating new session")
         raise HTTPException(
             status_code=500, detail=f"Error creating new session: {str(e)}"
         )
@@ -129,38 +216,97 @@ async def new_chat_session():
 @app.get("/api/chat/{session_id}/summary")
 async def get_summary(session_id: str):
     """Get hackathon summary for a session."""
-    if session_id not in chat_sessions:
+    agent = chat_sessions.get(session_id)
+    if agent is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
     try:
-        agent = chat_sessions[session_id]
-        summary = agent.get_hackathon_summary()
+        summary = await agent.aget_hackathon_summary()
+        chat_sessions.put(session_id, agent)
         return {"summary": summary}
 
     except Exception as e:
+        logger.exception("Error getting summary")
         raise HTTPException(status_code=500, detail=f"Error getting summary: {str(e)}")
 
 
+@app.on_event("startup")
+async def resume_campaigns():
+    """Resume outreach campaigns interrupted by a restart."""
+    campaign_manager.resume_interrupted()
+
+
 @app.post("/api/outreach/upload-csv", response_model=OutreachResponse)
-async def upload_csv(file: UploadFile = File(...)):
-    """Upload and process CSV file for outreach campaign."""
+async def upload_csv(file: UploadFile = File(...), background: bool = False):
+    """Upload a CSV and run it as a persisted outreach campaign.
+
+    With ``background=true`` the campaign id is returned immediately and
+    progress can be polled; otherwise the request waits for the campaign to
+    finish. Either way the campaign keeps running if the client disconnects.
+    """
     try:
         if not file.filename.endswith(".csv"):
             raise HTTPException(status_code=400, detail="File must be a CSV")
 
-        # Read CSV content
-        csv_content = await file.read()
-        csv_text = csv_content.decode("utf-8")
-
-        # Process outreach campaign
-        result = outreach_service.process_outreach_campaign(csv_text)
-
-        return OutreachResponse(**result)
+        # Start (or resume) the campaign for this CSV; the upload is streamed
+        # from its spooled file in chunks rather than read into memory
+        try:
+            campaign_id = await campaign_manager.start(file.file)
+        except ValueError as e:
+            return OutreachResponse(success=False, error=str(e))
+
+        if not background:
+            await campaign_manager.wait(campaign_id)
+
+        campaign = campaign_manager.store.get_campaign(campaign_id)
+        return OutreachResponse(
+            success=campaign["status"] != "failed",
+            campaign_id=campaign_id,
+            status=campaign["status"],
+            summary=campaign["summary"],
+            results=None if background else campaign_manager.store.results(campaign_id),
+            error=campaign["error"],
+        )
 
+    except HTTPException:
+        raise
     except Exception as e:
+        logger.exception("Error processing CSV")
         raise HTTPException(status_code=500, detail=f"Error processing CSV: {str(e)}")
 
 
+def _get_campaign_or_404(campaign_id: str) -> Dict:
+    campaign = campaign_manager.store.get_campaign(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    return campaign
+
+
+@app.get("/api/outreach/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str, include_results: bool = False):
+    """Get progress of an outreach campaign."""
+    campaign = _get_campaign_or_404(campaign_id)
+    if include_results:
+        campaign["results"] = campaign_manager.store.results(campaign_id)
+    return campaign
+
+
+@app.post("/api/outreach/campaigns/{campaign_id}/cancel")
+async def cancel_campaign(campaign_id: str):
+    """Cancel a running outreach campaign; unsent contacts remain pending."""
+    _get_campaign_or_404(campaign_id)
+    campaign_manager.cancel(campaign_id)
+    return _get_campaign_or_404(campaign_id)
+
+
+@app.post("/api/outreach/campaigns/{campaign_id}/resume")
+async def resume_campaign(campaign_id: str):
+    """Resume a cancelled or interrupted outreach campaign."""
+    _get_campaign_or_404(campaign_id)
+    campaign_manager.resume(campaign_id)
+    return _get_campaign_or_404(campaign_id)
+
+
 @app.get("/api/outreach/sample-csv")
 async def get_sample_csv():
     """Get sample CSV structure for users."""
@@ -168,6 +314,7 @@ async def get_sample_csv():
         sample_csv = outreach_service.get_sample_csv_structure()
         return {"sample_csv": sample_csv}
     except Exception as e:
+        logger.exception("Error getting sample CSV")
         raise HTTPException(
             status_code=500, detail=f"Error getting sample CSV: {str(e)}"
         )
@@ -187,6 +334,7 @@ async def configure_smtp(config: SMTPConfigRequest):
         )
 
     except Exception as e:
+        logger.exception("Failed to configure SMTP")
         return SMTPConfigResponse(
             success=False, error=f"Failed to configure SMTP: {str(e)}"
         )
@@ -210,6 +358,7 @@ async def add_logistics(file: UploadFile = File(...)):
         }
 
     except Exception as e:
+        logger.exception("Error uploading file")
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 
@@ -221,32 +370,49 @@ async def add_wiki(file: UploadFile = File(...)):
         upload_dir = "helper/data"
         os.makedirs(upload_dir, exist_ok=True)
 
-        # Save the uploaded file
+        # Save the uploaded file; write-then-rename so a running ingestion
+        # job never hashes a half-written file
         file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as buffer:
+        tmp_path = os.path.join(upload_dir, f".{file.filename}.part")
+        with open(tmp_path, "wb") as buffer:
             buffer.write(await file.read())
-
-        # Create and save vector embeddings
-        try:
-            vector_store = create_vector_embeddings(data_directory=upload_dir)
-            vector_store.save_local("helper/faiss_index")
-        except Exception as e:
-            import traceback
-            print("Error creating vector embeddings:")
-            traceback.print_exc()
-            raise e
+        os.replace(tmp_path, file_path)
+
+        # Embed in the background; reload the RAG agent once the index changed
+        def on_complete(job):
+            if job.stats.get("changed"):
+                rag_registry.refresh(job.index_path)
+
+        job = ingest_queue.submit(
+            data_directory=upload_dir,
+            index_path="helper/faiss_index",
+            filename=file.filename,
+            on_complete=on_complete,
+        )
 
         return {
-            "message": f"File '{file.filename}' uploaded and processed successfully."
+            "message": f"File '{file.filename}' uploaded and queued for processing.",
+            "job_id": job.job_id,
         }
 
     except Exception as e:
+        logger.exception("Error uploading file")
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 
+@app.get("/api/ingest/{job_id}")
+async def get_ingest_job(job_id: str):
+    """Get progress of a wiki ingestion job."""
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+
 @app.post("/api/rag/chat", response_model=ChatResponse)
 async def rag_chat_endpoint(chat_message: ChatMessage):
     """Handle chat messages using the RAG agent."""
+    started = time.perf_counter()
     try:
         index_path = "helper/faiss_index"
         
@@ -257,24 +423,80 @@ async def rag_chat_endpoint(chat_message: ChatMessage):
                 detail="FAISS index not found. Please upload a wiki document first.",
             )
 
-        # Create RAG agent
-        rag_agent = create_rag_agent(index_path)
+        # Get the cached RAG agent (reloaded automatically if the index changed);
+        # loading an index is blocking disk work, so keep it off the event loop
+        rag_agent = await asyncio.to_thread(rag_registry.get, index_path)
         
-        # Get response from RAG agent
-        response_data = rag_agent.invoke({"input": chat_message.message})
+        # Near-duplicate questions are answered from the cache without
+        # waiting for a model slot
+        config = _retrieval_config(chat_message)
+        response_data = await rag_agent.alookup(chat_message.message, config)
+        if response_data is None:
+            async with model_limiter(RAG_LLM_MODEL):
+                response_data = await rag_agent.aanswer(
+                    {"input": chat_message.message}, config
+                )
         answer = response_data.get("answer", "No answer found.")
         
         # For now, we don't manage RAG sessions, so we create a new session_id each time
         session_id = str(uuid.uuid4())
 
+        latency("rag_chat.total").record(time.perf_counter() - started)
         return ChatResponse(response=answer, session_id=session_id)
         
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
+        logger.exception("Error processing RAG chat")
         raise HTTPException(status_code=500, detail=f"Error processing RAG chat: {str(e)}")
 
 
+@app.post("/api/rag/chat/stream")
+async def rag_chat_stream_endpoint(chat_message: ChatMessage):
+    """Handle chat messages using the RAG agent, streaming the answer as server-sent events."""
+    index_path = "helper/faiss_index"
+
+    # Check if index exists
+    if not os.path.exists(index_path):
+        raise HTTPException(
+            status_code=404,
+            detail="FAISS index not found. Please upload a wiki document first.",
+        )
+
+    try:
+        rag_agent = await asyncio.to_thread(rag_registry.get, index_path)
+    except FileNotFoundError as e:
+        # E.g. an index that still has to be migrated off index.pkl
+        raise HTTPException(status_code=404, detail=str(e))
+    session_id = str(uuid.uuid4())
+
+    async def event_stream():
+        timer = StreamTimer("rag_chat_stream")
+        try:
+            config = _retrieval_config(chat_message)
+            cached = await rag_agent.alookup(chat_message.message, config)
+            if cached is not None:
+                timer.mark_first_byte()
+                yield _sse({"token": cached["answer"]})
+            else:
+                # The retrieval chain streams partial dicts; only "answer" carries tokens
+                inputs = {"input": chat_message.message}
+                stream = rag_agent.astream_answer(inputs, config)
+                async for chunk in limited_stream(RAG_LLM_MODEL, stream):
+                    token = chunk.get("answer")
+                    if token:
+                        timer.mark_first_byte()
+                        yield _sse({"token": token})
+            yield _sse({"done": True, "session_id": session_id})
+        except Exception as e:
+            logger.exception("Error processing RAG chat")
+            yield _sse({"error": f"Error processing RAG chat: {str(e)}"})
+        finally:
+            timer.finish()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/get_wiki")
 async def get_wiki():
     """Return the first PDF wiki document found."""
@@ -295,11 +517,30 @@ async def get_wiki():
         raise HTTPException(status_code=404, detail="No wiki PDF found.")
 
     except Exception as e:
+        logger.exception("Error retrieving wiki")
         raise HTTPException(
             status_code=500, detail=f"Error retrieving wiki: {str(e)}"
         )
 
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Return cache and performance counters."""
+    return {
+        "rag_agents": rag_registry.stats(),
+        "rag_cache": rag_cache_stats(),
+        "embedding_cache": get_embedding_cache().stats(),
+        "latency": latency_stats(),
+        "model_limiters": limiter_stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "email_cache": outreach_service.email_cache.stats(),
+        "email_generation": outreach_service.generation_stats(),
+        "smtp_pool": (
+            outreach_service.smtp_pool.stats() if outreach_service.smtp_pool else None
+        ),
+    }
+
+
 @app.get("/")
 async def root():
     """Root endpoint."""
@@ -0,0 +1 @@
+"""Offline benchmarks for the server. Run from ``server/`` with ``python -m benchmarks.<name>``."""
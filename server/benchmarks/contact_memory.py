@@ -0,0 +1,103 @@
+"""
+Memory used by 100k parsed contacts in each representation.
+
+Compares the original plain ``@dataclass`` contact, the slotted ``Contact``
+and the columnar ``ContactBatch``. Rows are parsed with the csv module so
+every field is a fresh string, exactly as after an upload.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.contact_memory [--contacts 100000]
+"""
+
+import gc
+import csv
+import random
+import argparse
+import tracemalloc
+from dataclasses import dataclass
+from io import StringIO
+
+from outreach_service import Contact, ContactBatch
+
+ROLES = [
+    "Student",
+    "Software Engineer",
+    "Alumni Judge",
+    "Mentor",
+    "Partnership Manager",
+    "Corporate Sponsor",
+    "Data Scientist",
+    "Product Manager",
+]
+
+
+@dataclass
+class DictContact:
+    """The Contact type before it used __slots__"""
+
+    name: str
+    email: str
+    role: str
+    company: str = ""
+    phone: str = ""
+    notes: str = ""
+
+
+def make_csv(count: int, seed: int = 0) -> str:
+    """Build a synthetic contact list with realistic repetition of roles/companies."""
+    rng = random.Random(seed)
+    companies = [f"Company {i}" for i in range(500)]
+    out = StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["name", "email", "role", "company", "phone", "notes"])
+    for i in range(count):
+        writer.writerow(
+            [
+                f"Person {i}",
+                f"person{i}@example.com",
+                rng.choice(ROLES),
+                rng.choice(companies),
+                f"555-{i % 10000:04d}",
+                f"Interested in topic {rng.randrange(50)}",
+            ]
+        )
+    return out.getvalue()
+
+
+def measure(build, csv_text: str) -> int:
+    """Return the bytes still allocated by ``build(rows)`` after it returns."""
+    gc.collect()
+    tracemalloc.start()
+    rows = csv.DictReader(StringIO(csv_text))
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = build(rows)
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--contacts", type=int, default=100_000)
+    args = parser.parse_args()
+
+    csv_text = make_csv(args.contacts)
+    representations = {
+        "dataclass (before)": lambda rows: [DictContact(**row) for row in rows],
+        "slotted Contact": lambda rows: [Contact(**row) for row in rows],
+        "ContactBatch": lambda rows: ContactBatch(Contact(**row) for row in rows),
+    }
+
+    print(f"{'representation':<22}{'total MiB':>12}{'bytes/contact':>16}")
+    for label, build in representations.items():
+        allocated = measure(build, csv_text)
+        print(
+            f"{label:<22}{allocated / 2**20:>12.1f}"
+            f"{allocated / args.contacts:>16.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Recall@k and query latency of each FAISS index type against the flat baseline.
+
+Vectors come from the embedding cache (real wiki chunks, if it holds enough
+of them) or are generated: unit vectors around a few hundred topic centres,
+which clusters like real embeddings do. Queries are held-out vectors, and
+each index is searched one query at a time, as in a chat request.
+
+``--reduce`` also measures shortened embeddings. ``text-embedding-3`` models
+shorten vectors by truncating and re-normalizing them, which is what this
+does to the cached vectors; on synthetic vectors the result is meaningless.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.faiss_index_types [--vectors 50000] [--dimensions 3072]
+        [--from-cache helper/embedding_cache.sqlite --model text-embedding-3-large]
+        [--reduce 1024]
+"""
+
+import time
+import sqlite3
+import argparse
+from array import array
+from typing import Any, Dict, Tuple
+
+import numpy as np
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+
+from helper.vector_index import IndexConfig, build_faiss_index
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around ``count // 100`` random topic centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((max(1, count // 100), dimensions), dtype=np.float32)
+    labels = rng.integers(0, len(centres), size=count)
+    vectors = centres[labels] + rng.standard_normal((count, dimensions), dtype=np.float32)
+    return _normalize(vectors)
+
+
+def cached_vectors(path: str, model: str, limit: int) -> np.ndarray:
+    """Loads up to ``limit`` vectors for ``model`` from an embedding cache."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT vector FROM embeddings WHERE model = ? LIMIT ?", (model, limit)
+    ).fetchall()
+    conn.close()
+    return np.array([array("f", blob) for (blob,) in rows], dtype=np.float32)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def evaluate(
+    index, queries: np.ndarray, truth: np.ndarray, k: int
+) -> Dict[str, float]:
+    """Searches one query at a time; returns recall@k and latency percentiles."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        hits += len(set(found[0]) & set(expected))
+    latencies.sort()
+    return {
+        "recall": hits / (len(queries) * k),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def run(
+    label: str,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    config: IndexConfig,
+    k: int,
+) -> Tuple[str, Dict[str, float], Dict[str, Any]]:
+    faiss = dependable_faiss_import()
+    started = time.perf_counter()
+    index, info = build_faiss_index(vectors, config)
+    build_s = time.perf_counter() - started
+    result = evaluate(index, queries, truth, k)
+    result["build_s"] = build_s
+    result["mib"] = len(faiss.serialize_index(index)) / 2**20
+    return label, result, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("-k", type=int, default=4, help="retriever top-k")
+    parser.add_argument("--nprobe", type=int, default=IndexConfig.nprobe)
+    parser.add_argument("--pq-m", type=int, default=0, help="bytes per PQ code")
+    parser.add_argument("--from-cache", help="embedding cache SQLite file")
+    parser.add_argument("--model", default="text-embedding-3-large")
+    parser.add_argument("--reduce", type=int, help="also test shortened vectors")
+    args = parser.parse_args()
+
+    if args.from_cache:
+        data = cached_vectors(args.from_cache, args.model, args.vectors + args.queries)
+        if len(data) <= args.queries:
+            parser.error(f"only {len(data)} cached vectors for {args.model}")
+    else:
+        data = synthetic_vectors(args.vectors + args.queries, args.dimensions)
+    rng = np.random.default_rng(1)
+    data = data[rng.permutation(len(data))]
+    queries, vectors = data[: args.queries], data[args.queries :]
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries")
+
+    faiss = dependable_faiss_import()
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+
+    configs = {
+        "flat": IndexConfig("flat"),
+        "ivf_flat": IndexConfig("ivf_flat", nprobe=args.nprobe),
+        "ivf_pq": IndexConfig("ivf_pq", nprobe=args.nprobe, pq_m=args.pq_m),
+        "hnsw": IndexConfig("hnsw"),
+    }
+    results = [
+        run(label, vectors, queries, truth, config, args.k)
+        for label, config in configs.items()
+    ]
+    if args.reduce:
+        short = _normalize(np.ascontiguousarray(vectors[:, : args.reduce]))
+        short_queries = _normalize(np.ascontiguousarray(queries[:, : args.reduce]))
+        results.append(
+            run(
+                f"flat@{args.reduce}",
+                short,
+                short_queries,
+                truth,
+                IndexConfig("flat"),
+                args.k,
+            )
+        )
+
+    print(
+        f"{'index':<16}{'built as':<10}{f'recall@{args.k}':>10}{'p50 ms':>9}"
+        f"{'p95 ms':>9}{'MiB':>9}{'build s':>9}"
+    )
+    for label, result, info in results:
+        print(
+            f"{label:<16}{info['index_type']:<10}{result['recall']:>10.3f}"
+            f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            f"{result['mib']:>9.1f}{result['build_s']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Retrieval quality and latency of the dense, keyword and hybrid modes.
+
+Runs offline on a synthetic logistics wiki: every chunk is about one topic
+(parking, WiFi, rooms, check-in, food) and contains one exact token, such
+as a room number, an SSID or a date. The stand-in embedding model
+understands topics, including synonyms that never appear in the chunks, but
+is blind to exact tokens, which is how dense retrieval fails on real
+logistics questions. Two query sets:
+
+- exact: "which room is B-204?"; hit@k / MRR of the one chunk with that token;
+- topical: "where do I leave my car?" in words absent from the chunks;
+  precision@k of chunks on the right topic.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.hybrid_retrieval [--chunks 5000] [--queries 300] [-k 4]
+"""
+
+import time
+import random
+import argparse
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from helper.embeddings import save_vector_store
+from helper.hybrid_retriever import HybridRetriever, RETRIEVAL_MODES
+from helper.index_storage import load_vector_store
+from helper.vector_index import IndexConfig, build_faiss_index
+
+# topic -> (words used in chunks, synonyms only used in queries, chunk template,
+#           exact-token query template)
+TOPICS = {
+    "parking": (
+        ["parking", "garage"],
+        ["car", "vehicle", "drive"],
+        "Parking for {team} is on garage level {token}.",
+        "Which team parks on level {token}?",
+    ),
+    "wifi": (
+        ["wifi", "network", "password"],
+        ["internet", "online", "connect"],
+        "The wifi network {token} is reserved for {team}.",
+        "Who gets the {token} network?",
+    ),
+    "rooms": (
+        ["room", "workshop", "session"],
+        ["talk", "presentation", "venue"],
+        "The {team} workshop session is in room {token}.",
+        "Which workshop is in room {token}?",
+    ),
+    "checkin": (
+        ["check-in", "badge", "registration"],
+        ["arrive", "sign", "entrance"],
+        "Badge registration for {team} opens on {token}.",
+        "Who registers on {token}?",
+    ),
+    "food": (
+        ["lunch", "dinner", "catering"],
+        ["eat", "meal", "hungry"],
+        "Catering for {team} serves lunch at table {token}.",
+        "Whose lunch is at table {token}?",
+    ),
+}
+TOPICAL_QUERIES = {
+    "parking": "where do I leave my car or vehicle when I drive in",
+    "wifi": "how can I connect to the internet and get online",
+    "rooms": "which venue has the presentation or talk",
+    "checkin": "where is the entrance to sign in when I arrive",
+    "food": "where can I eat a meal when hungry",
+}
+FILLER = (
+    "Please follow the volunteers in orange shirts. Bring a government issued "
+    "ID. Updates are posted in the event channel every morning."
+)
+
+
+class TopicEmbeddings(Embeddings):
+    """Embeds text as the mean of its topics' directions plus a little noise."""
+
+    def __init__(self, dimensions: int = 256, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.directions = {}
+        for words, synonyms, _, _ in TOPICS.values():
+            direction = rng.standard_normal(dimensions)
+            for word in words + synonyms:
+                self.directions[word] = direction
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        rng = np.random.default_rng(abs(hash(text)) % 2**32)
+        vector = rng.standard_normal(self.dimensions) * 0.3
+        for word in text.lower().replace("?", " ").replace(".", " ").split():
+            if word in self.directions:
+                vector = vector + self.directions[word]
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def make_corpus(count: int, seed: int = 0):
+    """Returns (documents, topic per chunk, token per chunk)."""
+    rng = random.Random(seed)
+    documents, topics, tokens = [], [], []
+    for i in range(count):
+        topic = rng.choice(list(TOPICS))
+        token = f"{chr(65 + i % 26)}-{i:05d}"
+        text = TOPICS[topic][2].format(team=f"team {rng.randrange(200)}", token=token)
+        documents.append(Document(page_content=f"{text} {FILLER}", metadata={"i": i}))
+        topics.append(topic)
+        tokens.append(token)
+    return documents, topics, tokens
+
+
+def evaluate(retriever: HybridRetriever, queries, k: int) -> Dict[str, float]:
+    """queries: list of (query, is_relevant(document)) pairs."""
+    reciprocal_ranks, hits, relevant_retrieved, latencies = [], 0, 0, []
+    for query, is_relevant in queries:
+        started = time.perf_counter()
+        documents = retriever.invoke(query)
+        latencies.append(time.perf_counter() - started)
+        ranks = [rank for rank, doc in enumerate(documents, 1) if is_relevant(doc)]
+        hits += bool(ranks)
+        relevant_retrieved += len(ranks)
+        reciprocal_ranks.append(1 / ranks[0] if ranks else 0.0)
+    latencies.sort()
+    return {
+        "hit": hits / len(queries),
+        "mrr": sum(reciprocal_ranks) / len(queries),
+        "precision": relevant_retrieved / (len(queries) * k),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    documents, topics, tokens = make_corpus(args.chunks)
+    embeddings = TopicEmbeddings()
+    vectors = np.array(
+        embeddings.embed_documents([doc.page_content for doc in documents]),
+        dtype=np.float32,
+    )
+    index, _ = build_faiss_index(vectors, IndexConfig("flat"))
+    ids = [str(i) for i in range(len(documents))]
+
+    rng = random.Random(1)
+    exact = []
+    for i in rng.sample(range(len(documents)), args.queries):
+        query = TOPICS[topics[i]][3].format(token=tokens[i])
+        exact.append((query, lambda doc, i=i: doc.metadata["i"] == i))
+    topical = [
+        (query, lambda doc, topic=topic: topics[doc.metadata["i"]] == topic)
+        for topic, query in TOPICAL_QUERIES.items()
+    ]
+
+    with tempfile.TemporaryDirectory() as path:
+        save_vector_store(
+            FAISS(
+                embedding_function=embeddings,
+                index=index,
+                docstore=InMemoryDocstore(dict(zip(ids, documents))),
+                index_to_docstore_id=dict(enumerate(ids)),
+            ),
+            path,
+        )
+        vector_store = load_vector_store(path, embeddings)
+
+        print(
+            f"{args.chunks} chunks, {len(exact)} exact and "
+            f"{len(topical)} topical queries"
+        )
+        print(
+            f"{'mode':<10}{f'exact hit@{args.k}':>14}{'exact MRR':>11}"
+            f"{f'topical P@{args.k}':>14}{'p50 ms':>9}"
+        )
+        for mode in RETRIEVAL_MODES:
+            retriever = HybridRetriever(vector_store=vector_store, mode=mode, k=args.k)
+            exact_result = evaluate(retriever, exact, args.k)
+            topical_result = evaluate(retriever, topical, args.k)
+            print(
+                f"{mode:<10}{exact_result['hit']:>14.3f}{exact_result['mrr']:>11.3f}"
+                f"{topical_result['precision']:>14.3f}{exact_result['p50_ms']:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
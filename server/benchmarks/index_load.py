@@ -0,0 +1,130 @@
+"""
+Cold-start time and private memory of loading the wiki index.
+
+Builds a synthetic index of ``--chunks`` 1000-character chunks, saved both
+with ``save_local`` and with ``save_vector_store``, then loads each in a fresh
+process with ``FAISS.load_local`` (whole index on the heap, pickled
+docstore) and with ``load_vector_store`` (memory-mapped index, SQLite
+docstore), and runs a few queries. Private memory is what each extra worker
+process would add; mapped pages are shared through the page cache. Reads
+``/proc/self/statm``, so Linux only.
+
+Usage (from ``server/``)::
+
+    python -m benchmarks.index_load [--chunks 100000] [--dimensions 3072]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from helper.embeddings import HashEmbeddings, save_vector_store
+from helper.vector_index import IndexConfig, build_faiss_index
+
+WORDS = "parking check-in badge room wifi lunch judge sponsor floor hall".split()
+
+
+def private_mib() -> float:
+    """Resident memory not backed by a shared file mapping, in MiB."""
+    with open("/proc/self/statm") as f:
+        _, resident, shared = (int(value) for value in f.read().split()[:3])
+    return (resident - shared) * 4096 / 2**20
+
+
+def build(path: str, chunks: int, dimensions: int) -> None:
+    rng = np.random.default_rng(0)
+    words = random.Random(0)
+    vectors = rng.standard_normal((chunks, dimensions), dtype=np.float32)
+    index, _ = build_faiss_index(vectors, IndexConfig("flat"))
+    ids = [f"doc.pdf#{i}" for i in range(chunks)]
+    documents = {
+        doc_id: Document(
+            page_content=" ".join(words.choices(WORDS, k=170))[:1000],
+            metadata={"source": "doc.pdf", "page": i // 4},
+        )
+        for i, doc_id in enumerate(ids)
+    }
+    vector_store = FAISS(
+        embedding_function=HashEmbeddings(dimensions),
+        index=index,
+        docstore=InMemoryDocstore(documents),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    save_vector_store(vector_store, os.path.join(path, "load_vector_store"))
+    vector_store.save_local(os.path.join(path, "load_local"))
+
+
+def measure(path: str, method: str, dimensions: int) -> dict:
+    """Runs in a child process: load the index and answer a few queries."""
+    from helper.index_storage import load_vector_store
+
+    embeddings = HashEmbeddings(dimensions)
+    before = private_mib()
+    started = time.perf_counter()
+    if method == "load_local":
+        # The format being replaced; the pickle was written by build() above
+        vector_store = FAISS.load_local(
+            path, embeddings, allow_dangerous_deserialization=True
+        )
+    else:
+        vector_store = load_vector_store(path, embeddings)
+    loaded = time.perf_counter() - started
+    for query in WORDS:
+        vector_store.similarity_search(query, k=4)
+    return {
+        "load_s": loaded,
+        "first_queries_s": time.perf_counter() - started - loaded,
+        "private_mib": private_mib() - before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(*args.measure, args.dimensions)))
+        return
+
+    with tempfile.TemporaryDirectory() as path:
+        build(path, args.chunks, args.dimensions)
+        print(f"{args.chunks} chunks x {args.dimensions} dims")
+        print(f"{'loader':<20}{'load s':>9}{'8 queries s':>13}{'private MiB':>13}")
+        for method in ("load_local", "load_vector_store"):
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.index_load",
+                    "--dimensions",
+                    str(args.dimensions),
+                    "--measure",
+                    os.path.join(path, method),
+                    method,
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            result = json.loads(output.splitlines()[-1])
+            print(
+                f"{method:<20}{result['load_s']:>9.2f}"
+                f"{result['first_queries_s']:>13.3f}{result['private_mib']:>13.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+"""
+Persistent, resumable outreach campaign jobs.
+
+Every campaign and each of its contacts is stored in SQLite. Contacts move
+through a small state machine (pending -> generated -> sent | failed) that is
+updated as the pipeline makes progress, so a campaign can be cancelled,
+resumed, or picked up again after a restart exactly where it stopped. Rows are
+keyed by (campaign_id, email): a contact already marked as sent is never
+emailed again, even if the same CSV is uploaded twice.
+
+Uploads are streamed: the CSV is read in chunks, contacts are written to the
+store in batches, and the pipeline pages them back out of SQLite, so memory
+use does not grow with the size of the contact list.
+"""
+
+import io
+import os
+import json
+import codecs
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Union
+
+from outreach_service import Contact, ContactBatch, RowError, CSV_CHUNK_SIZE, iter_csv_lines
+from outreach_pipeline import CampaignPipeline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "campaigns.sqlite")
+
+PENDING = "pending"
+GENERATED = "generated"
+SENT = "sent"
+FAILED = "failed"
+
+CONTACT_FIELDS = ("name", "email", "role", "company", "phone", "notes")
+
+# Contacts written to / read from the store per round trip
+CONTACT_BATCH_SIZE = 500
+
+# Row errors returned with a campaign; the full count is always reported
+MAX_REPORTED_ROW_ERRORS = 50
+
+
+def campaign_id_for(stream: BinaryIO, chunk_size: int = CSV_CHUNK_SIZE) -> str:
+    """
+    Derive a stable campaign id from the uploaded CSV, so re-uploads resume.
+
+    The stream is hashed in chunks and rewound. It is also decoded on the way
+    through so an invalid encoding is rejected before any contact is stored.
+
+    Raises:
+        ValueError: If the file is not valid UTF-8.
+    """
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                break
+            digest.update(chunk)
+    except UnicodeDecodeError as e:
+        raise ValueError(f"CSV must be UTF-8 encoded: {str(e)}")
+    stream.seek(0)
+    return digest.hexdigest()[:16]
+
+
+class CampaignStore:
+    """SQLite persistence for campaigns and per-contact progress."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS campaigns (
+                campaign_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                stages TEXT,
+                error TEXT
+            );
+            CREATE TABLE IF NOT EXISTS campaign_row_errors (
+                campaign_id TEXT NOT NULL,
+                line INTEGER NOT NULL,
+                error TEXT NOT NULL,
+                PRIMARY KEY (campaign_id, line)
+            );
+            CREATE TABLE IF NOT EXISTS campaign_contacts (
+                campaign_id TEXT NOT NULL,
+                email TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                name TEXT, role TEXT, company TEXT, phone TEXT, notes TEXT,
+                contact_type TEXT NOT NULL,
+                state TEXT NOT NULL,
+                subject TEXT,
+                body TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (campaign_id, email)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def create(self, campaign_id: str, contacts: Iterable[Contact], contact_types: List[str]) -> None:
+        """Create a campaign (if new) and add any contacts it does not have yet."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO campaigns (campaign_id, status, created_at, updated_at) "
+                "VALUES (?, 'running', ?, ?)",
+                (campaign_id, now, now),
+            )
+            (offset,) = self._conn.execute(
+                "SELECT COALESCE(MAX(position) + 1, 0) FROM campaign_contacts "
+                "WHERE campaign_id = ?",
+                (campaign_id,),
+            ).fetchone()
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO campaign_contacts (campaign_id, email, position, "
+                "name, role, company, phone, notes, contact_type, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        campaign_id,
+                        contact.email,
+                        offset + i,
+                        contact.name,
+                        contact.role,
+                        contact.company,
+                        contact.phone,
+                        contact.notes,
+                        contact_type,
+                        PENDING,
+                        now,
+                    )
+                    for i, (contact, contact_type) in enumerate(zip(contacts, contact_types))
+                ],
+            )
+            self._conn.commit()
+
+    def add_row_errors(self, campaign_id: str, errors: List[RowError]) -> None:
+        """Record CSV rows that were skipped during upload."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO campaign_row_errors (campaign_id, line, error) "
+                "VALUES (?, ?, ?)",
+                [(campaign_id, error.line, error.error) for error in errors],
+            )
+            self._conn.commit()
+
+    def set_status(self, campaign_id: str, status: str, error: Optional[str] = None,
+                   stages: Optional[Dict] = None) -> None:
+        """Update the campaign status (running/cancelled/completed/failed)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE campaigns SET status = ?, error = ?, updated_at = ?, "
+                "stages = COALESCE(?, stages) WHERE campaign_id = ?",
+                (status, error, time.time(), json.dumps(stages) if stages else None, campaign_id),
+            )
+            self._conn.commit()
+
+    def mark_generated(self, campaign_id: str, email: str, email_data: Dict[str, str]) -> None:
+        """Store the generated email so a resumed campaign does not regenerate it."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE campaign_contacts SET state = ?, subject = ?, body = ?, updated_at = ? "
+                "WHERE campaign_id = ? AND email = ? AND state = ?",
+                (GENERATED, email_data["subject"], email_data["body"], time.time(),
+                 campaign_id, email, PENDING),
+            )
+            self._conn.commit()
+
+    def mark_sent(self, campaign_id: str, email: str, result: Dict[str, Any]) -> None:
+        """Record the outcome of a send attempt."""
+        state = SENT if result["success"] else FAILED
+        with self._lock:
+            self._conn.execute(
+                "UPDATE campaign_contacts SET state = ?, error = ?, updated_at = ? "
+                "WHERE campaign_id = ? AND email = ? AND state != ?",
+                (state, result.get("error"), time.time(), campaign_id, email, SENT),
+            )
+            self._conn.commit()
+
+    def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Return campaign status plus per-state and per-type contact counts."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, created_at, updated_at, stages, error FROM campaigns "
+                "WHERE campaign_id = ?",
+                (campaign_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            states = dict(
+                self._conn.execute(
+                    "SELECT state, COUNT(*) FROM campaign_contacts WHERE campaign_id = ? "
+                    "GROUP BY state",
+                    (campaign_id,),
+                ).fetchall()
+            )
+            types = dict(
+                self._conn.execute(
+                    "SELECT contact_type, COUNT(*) FROM campaign_contacts "
+                    "WHERE campaign_id = ? GROUP BY contact_type",
+                    (campaign_id,),
+                ).fetchall()
+            )
+            (invalid_rows,) = self._conn.execute(
+                "SELECT COUNT(*) FROM campaign_row_errors WHERE campaign_id = ?",
+                (campaign_id,),
+            ).fetchone()
+            row_errors = self._conn.execute(
+                "SELECT line, error FROM campaign_row_errors WHERE campaign_id = ? "
+                "ORDER BY line LIMIT ?",
+                (campaign_id, MAX_REPORTED_ROW_ERRORS),
+            ).fetchall()
+        status, created_at, updated_at, stages, error = row
+        stages = json.loads(stages) if stages else None
+        return {
+            "campaign_id": campaign_id,
+            "status": status,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "error": error,
+            "row_errors": [{"line": line, "error": message} for line, message in row_errors],
+            "summary": {
+                "total_contacts": sum(states.values()),
+                "participants": types.pop("participant", 0),
+                "judges": types.pop("judge", 0),
+                "sponsors": types.pop("sponsor", 0),
+                # Categories added through custom classifier keyword tables
+                **{contact_type + "s": count for contact_type, count in types.items()},
+                "pending": states.get(PENDING, 0),
+                "generated": states.get(GENERATED, 0),
+                "emails_sent": states.get(SENT, 0),
+                "emails_failed": states.get(FAILED, 0),
+                "invalid_rows": invalid_rows,
+                "generation_cache": (
+                    stages["generation"].get("cache") if stages else None
+                ),
+                "generation_batches": (
+                    stages["generation"].get("batches") if stages else None
+                ),
+                "stages": stages,
+            },
+        }
+
+    def unfinished_contacts(self, campaign_id: str) -> Iterator[tuple]:
+        """
+        Yield ``(contact, contact_type, draft)`` for contacts not yet sent.
+
+        Rows are fetched in pages of ``CONTACT_BATCH_SIZE`` by position, so a
+        large campaign is never loaded into memory at once.
+        """
+        last_position = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT position, name, email, role, company, phone, notes, "
+                    "contact_type, state, subject, body FROM campaign_contacts "
+                    "WHERE campaign_id = ? AND state IN (?, ?, ?) AND position > ? "
+                    "ORDER BY position LIMIT ?",
+                    (campaign_id, PENDING, GENERATED, FAILED, last_position,
+                     CONTACT_BATCH_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                contact = Contact(**dict(zip(CONTACT_FIELDS, row[1:7])))
+                has_draft = row[8] in (GENERATED, FAILED) and row[9] is not None
+                yield contact, row[7], (
+                    {"subject": row[9], "body": row[10]} if has_draft else None
+                )
+            last_position = rows[-1][0]
+
+    def results(self, campaign_id: str) -> List[Dict[str, Any]]:
+        """Return per-contact results in upload order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, email, role, company, phone, notes, contact_type, state, error "
+                "FROM campaign_contacts WHERE campaign_id = ? ORDER BY position",
+                (campaign_id,),
+            ).fetchall()
+        return [
+            {
+                "contact": Contact(**dict(zip(CONTACT_FIELDS, row[:6]))),
+                "contact_type": row[6],
+                "result": {
+                    "success": row[7] == SENT,
+                    "email": row[1],
+                    "state": row[7],
+                    "error": row[8],
+                },
+            }
+            for row in rows
+        ]
+
+    def running_campaigns(self) -> List[str]:
+        """Return ids of campaigns that were running when the process stopped."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT campaign_id FROM campaigns WHERE status = 'running'"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+class CampaignManager:
+    """Runs persisted campaigns as background asyncio tasks."""
+
+    def __init__(self, service, store: CampaignStore):
+        self.service = service
+        self.store = store
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def start(self, source: Union[BinaryIO, bytes, str]) -> str:
+        """
+        Create (or re-open) the campaign for an uploaded CSV and run it.
+
+        Args:
+            source: The CSV as a binary file object (read in chunks), bytes
+                or text.
+
+        Returns:
+            The campaign id.
+
+        Raises:
+            ValueError: If the CSV cannot be read or has no valid contacts.
+        """
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+
+        campaign_id = await asyncio.to_thread(campaign_id_for, source)
+        await asyncio.to_thread(self._load_contacts, campaign_id, source)
+        self.resume(campaign_id)
+        return campaign_id
+
+    def _load_contacts(self, campaign_id: str, stream: BinaryIO) -> None:
+        batch = ContactBatch()
+        errors: List[RowError] = []
+        loaded = 0
+
+        def flush():
+            nonlocal loaded
+            contact_types = self.service.classify_batch(batch)
+            self.store.create(campaign_id, batch, contact_types)
+            self.store.add_row_errors(campaign_id, errors)
+            loaded += len(batch)
+            batch.clear()
+            errors.clear()
+
+        # Contacts are keyed by email, so a repeated email is a row error
+        # rather than a second contact the store would silently drop
+        for contact in self.service.iter_contacts(
+            iter_csv_lines(stream), on_error=errors.append, unique_emails=True
+        ):
+            batch.append(contact)
+            if len(batch) >= CONTACT_BATCH_SIZE or len(errors) >= CONTACT_BATCH_SIZE:
+                flush()
+
+        if batch:
+            flush()
+        elif not loaded:
+            detail = "; ".join(f"line {e.line}: {e.error}" for e in errors[:5])
+            raise ValueError(
+                "No contacts found in CSV" + (f" ({detail})" if detail else "")
+            )
+        elif errors:
+            self.store.add_row_errors(campaign_id, errors)
+
+    def resume(self, campaign_id: str) -> asyncio.Task:
+        """Run the unfinished part of a campaign unless it is already running."""
+        task = self._tasks.get(campaign_id)
+        if task is not None and not task.done():
+            return task
+        self.store.set_status(campaign_id, "running")
+        task = asyncio.create_task(self._run(campaign_id))
+        self._tasks[campaign_id] = task
+        return task
+
+    def cancel(self, campaign_id: str) -> bool:
+        """Stop a running campaign; unsent contacts stay pending for a later resume."""
+        task = self._tasks.get(campaign_id)
+        if task is None or task.done():
+            # Finished, failed or never started here: keep its status and error
+            return False
+        self.store.set_status(campaign_id, "cancelled")
+        task.cancel()
+        return True
+
+    async def wait(self, campaign_id: str) -> None:
+        """Wait for a campaign task without cancelling it if the caller goes away."""
+        task = self._tasks.get(campaign_id)
+        if task is None:
+            return
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Only swallow the campaign's own cancellation, not the caller's
+            if not task.cancelled():
+                raise
+
+    def resume_interrupted(self) -> List[str]:
+        """Resume every campaign that was running when the process last stopped."""
+        campaign_ids = self.store.running_campaigns()
+        for campaign_id in campaign_ids:
+            self.resume(campaign_id)
+        return campaign_ids
+
+    async def _run(self, campaign_id: str) -> None:
+        def on_generated(index, contact, contact_type, email_data):
+            self.store.mark_generated(campaign_id, contact.email, email_data)
+
+        def on_sent(index, contact, contact_type, result):
+            self.store.mark_sent(campaign_id, contact.email, result)
+
+        try:
+            # Results are persisted by on_sent, so the pipeline need not keep them
+            outcome = await CampaignPipeline(self.service).run_items(
+                self.store.unfinished_contacts(campaign_id),
+                on_generated=on_generated,
+                on_sent=on_sent,
+                keep_results=False,
+            )
+            self.store.set_status(
+                campaign_id, "completed", stages=outcome["summary"]["stages"]
+            )
+        except asyncio.CancelledError:
+            logger.info("Campaign %s cancelled", campaign_id)
+            raise
+        except Exception as e:
+            logger.exception("Campaign %s failed", campaign_id)
+            self.store.set_status(campaign_id, "failed", error=str(e))
@@ -0,0 +1,82 @@
+"""
+Per-model concurrency limits for upstream LLM calls.
+
+Every async call to a hosted model goes through ``model_limiter(model)`` so a
+single uvicorn worker can serve many requests in parallel without flooding any
+one provider. The default limit comes from ``MODEL_CONCURRENCY`` and can be
+overridden per model, e.g. ``MODEL_CONCURRENCY_GEMINI_2_5_PRO=4``.
+"""
+
+import os
+import re
+import asyncio
+from typing import AsyncIterator, Dict, TypeVar
+
+DEFAULT_MODEL_CONCURRENCY = 8
+
+# Chunks a limited stream may read ahead of its consumer; far more than one
+# reply, so the model slot is freed as soon as generation ends
+STREAM_BUFFER_CHUNKS = int(os.getenv("STREAM_BUFFER_CHUNKS", "4096"))
+
+T = TypeVar("T")
+
+_END = object()
+
+_limiters: Dict[str, asyncio.Semaphore] = {}
+
+
+def _limit_for(model: str) -> int:
+    env_name = "MODEL_CONCURRENCY_" + re.sub(r"[^A-Za-z0-9]", "_", model).upper()
+    default = os.getenv("MODEL_CONCURRENCY", str(DEFAULT_MODEL_CONCURRENCY))
+    return int(os.getenv(env_name, default))
+
+
+def model_limiter(model: str) -> asyncio.Semaphore:
+    """Return the shared semaphore bounding in-flight calls to ``model``."""
+    if model not in _limiters:
+        _limiters[model] = asyncio.Semaphore(_limit_for(model))
+    return _limiters[model]
+
+
+async def limited_stream(
+    model: str, stream: AsyncIterator[T], buffer_size: int = STREAM_BUFFER_CHUNKS
+) -> AsyncIterator[T]:
+    """
+    Yields the chunks of ``stream`` while holding a ``model`` slot only as
+    long as the model is generating.
+
+    A background task drains the upstream stream into a bounded buffer, so a
+    client reading slowly does not keep other requests waiting for the model.
+    Errors from the stream are raised to the consumer, and closing the
+    consumer early cancels the upstream stream.
+    """
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+    async def drain():
+        try:
+            async with model_limiter(model):
+                async for chunk in stream:
+                    await buffer.put(chunk)
+            await buffer.put(_END)
+        except Exception as e:
+            await buffer.put(e)
+
+    task = asyncio.create_task(drain())
+    try:
+        while True:
+            chunk = await buffer.get()
+            if chunk is _END:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        task.cancel()
+
+
+def limiter_stats() -> Dict[str, Dict[str, int]]:
+    """Return the configured limit and current free slots for each model."""
+    return {
+        model: {"limit": _limit_for(model), "available": semaphore._value}
+        for model, semaphore in _limiters.items()
+    }
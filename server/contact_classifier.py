@@ -0,0 +1,121 @@
+"""
+Keyword-based contact classification.
+
+Each category has keyword lists for the contact's role and/or company. All
+keywords of a category and field are compiled into a single case-insensitive
+regex, and a whole column of contacts is classified in one vectorized pass
+with pandas string operations. Roles and companies repeat heavily in contact
+lists, so only their distinct values are matched.
+
+The keyword tables can be replaced with a JSON file given by
+``CONTACT_CLASSIFIER_KEYWORDS``::
+
+    {"judge": {"role": ["judge", "mentor"]},
+     "sponsor": {"role": ["sponsor"], "company": ["ventures"]}}
+
+A plain list of keywords is shorthand for ``{"role": [...]}``.
+"""
+
+import os
+import re
+import json
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CATEGORY = "participant"
+
+# Checked in order: the first category with a matching keyword wins
+DEFAULT_KEYWORDS: Dict[str, Dict[str, List[str]]] = {
+    "judge": {"role": ["judge", "mentor", "alumni", "past employee"]},
+    "sponsor": {"role": ["sponsor", "partner", "corporate"]},
+}
+
+FIELDS = ("role", "company")
+
+
+def _compile(keywords: Sequence[str]) -> "re.Pattern":
+    alternatives = sorted({re.escape(word.lower()) for word in keywords})
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+class ContactClassifier:
+    """Classifies contacts into categories by keyword matching."""
+
+    def __init__(
+        self,
+        keywords: Optional[Mapping] = None,
+        default: str = DEFAULT_CATEGORY,
+    ):
+        keywords = DEFAULT_KEYWORDS if keywords is None else keywords
+        self.default = default
+        self.categories: List[str] = [default] + [c for c in keywords if c != default]
+        self._patterns: List[Tuple[str, List[Tuple[str, "re.Pattern"]]]] = []
+
+        for category, fields in keywords.items():
+            if isinstance(fields, (list, tuple)):
+                fields = {"role": fields}
+            patterns = []
+            for field, words in fields.items():
+                if field not in FIELDS:
+                    raise ValueError(
+                        f"Unknown field '{field}' for category '{category}'; "
+                        f"expected one of {FIELDS}"
+                    )
+                if words:
+                    patterns.append((field, _compile(words)))
+            self._patterns.append((category, patterns))
+
+    def classify(self, role: str, company: str = "") -> str:
+        """Classify a single contact."""
+        values = {"role": role, "company": company}
+        for category, patterns in self._patterns:
+            if any(pattern.search(values[field]) for field, pattern in patterns):
+                return category
+        return self.default
+
+    def classify_many(
+        self, roles: Sequence[str], companies: Optional[Sequence[str]] = None
+    ) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Classify a column of contacts in one vectorized pass.
+
+        Returns:
+            An object array with one category per contact, and the number of
+            contacts in each category (every known category is present).
+        """
+        size = len(roles)
+        if companies is None:
+            companies = [""] * size
+
+        # Match each distinct value once, then broadcast back through the codes
+        columns = {}
+        for field, values in (("role", roles), ("company", companies)):
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+            columns[field] = (codes, pd.Series(uniques, dtype=object))
+
+        result = np.full(size, self.default, dtype=object)
+        unassigned = np.ones(size, dtype=bool)
+        for category, patterns in self._patterns:
+            matched = np.zeros(size, dtype=bool)
+            for field, pattern in patterns:
+                codes, uniques = columns[field]
+                unique_matches = uniques.str.contains(pattern, regex=True, na=False)
+                matched |= unique_matches.to_numpy(dtype=bool)[codes]
+            result[matched & unassigned] = category
+            unassigned &= ~matched
+
+        counts = dict.fromkeys(self.categories, 0)
+        for category, count in pd.Series(result, dtype=object).value_counts().items():
+            counts[category] = int(count)
+        return result, counts
+
+
+def load_classifier_keywords() -> Optional[Dict]:
+    """Load keyword tables from ``CONTACT_CLASSIFIER_KEYWORDS``, if set."""
+    path = os.getenv("CONTACT_CLASSIFIER_KEYWORDS")
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,323 @@
+"""
+Persistent cache of generated outreach email drafts.
+
+Bulk contact lists contain many contacts with the same persona: identical
+contact type, role, company and notes (often empty). Their prompts only
+differ by name, so a draft generated for one of them is stored with the name
+replaced by placeholders and reused for the others with their own name
+substituted in. A draft that still mentions any part of the recipient's name
+after that (a nickname, a middle name) is never stored, since it would be
+sent to everyone with the same persona.
+
+Drafts live in SQLite keyed by a hash of the normalized prompt inputs, expire
+after a TTL and are evicted least recently used first once the cache is full.
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "email_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Bump when the email prompt changes so stale drafts are not reused
+PROMPT_VERSION = 1
+
+NAME_PLACEHOLDER = "{{recipient_name}}"
+FIRST_NAME_PLACEHOLDER = "{{recipient_first_name}}"
+LAST_NAME_PLACEHOLDER = "{{recipient_last_name}}"
+
+# Name words that do not identify the person
+HONORIFICS = ("mr", "mrs", "ms", "miss", "mx", "dr", "prof", "professor", "sir", "rev")
+NAME_SUFFIXES = ("jr", "sr", "ii", "iii", "iv", "phd", "md")
+
+_NAME_WORD = re.compile(r"[^\W\d_][\w'-]*")
+_CAPITALIZED_WORD = re.compile(r"(?<!\w)[^\W\d_a-z][\w'-]*")
+_HONORIFIC = r"(?i:(?:" + "|".join(HONORIFICS) + r")\.?\s+)"
+
+# Eviction trims the cache to this fraction of max_entries, so the exact
+# COUNT(*) it needs does not run on every put once the cache is full
+_EVICT_TO = 0.9
+
+# Shortest capitalized prefix of a name part treated as a nickname ("Alex")
+_MIN_NICKNAME = 4
+
+
+def _normalize(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def draft_key(
+    model: str, contact_type: str, role: str, company: str, notes: str
+) -> str:
+    """Returns the cache key for a persona's prompt inputs."""
+    payload = [
+        PROMPT_VERSION,
+        model,
+        contact_type,
+        _normalize(role),
+        _normalize(company),
+        _normalize(notes),
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def name_tokens(name: str) -> List[str]:
+    """Returns the parts of ``name`` that identify the person, in order.
+
+    Honorifics, suffixes and initials are dropped: "Dr. Jane Q. Doe Jr."
+    gives ``["Jane", "Doe"]``.
+    """
+    return [
+        word
+        for word in _NAME_WORD.findall(name)
+        if len(word) > 1 and word.lower() not in HONORIFICS + NAME_SUFFIXES
+    ]
+
+
+def _word(token: str) -> str:
+    # The token as written, capitalized or in capitals, as a whole word; no
+    # \b, which fails next to punctuation
+    variants = sorted({token, token.capitalize(), token.upper()}, key=len, reverse=True)
+    return r"(?<!\w)(?:" + "|".join(map(re.escape, variants)) + r")(?!\w)"
+
+
+def _name_patterns(tokens: List[str]) -> List[tuple]:
+    """(pattern, placeholder) pairs, most specific first."""
+    if not tokens:
+        return []
+    first, last = tokens[0], tokens[-1]
+    names = "(?:" + "|".join(_word(token) for token in tokens) + ")"
+    patterns = []
+    if len(tokens) > 1:
+        middle = "".join(
+            rf"(?:\s+(?:{_word(token)}|[A-Z]\.?))?" for token in tokens[1:-1]
+        )
+        full = rf"{_HONORIFIC}?{_word(first)}{middle}(?:\s+[A-Z]\.?)?\s+{_word(last)}"
+        patterns.append((full, NAME_PLACEHOLDER))
+    patterns.append((_HONORIFIC + names, NAME_PLACEHOLDER))
+    patterns.append((_word(first), FIRST_NAME_PLACEHOLDER))
+    if len(tokens) > 1:
+        patterns.append((_word(last), LAST_NAME_PLACEHOLDER))
+    return [(re.compile(pattern), placeholder) for pattern, placeholder in patterns]
+
+
+def templatize(email_data: Dict[str, str], name: str) -> Dict[str, str]:
+    """Replaces the recipient's name in a draft with placeholders.
+
+    The full name (with or without honorific and middle names), an
+    honorific with any name part ("Dr. Doe"), the first and the last name
+    are each replaced. Check the result with ``mentions_name`` before
+    sharing it.
+    """
+    patterns = _name_patterns(name_tokens(name))
+    template = {}
+    for field in ("subject", "body"):
+        text = email_data[field]
+        for pattern, placeholder in patterns:
+            text = pattern.sub(placeholder, text)
+        template[field] = text
+    return template
+
+
+def _starts_sentence(text: str, position: int) -> bool:
+    before = text[:position].rstrip(" \t")
+    return not before or before[-1] in ".!?\n"
+
+
+def mentions_name(template: Dict[str, str], name: str) -> bool:
+    """Whether a templatized draft still contains part of the recipient's name.
+
+    Besides the name parts themselves, a capitalized word of at least
+    ``_MIN_NICKNAME`` letters that starts a name part counts as a nickname
+    ("Alex" for "Alexander"). At the start of a sentence, where any word is
+    capitalized, it only counts when followed by a comma ("Alex, welcome"),
+    so "There is parking" does not flag "Theresa".
+    """
+    tokens = name_tokens(name)
+    if not tokens:
+        return False
+    names = re.compile("|".join(_word(token) for token in tokens))
+    lowered = [token.lower() for token in tokens]
+    for field in ("subject", "body"):
+        text = template[field]
+        if names.search(text):
+            return True
+        for match in _CAPITALIZED_WORD.finditer(text):
+            word = match.group().lower()
+            if len(word) < _MIN_NICKNAME or not any(
+                token.startswith(word) for token in lowered
+            ):
+                continue
+            if not _starts_sentence(text, match.start()) or text.startswith(
+                ",", match.end()
+            ):
+                return True
+    return False
+
+
+def personalize(template: Dict[str, str], name: str) -> Dict[str, str]:
+    """Fills a cached draft's placeholders with the recipient's name."""
+    name = name.strip()
+    tokens = name_tokens(name) or name.split() or [""]
+    return {
+        field: template[field]
+        .replace(NAME_PLACEHOLDER, name)
+        .replace(FIRST_NAME_PLACEHOLDER, tokens[0])
+        .replace(LAST_NAME_PLACEHOLDER, tokens[-1])
+        for field in ("subject", "body")
+    }
+
+
+class EmailDraftCache:
+    """SQLite-backed LRU + TTL store of templatized email drafts."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS drafts (
+                key TEXT PRIMARY KEY,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_drafts_last_access ON drafts (last_access)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_drafts_created_at ON drafts (created_at)"
+        )
+        self._conn.commit()
+        # Approximate entry count kept up to date by get/put; other processes
+        # may share the file, so it is re-read before evicting
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """Returns the templatized draft for ``key``, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT subject, body, created_at FROM drafts WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM drafts WHERE key = ?", (key,))
+                self.expirations += 1
+                self._count -= 1
+                row = None
+            elif row is not None:
+                self._conn.execute(
+                    "UPDATE drafts SET last_access = ? WHERE key = ?", (now, key)
+                )
+            self._conn.commit()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return {"subject": row[0], "body": row[1]}
+
+    def put(self, key: str, template: Dict[str, str], name: str) -> bool:
+        """
+        Stores a templatized draft and evicts the oldest entries if over capacity.
+
+        Args:
+            key: The persona's cache key.
+            template: The draft returned by ``templatize``.
+            name: The name of the recipient the draft was written for.
+
+        Returns:
+            False if the draft was not stored because it still mentions the
+            recipient's name.
+        """
+        if mentions_name(template, name):
+            with self._lock:
+                self.rejected += 1
+            return False
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM drafts WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO drafts (key, subject, body, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, template["subject"], template["body"], now, now),
+            )
+            cursor = self._conn.execute(
+                "DELETE FROM drafts WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self.expirations += cursor.rowcount
+            self._count += (exists is None) - cursor.rowcount
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * _EVICT_TO)
+            self._conn.execute(
+                "DELETE FROM drafts WHERE key IN "
+                "(SELECT key FROM drafts ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+            count -= excess
+        self._count = count
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+def create_email_cache() -> EmailDraftCache:
+    """
+    Create the draft cache configured by the environment.
+
+    ``EMAIL_CACHE_PATH``, ``EMAIL_CACHE_MAX_ENTRIES`` and
+    ``EMAIL_CACHE_TTL_SECONDS`` override the defaults.
+    """
+    return EmailDraftCache(
+        path=os.getenv("EMAIL_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_entries=int(os.getenv("EMAIL_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))),
+        ttl_seconds=float(
+            os.getenv("EMAIL_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS))
+        ),
+    )
@@ -3,46 +3,20 @@ Simple chat agent for collecting hackathon configuration details from clients.
 """
 
 import os
+import threading
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
+from concurrency import limited_stream, model_limiter
 
 # Load environment variables
 load_dotenv()
 
-class HackathonChatAgent:
-    """Simple chat agent for hackathon information collection."""
-    
-    def __init__(self):
-        # Initialize the Gemini model
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable is required")
-        
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            google_api_key=api_key,
-            temperature=0.7,
-            convert_system_message_to_human=True
-        )
-        
-        # Create prompt template
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self._get_system_prompt()),
-            ("human", "Conversation so far:\n{conversation_history}\n\nUser: {user_input}")
-        ])
-        
-        # Create the chain
-        self.chain = self.prompt | self.llm | StrOutputParser()
-        
-        # Store conversation history
-        self.conversation_history = []
-        self.hackathon_details = {}
-    
-    def _get_system_prompt(self):
-        """Get the system prompt for the agent."""
-        return """You are a friendly AI assistant helping clients set up their hackathon. Your goal is to collect all the important details about their hackathon in a conversational way.
+CHAT_MODEL = "gemini-2.5-pro"
+
+# System prompt for the agent
+SYSTEM_PROMPT = """You are a friendly AI assistant helping clients set up their hackathon. Your goal is to collect all the important details about their hackathon in a conversational way.
 
 You need to gather the following information:
 
@@ -77,20 +51,115 @@ CONVERSATION GUIDELINES:
 
 Remember: You're helping them plan an amazing hackathon! Be supportive and excited about their event."""
 
-    def chat(self, user_input: str) -> str:
-        """Process user input and return agent response."""
+# Prompt used to ask the agent for a summary of the collected details
+SUMMARY_PROMPT = """Based on our conversation, please create a well-organized summary of the hackathon details we've discussed. 
+
+Format it clearly with sections like:
+- Basic Information
+- Event Details  
+- Participation
+- Additional Features
+
+If any important details are missing, mention what else we might need to know."""
+
+_shared_chain = None
+_shared_chain_lock = threading.Lock()
+
+
+def get_shared_chain():
+    """Return the process-wide Gemini client, prompt and chat chain.
+    
+    The client, prompt and chain are stateless, so every session shares one
+    instance (and one pooled connection to the model endpoint); sessions only
+    carry their own conversation history.
+    """
+    global _shared_chain
+    with _shared_chain_lock:
+        if _shared_chain is None:
+            # Initialize the Gemini model
+            api_key = os.getenv("GOOGLE_API_KEY")
+            if not api_key:
+                raise ValueError("GOOGLE_API_KEY environment variable is required")
+            
+            llm = ChatGoogleGenerativeAI(
+                model=CHAT_MODEL,
+                google_api_key=api_key,
+                temperature=0.7,
+                convert_system_message_to_human=True
+            )
+            
+            # Create prompt template
+            prompt = ChatPromptTemplate.from_messages([
+                ("system", SYSTEM_PROMPT),
+                ("human", "Conversation so far:\n{conversation_history}\n\nUser: {user_input}")
+            ])
+            
+            # Create the chain
+            _shared_chain = (llm, prompt, prompt | llm | StrOutputParser())
+        return _shared_chain
+
+
+class HackathonChatAgent:
+    """Simple chat agent for hackathon information collection."""
+    
+    def __init__(self):
+        # Reuse the shared model client and compiled chain
+        self.llm, self.prompt, self.chain = get_shared_chain()
+        
+        # Store conversation history
+        self.conversation_history = []
+        self.hackathon_details = {}
+    
+    def to_state(self) -> dict:
+        """Return the serializable session state of this agent."""
+        return {
+            "conversation_history": self.conversation_history,
+            "hackathon_details": self.hackathon_details,
+        }
+    
+    @classmethod
+    def from_state(cls, state: dict) -> "HackathonChatAgent":
+        """Recreate an agent from state produced by ``to_state``."""
+        agent = cls()
+        agent.conversation_history = list(state.get("conversation_history", []))
+        agent.hackathon_details = dict(state.get("hackathon_details", {}))
+        return agent
+    
+    def _get_system_prompt(self):
+        """Get the system prompt for the agent."""
+        return SYSTEM_PROMPT
+
+    def _build_inputs(self, user_input: str) -> dict:
+        """Build the chain inputs for the next turn."""
         # Format conversation history for context
         history_text = "\n".join([
             f"User: {msg['user']}\nAgent: {msg['agent']}" 
             for msg in self.conversation_history[-3:]  # Keep last 3 exchanges for context
         ])
         
-        # Get response from the agent
-        response = self.chain.invoke({
+        return {
             "conversation_history": history_text,
             "user_input": user_input
+        }
+    
+    def chat(self, user_input: str) -> str:
+        """Process user input and return agent response."""
+        # Get response from the agent
+        response = self.chain.invoke(self._build_inputs(user_input))
+        
+        # Store in conversation history
+        self.conversation_history.append({
+            "user": user_input,
+            "agent": response
         })
         
+        return response
+    
+    async def achat(self, user_input: str) -> str:
+        """Process user input without blocking the event loop."""
+        async with model_limiter(CHAT_MODEL):
+            response = await self.chain.ainvoke(self._build_inputs(user_input))
+        
         # Store in conversation history
         self.conversation_history.append({
             "user": user_input,
@@ -99,6 +168,24 @@ Remember: You're helping them plan an amazing hackathon! Be supportive and excit
         
         return response
     
+    async def astream_chat(self, user_input: str):
+        """Process user input and yield the agent response as it is generated.
+        
+        The full reply is appended to the conversation history once the
+        stream completes.
+        """
+        parts = []
+        stream = self.chain.astream(self._build_inputs(user_input))
+        async for chunk in limited_stream(CHAT_MODEL, stream):
+            parts.append(chunk)
+            yield chunk
+        
+        # Store in conversation history
+        self.conversation_history.append({
+            "user": user_input,
+            "agent": "".join(parts)
+        })
+    
     def get_welcome_message(self) -> str:
         """Get initial welcome message."""
         # Return a consistent welcome message without adding to conversation history yet
@@ -118,17 +205,19 @@ Remember: You're helping them plan an amazing hackathon! Be supportive and excit
             return "No hackathon details collected yet."
         
         # Use the agent to create a summary
-        summary_prompt = """Based on our conversation, please create a well-organized summary of the hackathon details we've discussed. 
-
-Format it clearly with sections like:
-- Basic Information
-- Event Details  
-- Participation
-- Additional Features
-
-If any important details are missing, mention what else we might need to know."""
+        return self.chat(SUMMARY_PROMPT)
+    
+    async def aget_hackathon_summary(self) -> str:
+        """Generate a summary of collected hackathon details without blocking."""
+        if not self.conversation_history:
+            return "No hackathon details collected yet."
         
-        return self.chat(summary_prompt)
+        return await self.achat(SUMMARY_PROMPT)
+    
+    def astream_hackathon_summary(self):
+        """Stream a summary of collected hackathon details."""
+        return self.astream_chat(SUMMARY_PROMPT)
+
 
 
 def main():
@@ -0,0 +1,249 @@
+"""
+Persistent, content-addressed cache for embedding vectors.
+
+Vectors are stored in SQLite keyed by (model name, SHA-256 of the chunk
+text), so identical chunks are only ever sent to the embedding API once no
+matter which file or ingestion run they come from. The cache is bounded by
+entry count and evicts the least recently used vectors first.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), "embedding_cache.sqlite")
+DEFAULT_MAX_ENTRIES = 200_000
+
+# SQLite limits the number of bound parameters per statement
+_SQL_BATCH = 500
+
+# Recency updates from lookups are buffered and written in one transaction
+# once this many are pending (and before every write or eviction)
+_TOUCH_BATCH = 1000
+
+# Eviction trims the cache to this fraction of max_entries, so the exact
+# COUNT(*) it needs runs once per few thousand inserts, not on every put
+_EVICT_TO = 0.9
+
+
+def text_hash(text: str) -> str:
+    """Returns the cache key for a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU store of float32 embedding vectors."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        # Approximate entry count, kept up to date by put_many; other
+        # processes may share the file, so it is re-read before evicting
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._touched: Dict[tuple, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """
+        Looks up vectors for the given text hashes.
+
+        Args:
+            model: The embedding model name.
+            hashes: Text hashes to look up.
+
+        Returns:
+            A mapping of text hash -> vector for every hash found in the cache.
+        """
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), _SQL_BATCH):
+                batch = unique[start : start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                    self._touched[(model, key)] = now
+            if len(self._touched) >= _TOUCH_BATCH:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += sum(1 for key in hashes if key in found)
+            self.misses += sum(1 for key in hashes if key not in found)
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        """
+        Stores vectors and evicts the least recently used entries if over capacity.
+
+        Args:
+            model: The embedding model name.
+            items: A mapping of text hash -> vector.
+        """
+        if not items:
+            return
+        now = time.time()
+        keys = list(items)
+        with self._lock:
+            # Only keys not stored yet grow the cache; primary key lookups
+            existing = 0
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start : start + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                (found,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings "
+                    f"WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchone()
+                existing += found
+            self._flush_touched()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (model, key, array("f", vector).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            self._count += len(keys) - existing
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                [(now, model, key) for (model, key), now in self._touched.items()],
+            )
+            self._touched = {}
+
+    def _evict(self) -> None:
+        self._flush_touched()
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        if count > self.max_entries:
+            excess = count - int(self.max_entries * _EVICT_TO)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self.evictions += excess
+            count -= excess
+        self._count = count
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": self._count,
+                "max_entries": self.max_entries,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+
+    When a ``scheduler`` is given, cache misses are embedded through it in
+    batches and every finished batch is written to the cache immediately, so
+    an interrupted ingestion resumes from the last completed batch.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        cache: EmbeddingCache,
+        model: str,
+        scheduler: Optional[Any] = None,
+    ):
+        self.underlying = underlying
+        self.cache = cache
+        self.model = model
+        self.scheduler = scheduler
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.get_many(self.model, hashes)
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing and self.scheduler is not None:
+            computed = self.scheduler.run(
+                missing,
+                embed_fn=self.underlying.embed_documents,
+                on_batch=lambda batch: self.cache.put_many(self.model, batch),
+            )
+            found.update(computed)
+        elif missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(self.model, computed)
+            found.update(computed)
+
+        return [found[key] for key in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = text_hash(text)
+        found = self.cache.get_many(self.model, [key])
+        if key in found:
+            return found[key]
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many(self.model, {key: vector})
+        return vector
+
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Returns the process-wide embedding cache, creating it on first use."""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache(
+                path=os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_entries=int(
+                    os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))
+                ),
+            )
+        return _shared_cache
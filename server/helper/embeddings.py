@@ -1,17 +1,307 @@
 import os
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
+import json
+import hashlib
+import shutil
+import time
+import random
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from langchain_community.document_loaders import PyPDFLoader, UnstructuredFileLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+from helper.embedding_cache import CachedEmbeddings, get_embedding_cache
+from helper.vector_index import IndexConfig, build_vector_store, supports_removal
+from helper.index_storage import (
+    DOCSTORE_FILE,
+    INDEX_FILE,
+    MANIFEST_FILE,
+    current_index_dir,
+    load_vector_store,
+    new_index_dir,
+    publish_index_dir,
+    write_docstore,
+    write_index,
+)
 
 # You will need to set your OpenAI API key as an environment variable
 # export OPENAI_API_KEY="your-api-key"
 
+EMBEDDING_MODEL = "text-embedding-3-large"
+# Shortened embeddings (e.g. 1024) via the model's ``dimensions`` parameter
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# Worker processes used to parse and split documents (1 = serial)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+
+# "openai" for the real API, "fake" for the offline deterministic backend
+EMBEDDINGS_BACKEND = os.getenv("EMBEDDINGS_BACKEND", "openai")
+
+# Retrain an IVF index once it holds this many times the vectors it was
+# trained on, since its cells no longer fit the data well
+IVF_RETRAIN_GROWTH = 4
+
+logger = logging.getLogger(__name__)
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic offline embedding backend.
+
+    Each text maps to a pseudo-random unit vector seeded by its SHA-256, so
+    identical texts always get identical vectors and no network is needed.
+    Useful for exercising ingestion and the scheduler without an API key.
+    """
+
+    def __init__(self, dimensions: int = 3072):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimensions)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+def _count_tokens_estimate(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# Loaded on first use: tiktoken downloads the BPE file the first time, which
+# must not make importing this module depend on the network
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Returns the cl100k_base encoding, or False if it cannot be loaded."""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+
+                _encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(
+                    "tiktoken unavailable (%s); estimating token counts",
+                    e,
+                    extra={"event": "embedding.tokenizer_unavailable"},
+                )
+                _encoding = False
+        return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Returns the number of tokens the embedding API will bill for ``text``."""
+    encoding = _get_encoding()
+    if not encoding:
+        # Roughly four characters per token for English text
+        return _count_tokens_estimate(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to stay under a tokens-per-minute limit."""
+
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int) -> None:
+        """Blocks until ``tokens`` tokens are available and consumes them."""
+        tokens = min(float(tokens), self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class EmbeddingScheduler:
+    """
+    Embeds large sets of texts in token-budgeted batches.
+
+    Batches are issued concurrently, throttled by a shared token bucket, and
+    retried independently with exponential backoff. Every completed batch is
+    handed to ``on_batch`` right away (the embedding cache stores it), which
+    acts as the checkpoint: if a batch ultimately fails, the work already done
+    is kept and a rerun only embeds what is still missing.
+    """
+
+    def __init__(
+        self,
+        max_batch_tokens: int = 100_000,
+        max_batch_size: int = 512,
+        max_concurrency: int = 4,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+    ):
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.limiter = TokenBucket(tokens_per_minute)
+
+    def make_batches(self, items: Dict[str, str]) -> List[List[Tuple[str, str, int]]]:
+        """Groups (key, text) pairs into batches that fit the token budget."""
+        batches = []
+        current: List[Tuple[str, str, int]] = []
+        current_tokens = 0
+        for key, text in items.items():
+            tokens = count_tokens(text)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append((key, text, tokens))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch, embed_fn) -> Dict[str, List[float]]:
+        tokens = sum(item[2] for item in batch)
+        texts = [item[1] for item in batch]
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(tokens)
+            try:
+                vectors = embed_fn(texts)
+                return {item[0]: vector for item, vector in zip(batch, vectors)}
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self.base_delay * (2 ** attempt) * (1 + random.random())
+                logger.warning(
+                    "Embedding batch of %d texts failed (%s); retrying in %.1fs",
+                    len(texts),
+                    e,
+                    delay,
+                    extra={"event": "embedding.retry", "attempt": attempt + 1},
+                )
+                time.sleep(delay)
+
+    def run(
+        self,
+        items: Dict[str, str],
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        on_batch: Optional[Callable[[Dict[str, List[float]]], None]] = None,
+    ) -> Dict[str, List[float]]:
+        """
+        Embeds ``items`` (key -> text) and returns key -> vector.
+
+        Args:
+            items: Texts to embed, keyed by a caller-chosen id.
+            embed_fn: Function embedding a list of texts in one request.
+            on_batch: Optional callback receiving each completed batch.
+
+        Returns:
+            A mapping of key -> vector for every item.
+
+        Raises:
+            The last error of the first batch that exhausted its retries, after
+            every other batch has finished.
+        """
+        results: Dict[str, List[float]] = {}
+        errors = []
+        batches = self.make_batches(items)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = [
+                executor.submit(self._embed_batch, batch, embed_fn) for batch in batches
+            ]
+            for future in as_completed(futures):
+                try:
+                    computed = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                logger.debug(
+                    "Embedded batch of %d texts",
+                    len(computed),
+                    extra={"event": "embedding.batch"},
+                )
+                if on_batch:
+                    on_batch(computed)
+                results.update(computed)
+        if errors:
+            raise errors[0]
+        return results
+
+
+_scheduler: Optional[EmbeddingScheduler] = None
+
+
+def get_embedding_scheduler() -> EmbeddingScheduler:
+    """Returns the process-wide embedding scheduler configured from the environment."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = EmbeddingScheduler(
+            max_batch_tokens=int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000")),
+            max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+            tokens_per_minute=int(os.getenv("EMBEDDING_TPM", "1000000")),
+            max_retries=int(os.getenv("EMBEDDING_MAX_RETRIES", "5")),
+        )
+    return _scheduler
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Returns the embedding model used for both ingestion and queries, backed by
+    the shared on-disk embedding cache and the batching scheduler.
+    """
+    if EMBEDDINGS_BACKEND == "fake":
+        underlying = HashEmbeddings(dimensions=EMBEDDING_DIMENSIONS or 3072)
+        model = "fake-hash"
+    else:
+        underlying = OpenAIEmbeddings(
+            model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS
+        )
+        model = EMBEDDING_MODEL
+    if EMBEDDING_DIMENSIONS:
+        # Shortened vectors must not be served for full-size requests
+        model = f"{model}@{EMBEDDING_DIMENSIONS}"
+    return CachedEmbeddings(
+        underlying,
+        cache=get_embedding_cache(),
+        model=model,
+        scheduler=get_embedding_scheduler(),
+    )
+
 
 def create_vector_embeddings(data_directory: str = "data") -> FAISS:
     """
     Reads all PDF and text files from the specified directory, generates
-    vector embeddings using OpenAI, and stores them in a FAISS vector store.
+    vector embeddings using OpenAI, and stores them in a FAISS vector store
+    of the type configured by ``IndexConfig.from_env``.
 
     Args:
         data_directory: The path to the directory containing the files.
@@ -19,27 +309,317 @@ def create_vector_embeddings(data_directory: str = "data") -> FAISS:
     Returns:
         A FAISS vector store containing the embeddings.
     """
-    # 1. Load Documents
-    pdf_loader = DirectoryLoader(
-        data_directory, glob="**/*.pdf", loader_cls=PyPDFLoader
+    # 1. Load and split documents (PDFs first, then text files)
+    files = _scan_data_directory(data_directory, hash_contents=False)
+    paths = [
+        os.path.join(data_directory, rel_path)
+        for ext in SUPPORTED_EXTENSIONS
+        for rel_path in files
+        if rel_path.lower().endswith(ext)
+    ]
+    texts = [
+        chunk for _, chunks in load_and_split_documents(paths) for chunk in chunks
+    ]
+
+    # 2. Generate Embeddings
+    embeddings = get_embeddings()
+
+    # 3. Create and Populate Vector Store
+    db, _ = build_vector_store(texts, embeddings)
+
+    # 4. Return Vector Store
+    return db
+
+
+def save_vector_store(
+    vector_store: FAISS, index_path: str, manifest: Optional[Dict] = None
+) -> None:
+    """
+    Saves a FAISS vector store so readers never observe a half-written index.
+
+    The index, the docstore and the manifest are written to a new version
+    directory inside ``index_path``, which is then published with a single
+    atomic rename, so readers always see all three files of one version.
+    Chunks go to a SQLite docstore rather than the pickle ``save_local``
+    writes.
+
+    Args:
+        vector_store: The vector store to persist.
+        index_path: The path to the FAISS index directory.
+        manifest: The ingestion manifest describing the store, if any.
+    """
+    version_dir = new_index_dir(index_path)
+    try:
+        write_index(os.path.join(version_dir, INDEX_FILE), vector_store.index)
+        write_docstore(
+            os.path.join(version_dir, DOCSTORE_FILE),
+            vector_store.index_to_docstore_id,
+            vector_store.docstore,
+        )
+        if manifest is not None:
+            save_manifest(version_dir, manifest)
+        publish_index_dir(index_path, version_dir)
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+
+def _file_sha256(path: str) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _scan_data_directory(
+    data_directory: str, hash_contents: bool = True
+) -> Dict[str, Optional[str]]:
+    """Returns a mapping of relative path -> content hash for supported files."""
+    files = {}
+    for root, _, filenames in os.walk(data_directory):
+        for filename in filenames:
+            if not filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            path = os.path.join(root, filename)
+            rel_path = os.path.relpath(path, data_directory).replace(os.sep, "/")
+            files[rel_path] = _file_sha256(path) if hash_contents else None
+    return dict(sorted(files.items()))
+
+
+def _load_and_split_file(path: str) -> List:
+    """
+    Loads and splits a single PDF or text file.
+
+    PDFs are parsed lazily and each page is split as soon as it is read,
+    rather than materializing the whole parsed document first. Runs inside
+    pool workers, so it must stay a module-level function.
+    """
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
     )
-    txt_loader = DirectoryLoader(data_directory, glob="**/*.txt")
-    pdf_documents = pdf_loader.load()
-    txt_documents = txt_loader.load()
-    documents = pdf_documents + txt_documents
+    if path.lower().endswith(".pdf"):
+        pages = PyPDFLoader(path).lazy_load()
+    else:
+        pages = UnstructuredFileLoader(path).lazy_load()
+
+    chunks = []
+    for page in pages:
+        chunks.extend(text_splitter.split_documents([page]))
+    return chunks
 
-    # 2. Split Documents
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    texts = text_splitter.split_documents(documents)
 
-    # 3. Generate Embeddings
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+def load_and_split_documents(
+    paths: List[str], workers: Optional[int] = None
+) -> Iterator[Tuple[str, List]]:
+    """
+    Loads and splits files across a process pool.
 
-    # 4. Create and Populate Vector Store
-    db = FAISS.from_documents(texts, embeddings)
+    Results are yielded per file in the order of ``paths`` as soon as each
+    file (and every file before it) is done, so the chunk sequence and the
+    resulting index are identical to the serial path.
 
-    # 5. Return Vector Store
-    return db
+    Args:
+        paths: The files to load.
+        workers: Number of worker processes; defaults to ``INGEST_WORKERS``.
+            A value of 1 runs serially in the current process.
+
+    Yields:
+        Tuples of (path, chunks) in input order.
+    """
+    workers = INGEST_WORKERS if workers is None else workers
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield path, _load_and_split_file(path)
+        return
+
+    # Ingestion runs on a background thread, so avoid fork()ing a threaded process
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(paths)),
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as executor:
+        for path, chunks in zip(paths, executor.map(_load_and_split_file, paths)):
+            yield path, chunks
+
+
+def load_manifest(index_path: str) -> Dict:
+    """Returns the ingestion manifest stored with an index, or an empty one."""
+    manifest_path = os.path.join(current_index_dir(index_path), MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {"files": {}}
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(index_path: str, manifest: Dict) -> None:
+    """Atomically writes the ingestion manifest into an index version directory."""
+    os.makedirs(index_path, exist_ok=True)
+    manifest_path = os.path.join(index_path, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _needs_rebuild(manifest: Dict, config: IndexConfig, deletes: bool) -> bool:
+    """Whether an existing index must be rebuilt rather than updated in place."""
+    index_info = manifest.get("index", {"index_type": "flat"})
+    built_type = index_info["index_type"]
+    if manifest.get("embedding_dimensions") != EMBEDDING_DIMENSIONS:
+        return True
+    if index_info.get("requested_type", built_type) != config.index_type:
+        return True
+    if deletes and not supports_removal(built_type):
+        return True
+
+    indexed = sum(len(entry["ids"]) for entry in manifest["files"].values())
+    trained_on = index_info.get("trained_on") or 0
+    if trained_on:
+        return indexed > IVF_RETRAIN_GROWTH * trained_on
+    # Too small to train the requested type last time; retry once it has grown
+    if built_type != config.index_type:
+        return indexed > 2 * index_info.get("vectors", 0)
+    return False
+
+
+def update_vector_embeddings(
+    data_directory: str,
+    index_path: str,
+    progress: Optional[Callable[[str, Dict], None]] = None,
+) -> Tuple[FAISS, Dict]:
+    """
+    Incrementally brings the FAISS index at ``index_path`` in line with the
+    files in ``data_directory``.
+
+    Only files whose content hash differs from the manifest are loaded, split
+    and embedded. Vectors belonging to removed or replaced files are deleted
+    from the existing store before the new chunks are merged in. The updated
+    store and manifest are persisted before returning.
+
+    The index is rebuilt from every file instead (vectors mostly come from the
+    embedding cache) when the configured index type or embedding size differs
+    from the one on disk, when files must be removed from an index that
+    cannot delete vectors, or when an IVF index has outgrown its training.
+
+    Args:
+        data_directory: The path to the directory containing the files.
+        index_path: The path to the FAISS index directory.
+        progress: Optional callback invoked as ``progress(stage, stats)`` when
+            ingestion enters the "loading", "embedding" and "saving" stages.
+
+    Returns:
+        A tuple of the up-to-date FAISS vector store and a dict of ingestion
+        statistics (files added/changed/removed, chunks embedded/deleted).
+    """
+    embeddings = get_embeddings()
+    index_config = IndexConfig.from_env()
+    current_files = _scan_data_directory(data_directory)
+
+    # Read the index and its manifest from the same published version. An
+    # index saved with a pickled docstore is rebuilt rather than unpickled
+    index_dir = current_index_dir(index_path)
+    index_exists = os.path.exists(
+        os.path.join(index_dir, INDEX_FILE)
+    ) and os.path.exists(os.path.join(index_dir, DOCSTORE_FILE))
+    manifest = load_manifest(index_dir) if index_exists else {"files": {}}
+    # An index built without a manifest cannot be updated in place
+    if index_exists and not manifest["files"]:
+        index_exists = False
+
+    known_files = manifest["files"]
+    added = [p for p in current_files if p not in known_files]
+    changed = [
+        p
+        for p in current_files
+        if p in known_files and known_files[p]["sha256"] != current_files[p]
+    ]
+    removed = [p for p in known_files if p not in current_files]
+
+    # Manifests written before index types existed describe a flat index
+    index_info = manifest.get("index", {"index_type": "flat"})
+    if index_exists and _needs_rebuild(
+        manifest, index_config, bool(removed or changed)
+    ):
+        index_exists = False
+
+    stats = {
+        "files_added": len(added),
+        "files_changed": len(changed),
+        "files_removed": len(removed),
+        "chunks_embedded": 0,
+        "chunks_deleted": 0,
+        "changed": bool(added or changed or removed) or not index_exists,
+    }
+
+    vector_store = None
+    if index_exists:
+        vector_store = load_vector_store(index_dir, embeddings, writable=True)
+        if not stats["changed"]:
+            return vector_store, stats
+
+        # 1. Delete vectors for removed and replaced files
+        stale_ids = [
+            chunk_id
+            for rel_path in removed + changed
+            for chunk_id in known_files[rel_path]["ids"]
+        ]
+        existing_ids = set(vector_store.index_to_docstore_id.values())
+        stale_ids = [chunk_id for chunk_id in stale_ids if chunk_id in existing_ids]
+        if stale_ids:
+            vector_store.delete(stale_ids)
+        stats["chunks_deleted"] = len(stale_ids)
+        to_embed = added + changed
+    else:
+        # Nothing usable on disk yet: embed every file
+        to_embed = list(current_files)
+
+    # 2. Load and split only the new or changed files
+    if progress:
+        progress("loading", stats)
+    new_files = {}
+    texts: List = []
+    ids: List[str] = []
+    paths = [os.path.join(data_directory, rel_path) for rel_path in to_embed]
+    for rel_path, (_, chunks) in zip(to_embed, load_and_split_documents(paths)):
+        chunk_ids = [f"{rel_path}#{i}" for i in range(len(chunks))]
+        texts.extend(chunks)
+        ids.extend(chunk_ids)
+        new_files[rel_path] = {"sha256": current_files[rel_path], "ids": chunk_ids}
+
+    # 3. Embed and merge into the store
+    stats["chunks_total"] = len(texts)
+    if progress:
+        progress("embedding", stats)
+    if texts:
+        if vector_store is None:
+            vector_store, index_info = build_vector_store(
+                texts, embeddings, ids=ids, config=index_config
+            )
+        else:
+            vector_store.add_documents(texts, ids=ids)
+    stats["chunks_embedded"] = len(texts)
+
+    if vector_store is None:
+        raise ValueError(f"No PDF or text files found in '{data_directory}'.")
+
+    # 4. Publish the store and the manifest describing it together
+    if progress:
+        progress("saving", stats)
+    files = {p: known_files[p] for p in current_files if p in known_files}
+    files.update(new_files)
+    save_vector_store(
+        vector_store,
+        index_path,
+        manifest={
+            "embedding_model": EMBEDDING_MODEL,
+            "embedding_dimensions": EMBEDDING_DIMENSIONS,
+            "index": index_info,
+            "files": files,
+        },
+    )
+
+    return vector_store, stats
 
 
 if __name__ == "__main__":
@@ -61,4 +641,4 @@ if __name__ == "__main__":
             vector_store = create_vector_embeddings()
             print("Vector store created successfully.")
             # You can now save the vector store for later use:
-            vector_store.save_local("faiss_index")
+            save_vector_store(vector_store, "faiss_index")
@@ -0,0 +1,111 @@
+"""
+Hybrid keyword + vector retrieval for the RAG chain.
+
+Dense retrieval finds chunks about the same topic as the question but is
+blind to exact tokens: "what's the WiFi password for AIEngine-Summerhack?"
+or "where is room B-204?" retrieve every WiFi or room chunk equally. The
+retriever runs a BM25 keyword search over the docstore's full-text index
+next to the FAISS search and merges both rankings with reciprocal rank
+fusion, which needs no score calibration between the two.
+
+Modes: ``hybrid`` (default), ``dense`` (FAISS only, the old behaviour) and
+``keyword`` (BM25 only). Mode and result count can be set per request
+through the ``retrieval_mode`` and ``retrieval_k`` configurable fields of
+the chain built by ``create_rag_agent``.
+
+Use ``python -m benchmarks.hybrid_retrieval`` to compare the modes.
+"""
+
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import ConfigurableField
+
+RETRIEVAL_MODES = ("hybrid", "dense", "keyword")
+
+# The constant from the original RRF paper; damps the weight of top ranks
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: int = DEFAULT_RRF_K
+) -> List[int]:
+    """
+    Merges ranked lists by summing ``1 / (k + rank)`` for every list an item is in.
+
+    Returns:
+        All items, best first; ties keep the order they were first seen in.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.__getitem__, reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """Retrieves chunks by fusing FAISS and BM25 rankings."""
+
+    # A FAISS store loaded by load_vector_store, whose docstore is a
+    # SQLiteDocstore with a keyword index
+    vector_store: Any
+    mode: str = "hybrid"
+    # Chunks returned to the chain
+    k: int = 4
+    # Candidates taken from each ranking before fusion
+    fetch_k: int = 20
+    rrf_k: int = DEFAULT_RRF_K
+
+    def dense_search(self, query: str) -> List[int]:
+        """Index positions of the nearest chunks by embedding, best first."""
+        embedding = self.vector_store.embedding_function.embed_query(query)
+        vector = np.array([embedding], dtype=np.float32)
+        _, positions = self.vector_store.index.search(vector, self.fetch_k)
+        return [int(position) for position in positions[0] if position != -1]
+
+    def keyword_search(self, query: str) -> List[int]:
+        """Index positions of the best BM25 matches, best first."""
+        return self.vector_store.docstore.keyword_search(query, self.fetch_k)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if self.mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown retrieval mode '{self.mode}'; "
+                f"expected one of {RETRIEVAL_MODES}"
+            )
+
+        rankings = []
+        if self.mode in ("hybrid", "keyword"):
+            rankings.append(self.keyword_search(query))
+        # Without a keyword index (or any matching word) fall back to dense
+        if self.mode != "keyword" or not rankings[0]:
+            rankings.append(self.dense_search(query))
+
+        positions = reciprocal_rank_fusion(rankings, self.rrf_k)[: self.k]
+        return self.vector_store.docstore.documents_at(positions)
+
+
+def create_hybrid_retriever(vector_store: Any):
+    """
+    Builds the retriever for ``create_rag_agent``, configured by the environment.
+
+    ``RAG_RETRIEVAL_MODE``, ``RAG_RETRIEVAL_K`` and ``RAG_RETRIEVAL_FETCH_K``
+    override the defaults. The mode and k can also be set per call with
+    ``config={"configurable": {"retrieval_mode": ..., "retrieval_k": ...}}``.
+    """
+    retriever = HybridRetriever(
+        vector_store=vector_store,
+        mode=os.getenv("RAG_RETRIEVAL_MODE", "hybrid"),
+        k=int(os.getenv("RAG_RETRIEVAL_K", "4")),
+        fetch_k=int(os.getenv("RAG_RETRIEVAL_FETCH_K", "20")),
+    )
+    return retriever.configurable_fields(
+        mode=ConfigurableField(id="retrieval_mode", name="Retrieval mode"),
+        k=ConfigurableField(id="retrieval_k", name="Chunks retrieved"),
+    )
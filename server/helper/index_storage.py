@@ -0,0 +1,372 @@
+"""
+On-disk format of the wiki vector store and how the API server loads it.
+
+``FAISS.load_local`` copies all of ``index.faiss`` onto the heap and unpickles
+every chunk in ``index.pkl`` before the first query, in every worker
+process. Instead:
+
+- ``index.faiss`` is memory-mapped read-only, so the vectors are paged in
+  from the OS page cache on demand and shared by all workers on the host;
+- chunks are stored in ``docstore.sqlite`` (one row per chunk, keyed by its
+  docstore id and its position in the index), and each query only reads the
+  handful of rows it retrieved. The same file holds an FTS5 full-text index
+  of the chunks for BM25 keyword search.
+
+Every save publishes a complete new version: the index, docstore and
+ingestion manifest are written to a fresh ``v-*`` subdirectory, and the
+``CURRENT`` file naming it is then replaced in one atomic rename. Readers
+resolve ``CURRENT`` once and read all files from that directory, so they can
+never pair an index with the chunks or manifest of another version. Indexes
+saved before versioning keep their files directly in the index directory.
+
+Nothing is pickled, so loading an index can never execute code. Indexes
+written with ``save_local`` still have their chunks in ``index.pkl``; convert
+them once with::
+
+    python -m helper.index_storage helper/faiss_index
+"""
+
+import os
+import re
+import json
+import pickle
+import shutil
+import argparse
+import sqlite3
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+INDEX_FILE = "index.faiss"
+PICKLE_FILE = "index.pkl"
+DOCSTORE_FILE = "docstore.sqlite"
+# Per-file content hashes and chunk ids, written by ingestion
+MANIFEST_FILE = "manifest.json"
+# Names the subdirectory holding the published version of the index
+CURRENT_FILE = "CURRENT"
+_VERSION_PREFIX = "v-"
+
+# Rows per executemany() when writing the docstore
+_WRITE_BATCH = 1000
+
+_WORD = re.compile(r"\w+")
+
+# Dropped from keyword queries: with OR matching they would pull in almost
+# every chunk, and fusion weighs ranks, not BM25 scores
+STOPWORDS = frozenset(
+    "a an and are at be can do does for from how i in is it me my of on or the "
+    "there to was what when where which who why will with you your".split()
+)
+
+
+class SQLiteDocstore(Docstore):
+    """Read-only docstore that fetches chunks from ``docstore.sqlite`` on demand."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # The file is only ever replaced by rename, never modified in place,
+        # so readers can skip locking entirely
+        uri = f"file:{os.path.abspath(path)}?mode=ro&immutable=1"
+        self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        # Docstores migrated before keyword search existed have no FTS table
+        self.has_keyword_index = (
+            self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'documents_fts'"
+            ).fetchone()
+            is not None
+        )
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT page_content, metadata FROM documents WHERE id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+    def documents_at(self, positions: Sequence[int]) -> List[Document]:
+        """Returns the documents at the given index positions, in that order."""
+        if not positions:
+            return []
+        placeholders = ",".join("?" * len(positions))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT position, page_content, metadata FROM documents "
+                f"WHERE position IN ({placeholders})",
+                list(positions),
+            ).fetchall()
+        found = {
+            position: Document(page_content=page_content, metadata=json.loads(metadata))
+            for position, page_content, metadata in rows
+        }
+        return [found[position] for position in positions if position in found]
+
+    def keyword_search(self, query: str, limit: int) -> List[int]:
+        """
+        Ranks chunks by BM25 against the words of ``query``.
+
+        Any word may match, so exact tokens like room numbers, dates or WiFi
+        names pull in their chunks even when the rest of the question does
+        not appear in them.
+
+        Returns:
+            Index positions of the best matches, best first.
+        """
+        words = dict.fromkeys(word.lower() for word in _WORD.findall(query))
+        words = [word for word in words if word not in STOPWORDS] or list(words)
+        if not words or not self.has_keyword_index:
+            return []
+        match = " OR ".join(f'"{word}"' for word in words)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid FROM documents_fts WHERE documents_fts MATCH ? "
+                "ORDER BY bm25(documents_fts) LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        return [position for (position,) in rows]
+
+    def index_to_docstore_id(self) -> Dict[int, str]:
+        """Returns the mapping of index position -> docstore id."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT position, id FROM documents"))
+
+    def iter_documents(self) -> Iterator[Tuple[str, Document]]:
+        """Yields every (docstore id, document) in index order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, page_content, metadata FROM documents ORDER BY position"
+            ).fetchall()
+        for doc_id, page_content, metadata in rows:
+            yield doc_id, Document(page_content=page_content, metadata=json.loads(metadata))
+
+    def close(self) -> None:
+        """Closes the connection; the docstore cannot be read afterwards."""
+        with self._lock:
+            self._conn.close()
+
+
+def current_index_dir(index_path: str) -> str:
+    """
+    Returns the directory holding the published version of an index.
+
+    Resolve it once and read every file of the index from the result.
+    Indexes saved before versioning (no ``CURRENT`` file) are read from
+    ``index_path`` itself.
+    """
+    try:
+        with open(os.path.join(index_path, CURRENT_FILE)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return index_path
+    return os.path.join(index_path, name)
+
+
+def new_index_dir(index_path: str) -> str:
+    """Creates an empty, unpublished version directory inside ``index_path``."""
+    os.makedirs(index_path, exist_ok=True)
+    return tempfile.mkdtemp(prefix=_VERSION_PREFIX, dir=index_path)
+
+
+def publish_index_dir(index_path: str, version_dir: str) -> None:
+    """
+    Atomically makes ``version_dir`` the current version of the index.
+
+    The previous version is kept, since readers that resolved it just before
+    the switch may still be opening its files; older ones are deleted.
+    """
+    previous = current_index_dir(index_path)
+    pointer = os.path.join(index_path, CURRENT_FILE)
+    tmp_pointer = pointer + ".tmp"
+    with open(tmp_pointer, "w") as f:
+        f.write(os.path.basename(version_dir))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_pointer, pointer)
+
+    keep = {os.path.basename(version_dir), os.path.basename(previous)}
+    for name in os.listdir(index_path):
+        if name.startswith(_VERSION_PREFIX) and name not in keep:
+            shutil.rmtree(os.path.join(index_path, name), ignore_errors=True)
+    if previous != index_path:
+        # Files of an index saved before versioning, now two versions old
+        for name in (INDEX_FILE, DOCSTORE_FILE, MANIFEST_FILE, PICKLE_FILE):
+            path = os.path.join(index_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def write_index(path: str, index: Any) -> None:
+    """Writes a FAISS index to ``path``."""
+    faiss = dependable_faiss_import()
+    faiss.write_index(index, path)
+
+
+def write_docstore(
+    path: str, index_to_docstore_id: Dict[int, str], docstore: Docstore
+) -> None:
+    """
+    Writes every chunk of a vector store to a new SQLite docstore at ``path``.
+
+    Args:
+        path: The file to create; it must not exist yet.
+        index_to_docstore_id: The vector store's position -> id mapping.
+        docstore: The docstore holding the chunks.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE documents (
+                position INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                page_content TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            )
+            """
+        )
+        batch = []
+        for position, doc_id in sorted(index_to_docstore_id.items()):
+            doc = docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {doc_id}, got {doc}")
+            batch.append(
+                (position, doc_id, doc.page_content, json.dumps(doc.metadata, default=str))
+            )
+            if len(batch) >= _WRITE_BATCH:
+                conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", batch)
+                batch = []
+        conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", batch)
+
+        # BM25 keyword index over the chunk text, reading from the table above
+        conn.execute(
+            "CREATE VIRTUAL TABLE documents_fts USING fts5("
+            "page_content, content='documents', content_rowid='position')"
+        )
+        conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _read_flags(faiss: Any, index_type: Optional[str]) -> int:
+    # IVF lists are mapped through the on-disk inverted lists; flat and HNSW
+    # storage is mapped in place where the installed faiss supports it
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def load_vector_store(
+    index_path: str,
+    embeddings: Embeddings,
+    writable: bool = False,
+    index_type: Optional[str] = None,
+) -> FAISS:
+    """
+    Loads a vector store saved by ``save_vector_store``.
+
+    Args:
+        index_path: The path to the FAISS index directory, or to one of its
+            version directories.
+        embeddings: Embeddings used to embed queries (and new chunks).
+        writable: Load a private, modifiable copy for ingestion instead of a
+            memory-mapped index with a lazy docstore. A mapped index must
+            never be modified.
+        index_type: The index type recorded in the manifest, which decides
+            how the index file can be mapped.
+
+    Returns:
+        A LangChain FAISS vector store.
+    """
+    faiss = dependable_faiss_import()
+    index_path = current_index_dir(index_path)
+    flags = 0 if writable else _read_flags(faiss, index_type)
+    index = faiss.read_index(os.path.join(index_path, INDEX_FILE), flags)
+
+    docstore_path = os.path.join(index_path, DOCSTORE_FILE)
+    if not os.path.exists(docstore_path):
+        raise FileNotFoundError(
+            f"No {DOCSTORE_FILE} in '{index_path}'. If the index was saved with "
+            f"{PICKLE_FILE}, migrate it with "
+            f"'python -m helper.index_storage {index_path}'."
+        )
+    sqlite_docstore = SQLiteDocstore(docstore_path)
+    index_to_docstore_id = sqlite_docstore.index_to_docstore_id()
+    if writable:
+        docstore = InMemoryDocstore(dict(sqlite_docstore.iter_documents()))
+    else:
+        docstore = sqlite_docstore
+
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def close_vector_store(vector_store: FAISS) -> None:
+    """
+    Releases the docstore connection and the mapped index of a loaded store.
+
+    The store cannot be searched afterwards. Published versions are deleted
+    once they are two versions old, so a store loaded from one should be
+    closed instead of waiting for garbage collection to let go of the files.
+    """
+    close = getattr(vector_store.docstore, "close", None)
+    if close is not None:
+        close()
+    # Frees the index, which unmaps index.faiss
+    vector_store.index = None
+
+
+def migrate_pickle_docstore(index_path: str, keep_pickle: bool = False) -> int:
+    """
+    Converts the ``index.pkl`` written by ``save_local`` into ``docstore.sqlite``.
+
+    Unpickling runs arbitrary code, so only migrate indexes you built
+    yourself. This is the one place the pickle is still read.
+
+    Args:
+        index_path: The path to the FAISS index directory.
+        keep_pickle: Leave ``index.pkl`` in place after migrating.
+
+    Returns:
+        The number of chunks written.
+    """
+    pickle_path = os.path.join(index_path, PICKLE_FILE)
+    docstore_path = os.path.join(index_path, DOCSTORE_FILE)
+    with open(pickle_path, "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    tmp_path = docstore_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    write_docstore(tmp_path, index_to_docstore_id, docstore)
+    os.replace(tmp_path, docstore_path)
+    if not keep_pickle:
+        os.remove(pickle_path)
+    return len(index_to_docstore_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert a FAISS index's pickled docstore to SQLite."
+    )
+    parser.add_argument("index_path", help="The FAISS index directory.")
+    parser.add_argument(
+        "--keep-pickle", action="store_true", help="Do not delete index.pkl."
+    )
+    args = parser.parse_args()
+
+    count = migrate_pickle_docstore(args.index_path, keep_pickle=args.keep_pickle)
+    print(f"Wrote {count} chunks to {os.path.join(args.index_path, DOCSTORE_FILE)}")
@@ -0,0 +1,198 @@
+"""
+Background job queue for wiki ingestion.
+
+Parsing, splitting and embedding documents can take minutes, so uploads only
+enqueue a job and return its id. Jobs run in a small thread pool off the
+event loop; jobs that target the same index are serialized so concurrent
+uploads never write to the same FAISS directory at once.
+"""
+
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from helper.embeddings import update_vector_embeddings
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class IngestionJob:
+    """State of a single ingestion job."""
+
+    job_id: str
+    data_directory: str
+    index_path: str
+    filename: str = ""
+    stage: str = "queued"
+    error: Optional[str] = None
+    # Set when ingestion succeeded but the on_complete callback failed
+    on_complete_error: Optional[str] = None
+    stats: Dict[str, Any] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage_started_at: Optional[float] = None
+    stage_timings: Dict[str, float] = field(default_factory=dict)
+
+    def enter_stage(self, stage: str) -> None:
+        """Records the time spent in the previous stage and switches to ``stage``."""
+        now = time.time()
+        if self.stage_started_at is not None:
+            self.stage_timings[self.stage] = now - self.stage_started_at
+        self.stage = stage
+        self.stage_started_at = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a JSON-serializable progress report."""
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+
+        throughput = None
+        embed_time = self.stage_timings.get("embedding")
+        if embed_time and self.stats.get("chunks_embedded"):
+            throughput = self.stats["chunks_embedded"] / embed_time
+
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "stage": self.stage,
+            "error": self.error,
+            "on_complete_error": self.on_complete_error,
+            "stats": dict(self.stats),
+            "queued_seconds": (self.started_at or time.time()) - self.created_at,
+            "elapsed_seconds": elapsed,
+            "stage_timings": dict(self.stage_timings),
+            "chunks_per_second": throughput,
+        }
+
+
+class IngestionJobQueue:
+    """Runs ingestion jobs in a worker pool, one at a time per index."""
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ingest"
+        )
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._index_locks: Dict[str, threading.Lock] = {}
+
+    def _index_lock(self, index_path: str) -> threading.Lock:
+        key = os.path.abspath(index_path)
+        with self._lock:
+            return self._index_locks.setdefault(key, threading.Lock())
+
+    def submit(
+        self,
+        data_directory: str,
+        index_path: str,
+        filename: str = "",
+        on_complete: Optional[Callable[[IngestionJob], None]] = None,
+    ) -> IngestionJob:
+        """
+        Enqueues an ingestion of ``data_directory`` into ``index_path``.
+
+        Args:
+            data_directory: The path to the directory containing the files.
+            index_path: The path to the FAISS index directory.
+            filename: The uploaded file that triggered the job, for reporting.
+            on_complete: Optional callback run in the worker after a successful
+                job, once the index lock is released. Its failure is reported
+                in ``on_complete_error`` and does not fail the job.
+
+        Returns:
+            The queued job.
+        """
+        job = IngestionJob(
+            job_id=str(uuid.uuid4()),
+            data_directory=data_directory,
+            index_path=index_path,
+            filename=filename,
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._trim()
+        self._executor.submit(self._run, job, on_complete)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        """Returns the job with the given id, if it is still tracked."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _trim(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.stage in ("completed", "failed")
+        ]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: IngestionJob, on_complete) -> None:
+        try:
+            with self._index_lock(job.index_path):
+                self._ingest(job)
+            # Reloading the index can take a while and must not hold up the
+            # next ingestion into it, nor turn a finished ingestion into a failure
+            if on_complete and job.error is None:
+                job.enter_stage("reloading")
+                try:
+                    on_complete(job)
+                except Exception as e:
+                    logger.exception(
+                        "on_complete callback of ingestion job %s failed",
+                        job.job_id,
+                        extra={"event": "ingest.on_complete_failed"},
+                    )
+                    job.on_complete_error = str(e)
+            if job.error is None:
+                job.enter_stage("completed")
+        finally:
+            job.finished_at = time.time()
+
+    def _ingest(self, job: IngestionJob) -> None:
+        job.started_at = time.time()
+        job.enter_stage("scanning")
+
+        def progress(stage: str, stats: Dict) -> None:
+            job.stats = dict(stats)
+            job.enter_stage(stage)
+
+        try:
+            _, stats = update_vector_embeddings(
+                data_directory=job.data_directory,
+                index_path=job.index_path,
+                progress=progress,
+            )
+            job.stats = dict(stats)
+            logger.info(
+                "Ingestion job %s completed",
+                job.job_id,
+                extra={"event": "ingest.completed", "stats": job.stats},
+            )
+        except Exception as e:
+            logger.exception(
+                "Ingestion job %s failed",
+                job.job_id,
+                extra={"event": "ingest.failed"},
+            )
+            job.error = str(e)
+            job.enter_stage("failed")
+
+
+# Shared queue for the whole process
+ingest_queue = IngestionJobQueue(
+    max_workers=int(os.getenv("INGEST_QUEUE_WORKERS", "2"))
+)
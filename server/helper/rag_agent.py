@@ -1,16 +1,31 @@
 
 import os
+import weakref
 import argparse
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from typing import Any, Dict
+from langchain_openai import ChatOpenAI
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain_core.prompts import ChatPromptTemplate
+from helper.embeddings import load_manifest
+from helper.hybrid_retriever import create_hybrid_retriever
+from helper.index_storage import (
+    close_vector_store,
+    current_index_dir,
+    load_vector_store,
+)
+from helper.rag_cache import get_query_embeddings
+from helper.vector_index import IndexConfig, configure_search
 
 # You will need to set your OpenAI API key as an environment variable
 # export OPENAI_API_KEY="your-api-key"
 
 INDEX_DIRECTORY = "faiss_index"
+RAG_LLM_MODEL = "gpt-4o"
+
+# Closes the vector store behind each agent, keyed by id(): chains can neither
+# be hashed nor carry extra attributes
+_closers: Dict[int, weakref.finalize] = {}
 
 def create_rag_agent(index_path: str):
     """
@@ -29,12 +44,21 @@ def create_rag_agent(index_path: str):
             f"Please run 'python embeddings.py' first to create it."
         )
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-    vector_store = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    # Repeated questions are served from the in-memory query LRU, backed by
+    # the shared embedding cache
+    embeddings = get_query_embeddings()
+    # Vectors are memory-mapped and chunks read from SQLite per query, so
+    # loading is cheap and worker processes share the index pages. The
+    # manifest and the index are read from the same published version
+    index_dir = current_index_dir(index_path)
+    index_type = load_manifest(index_dir).get("index", {}).get("index_type")
+    vector_store = load_vector_store(index_dir, embeddings, index_type=index_type)
+    # nprobe / efSearch can be tuned without rebuilding the index
+    configure_search(vector_store.index, IndexConfig.from_env())
 
 
-    # 2. Create a Retriever
-    retriever = vector_store.as_retriever()
+    # 2. Create a Retriever (BM25 + dense, fused; mode and k configurable per call)
+    retriever = create_hybrid_retriever(vector_store)
 
     # 3. Create a Prompt Template
     prompt_template = """
@@ -52,13 +76,34 @@ def create_rag_agent(index_path: str):
     PROMPT = ChatPromptTemplate.from_template(prompt_template)
 
     # 4. Create the RAG Chain
-    llm = ChatOpenAI(temperature=0, model_name="gpt-4o")
+    llm = ChatOpenAI(temperature=0, model_name=RAG_LLM_MODEL)
     
     question_answer_chain = create_stuff_documents_chain(llm, PROMPT)
     qa_chain = create_retrieval_chain(retriever, question_answer_chain)
 
+    # Released by close_rag_agent, or at the latest when the chain is collected
+    key = id(qa_chain)
+    _closers[key] = weakref.finalize(qa_chain, _close, key, vector_store)
+
     return qa_chain
 
+
+def _close(key: int, vector_store) -> None:
+    _closers.pop(key, None)
+    close_vector_store(vector_store)
+
+
+def close_rag_agent(agent: Any) -> None:
+    """
+    Releases the docstore connection and mapped index behind an agent.
+
+    The agent cannot answer questions afterwards. Agents not built by
+    ``create_rag_agent`` are left alone.
+    """
+    closer = _closers.get(id(agent))
+    if closer is not None:
+        closer()
+
 def ask_question(qa_chain, query: str):
     """
     Asks a question to the RAG agent and prints the response.
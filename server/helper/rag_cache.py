@@ -0,0 +1,499 @@
+"""
+Caches in front of the RAG chain.
+
+During an event the same handful of questions ("where is parking?", "when
+does check-in open?") are asked hundreds of times, and every one of them
+embeds the question, searches the index and waits for the LLM. Two caches
+short-circuit that:
+
+- ``QueryEmbeddingCache`` keeps recently used question embeddings in memory,
+  in front of the persistent embedding cache, so the answer cache and the
+  retriever embed a question only once.
+- ``SemanticAnswerCache`` stores answers with their question embedding and
+  the version of the index they were produced from. A question whose
+  embedding has a cosine similarity of at least ``threshold`` with a cached
+  question asked with the same retrieval settings gets the cached answer.
+  Entries built from an older index version are dropped on the next lookup,
+  so answers never outlive the wiki content they came from.
+
+``CachedRagChain`` wraps the chain built by ``create_rag_agent`` with both.
+"""
+
+import os
+import json
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DEFAULT_QUERY_CACHE_SIZE = 1024
+DEFAULT_ANSWER_CACHE_SIZE = 1000
+# Conservative: questions that differ by one word ("open" vs "close") can
+# still score above 0.9 with text-embedding-3-large
+DEFAULT_SIMILARITY_THRESHOLD = 0.97
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache(Embeddings):
+    """In-memory LRU of query text -> embedding in front of another Embeddings."""
+
+    def __init__(self, underlying: Embeddings, max_entries: int = DEFAULT_QUERY_CACHE_SIZE):
+        self.underlying = underlying
+        self.max_entries = max_entries
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.underlying.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = _normalize_query(text)
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is not None:
+                self._vectors.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.underlying.embed_query(text)
+        with self._lock:
+            self._vectors[key] = vector
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._vectors),
+                "max_entries": self.max_entries,
+            }
+
+
+class _AnswerSet:
+    """Cached answers for one version of one index and retrieval setting."""
+
+    # Rows allocated up front; doubled as answers are added and halved as
+    # they are evicted, so many small sets stay small
+    INITIAL_ROWS = 4
+
+    def __init__(self, version: Tuple, dimensions: int):
+        self.version = version
+        # Unit-length question embeddings, one row per slot
+        self.vectors = np.zeros((self.INITIAL_ROWS, dimensions), dtype=np.float32)
+        self.answers: List[Dict[str, Any]] = []
+        self.last_used = np.zeros(self.INITIAL_ROWS, dtype=np.int64)
+
+    def _resize(self, rows: int) -> None:
+        used = len(self.answers)
+        vectors = np.zeros((rows, self.vectors.shape[1]), dtype=np.float32)
+        vectors[:used] = self.vectors[:used]
+        last_used = np.zeros(rows, dtype=np.int64)
+        last_used[:used] = self.last_used[:used]
+        self.vectors, self.last_used = vectors, last_used
+
+    def append(self, response: Dict[str, Any]) -> int:
+        """Adds an answer and returns its slot."""
+        slot = len(self.answers)
+        if slot == len(self.vectors):
+            self._resize(2 * len(self.vectors))
+        self.answers.append(response)
+        return slot
+
+    def remove(self, slot: int) -> None:
+        """Removes the answer in ``slot``, moving the last answer into it."""
+        last = len(self.answers) - 1
+        self.answers[slot] = self.answers[last]
+        self.vectors[slot] = self.vectors[last]
+        self.last_used[slot] = self.last_used[last]
+        self.answers.pop()
+        if self.INITIAL_ROWS < len(self.vectors) and last <= len(self.vectors) // 4:
+            self._resize(len(self.vectors) // 2)
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by index version and near-duplicate question embeddings.
+
+    ``max_entries`` bounds the whole cache: once it is full, storing an
+    answer evicts the least recently used one, whichever index and retrieval
+    settings it belongs to.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_ANSWER_CACHE_SIZE,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        # Keyed by (index key, retrieval settings)
+        self._sets: Dict[Tuple[str, str], _AnswerSet] = {}
+        self._entries = 0
+        self._lock = threading.Lock()
+        self._tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _current_set(self, key: Tuple[str, str], version: Tuple) -> Optional[_AnswerSet]:
+        answer_set = self._sets.get(key)
+        if answer_set is not None and answer_set.version != version:
+            # The index was rewritten; its old answers may be wrong now
+            self._drop(key)
+            answer_set = None
+        return answer_set
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        count = len(self._sets.pop(key).answers)
+        self._entries -= count
+        self.invalidations += count
+
+    def _evict_least_recently_used(self) -> None:
+        oldest_key, oldest_slot, oldest_tick = None, 0, None
+        for key, answer_set in self._sets.items():
+            slot = int(np.argmin(answer_set.last_used[: len(answer_set.answers)]))
+            tick = answer_set.last_used[slot]
+            if oldest_tick is None or tick < oldest_tick:
+                oldest_key, oldest_slot, oldest_tick = key, slot, tick
+        answer_set = self._sets[oldest_key]
+        answer_set.remove(oldest_slot)
+        if not answer_set.answers:
+            del self._sets[oldest_key]
+        self._entries -= 1
+        self.evictions += 1
+
+    def lookup(
+        self, index_key: str, version: Tuple, vector: List[float], variant: str = ""
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached answer for the most similar question, if similar enough.
+
+        Args:
+            index_key: Identifies the index the question is asked against.
+            version: The current version of that index.
+            vector: The question embedding.
+            variant: The retrieval settings the question is asked with;
+                answers are only shared between identical settings.
+
+        Returns:
+            The cached chain response, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        query = _unit(vector)
+        with self._lock:
+            self._tick += 1
+            answer_set = self._current_set((index_key, variant), version)
+            if answer_set is not None and answer_set.answers:
+                used = len(answer_set.answers)
+                scores = answer_set.vectors[:used] @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    answer_set.last_used[best] = self._tick
+                    self.hits += 1
+                    return answer_set.answers[best]
+            self.misses += 1
+            return None
+
+    def store(
+        self,
+        index_key: str,
+        version: Tuple,
+        vector: List[float],
+        response: Dict[str, Any],
+        variant: str = "",
+    ) -> None:
+        """Caches a chain response, evicting the least recently used answer if full."""
+        if not self.enabled:
+            return
+        query = _unit(vector)
+        with self._lock:
+            self._tick += 1
+            answer_set = self._current_set((index_key, variant), version)
+            if self._entries >= self.max_entries:
+                self._evict_least_recently_used()
+                # Eviction may have emptied and dropped this very set
+                answer_set = self._sets.get((index_key, variant))
+            if answer_set is None:
+                answer_set = _AnswerSet(version, query.shape[0])
+                self._sets[(index_key, variant)] = answer_set
+
+            slot = answer_set.append(response)
+            answer_set.vectors[slot] = query
+            answer_set.last_used[slot] = self._tick
+            self._entries += 1
+
+    def invalidate(self, index_key: Optional[str] = None) -> None:
+        """Drops the cached answers for one index, or for all indexes."""
+        with self._lock:
+            keys = [key for key in self._sets if index_key in (None, key[0])]
+            for key in keys:
+                self._drop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+
+def _unit(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+class CachedRagChain:
+    """
+    Serves near-duplicate questions from a SemanticAnswerCache before running
+    the wrapped retrieval chain.
+
+    ``invoke``/``ainvoke``/``astream`` are drop-in replacements for the
+    chain's own methods. Callers that need to do something only when the
+    chain actually runs (e.g. take a model concurrency slot) can call
+    ``alookup`` first and then ``aanswer``/``astream_answer`` on a miss.
+
+    ``config`` is passed to the chain; its ``configurable`` values (such as
+    the retrieval mode) also partition the cached answers.
+    """
+
+    def __init__(
+        self,
+        chain: Any,
+        embeddings: Embeddings,
+        answer_cache: SemanticAnswerCache,
+        index_key: str,
+        version: Tuple,
+    ):
+        self.chain = chain
+        self.embeddings = embeddings
+        self.answer_cache = answer_cache
+        self.index_key = index_key
+        self.version = version
+
+    @staticmethod
+    def _response(question: str, cached: Dict[str, Any]) -> Dict[str, Any]:
+        return {"input": question, "context": cached["context"], "answer": cached["answer"]}
+
+    @staticmethod
+    def _variant(config: Optional[Dict[str, Any]]) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        return json.dumps(configurable, sort_keys=True, default=str)
+
+    def _store(
+        self,
+        question: str,
+        vector: List[float],
+        response: Dict[str, Any],
+        config: Optional[Dict[str, Any]],
+    ) -> None:
+        if response.get("answer"):
+            self.answer_cache.store(
+                self.index_key,
+                self.version,
+                vector,
+                {"answer": response["answer"], "context": response.get("context") or []},
+                variant=self._variant(config),
+            )
+
+    def _cached(
+        self, question: str, vector: List[float], config: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        cached = self.answer_cache.lookup(
+            self.index_key, self.version, vector, variant=self._variant(config)
+        )
+        return None if cached is None else self._response(question, cached)
+
+    def lookup(
+        self, question: str, config: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Returns a cached response for ``question``, or None on a miss."""
+        if not self.answer_cache.enabled:
+            return None
+        return self._cached(question, self.embeddings.embed_query(question), config)
+
+    async def alookup(
+        self, question: str, config: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Async version of ``lookup``; embedding runs off the event loop."""
+        if not self.answer_cache.enabled:
+            return None
+        return self._cached(question, await self._aembed(question), config)
+
+    async def _aembed(self, question: str) -> List[float]:
+        return await asyncio.to_thread(self.embeddings.embed_query, question)
+
+    def answer(
+        self,
+        inputs: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None,
+        vector: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Runs the chain without a cache lookup and caches its answer.
+
+        ``vector`` is the question's embedding if the caller already has it.
+        """
+        response = self.chain.invoke(inputs, config=config)
+        if self.answer_cache.enabled:
+            question = inputs["input"]
+            if vector is None:
+                vector = self.embeddings.embed_query(question)
+            self._store(question, vector, response, config)
+        return response
+
+    async def aanswer(
+        self,
+        inputs: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None,
+        vector: Optional[List[float]] = None,
+    ) -> Dict[str, Any]:
+        """Async version of ``answer``."""
+        response = await self.chain.ainvoke(inputs, config=config)
+        if self.answer_cache.enabled:
+            question = inputs["input"]
+            if vector is None:
+                vector = await self._aembed(question)
+            self._store(question, vector, response, config)
+        return response
+
+    async def astream_answer(
+        self,
+        inputs: Dict[str, Any],
+        config: Optional[Dict[str, Any]] = None,
+        vector: Optional[List[float]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streams the chain without a cache lookup and caches the full answer."""
+        tokens = []
+        context = None
+        async for chunk in self.chain.astream(inputs, config=config):
+            if chunk.get("answer"):
+                tokens.append(chunk["answer"])
+            if "context" in chunk:
+                context = chunk["context"]
+            yield chunk
+        if self.answer_cache.enabled:
+            question = inputs["input"]
+            if vector is None:
+                vector = await self._aembed(question)
+            response = {"answer": "".join(tokens), "context": context}
+            self._store(question, vector, response, config)
+
+    def invoke(
+        self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if not self.answer_cache.enabled:
+            return self.chain.invoke(inputs, config=config)
+        vector = self.embeddings.embed_query(inputs["input"])
+        cached = self._cached(inputs["input"], vector, config)
+        return cached or self.answer(inputs, config, vector=vector)
+
+    async def ainvoke(
+        self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        if not self.answer_cache.enabled:
+            return await self.chain.ainvoke(inputs, config=config)
+        vector = await self._aembed(inputs["input"])
+        cached = self._cached(inputs["input"], vector, config)
+        return cached or await self.aanswer(inputs, config, vector=vector)
+
+    async def astream(
+        self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        vector = None
+        if self.answer_cache.enabled:
+            # The lookup's embedding is reused to store the streamed answer
+            vector = await self._aembed(inputs["input"])
+            cached = self._cached(inputs["input"], vector, config)
+            if cached is not None:
+                # Built by _response, so a hit carries "input" like a full run
+                yield cached
+                return
+        async for chunk in self.astream_answer(inputs, config, vector=vector):
+            yield chunk
+
+
+_query_embeddings: Optional[QueryEmbeddingCache] = None
+_query_embeddings_lock = threading.Lock()
+
+
+def get_query_embeddings() -> QueryEmbeddingCache:
+    """
+    Returns the process-wide query embedding LRU, creating it on first use.
+
+    ``RAG_QUERY_CACHE_SIZE`` overrides the number of cached questions.
+    """
+    global _query_embeddings
+    with _query_embeddings_lock:
+        if _query_embeddings is None:
+            # Imported here: helper.embeddings pulls in the document loaders
+            from helper.embeddings import get_embeddings
+
+            _query_embeddings = QueryEmbeddingCache(
+                get_embeddings(),
+                max_entries=int(
+                    os.getenv("RAG_QUERY_CACHE_SIZE", str(DEFAULT_QUERY_CACHE_SIZE))
+                ),
+            )
+        return _query_embeddings
+
+
+def create_answer_cache() -> SemanticAnswerCache:
+    """
+    Create the answer cache configured by the environment.
+
+    ``RAG_ANSWER_CACHE_SIZE`` (0 disables the cache) and
+    ``RAG_ANSWER_CACHE_THRESHOLD`` override the defaults.
+    """
+    return SemanticAnswerCache(
+        max_entries=int(
+            os.getenv("RAG_ANSWER_CACHE_SIZE", str(DEFAULT_ANSWER_CACHE_SIZE))
+        ),
+        threshold=float(
+            os.getenv("RAG_ANSWER_CACHE_THRESHOLD", str(DEFAULT_SIMILARITY_THRESHOLD))
+        ),
+    )
+
+
+def rag_cache_stats() -> Dict[str, Any]:
+    """Returns the counters of the query embedding LRU and the answer cache."""
+    return {
+        "query_embeddings": (
+            _query_embeddings.stats() if _query_embeddings is not None else None
+        ),
+        "answers": answer_cache.stats(),
+    }
+
+
+# Shared answer cache for the whole process
+answer_cache = create_answer_cache()
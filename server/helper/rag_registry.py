@@ -0,0 +1,213 @@
+"""
+Process-wide registry of loaded RAG agents.
+
+Loading a FAISS index (mapping index.faiss, opening the docstore and
+building the embedding/LLM clients) is far more expensive than answering a
+question, so agents are built once per index and reused across requests.
+Each entry is keyed by the index path and the on-disk version of the index
+files; when the version changes (for example after ``/api/add_wiki`` rewrites
+the index) the next lookup loads the new index and swaps it in atomically.
+The replaced agent stays open for requests still using it and is closed when
+it is replaced in turn, mirroring the versions ``publish_index_dir`` keeps.
+
+When the registry has an answer cache, each agent is wrapped in a
+``CachedRagChain`` tagged with the index version it was loaded from, so
+cached answers are dropped as soon as a newer version of the index is used.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from helper.index_storage import (
+    DOCSTORE_FILE,
+    INDEX_FILE,
+    MANIFEST_FILE,
+    current_index_dir,
+)
+from helper.rag_agent import close_rag_agent, create_rag_agent
+from helper.rag_cache import (
+    CachedRagChain,
+    SemanticAnswerCache,
+    answer_cache,
+    get_query_embeddings,
+)
+
+INDEX_FILES = (INDEX_FILE, DOCSTORE_FILE, MANIFEST_FILE)
+
+
+def get_index_version(index_path: str) -> Tuple:
+    """
+    Returns a cheap fingerprint of the published version of an index.
+
+    The fingerprint starts with the current version directory, from which
+    the index must be loaded, followed by the modification time and size of
+    every file in it (which only matter for indexes saved before versioning,
+    whose files are rewritten in place).
+
+    Args:
+        index_path: The path to the FAISS index directory.
+
+    Returns:
+        A hashable tuple identifying the current on-disk version.
+    """
+    index_dir = current_index_dir(index_path)
+    version = [index_dir]
+    for name in INDEX_FILES:
+        path = os.path.join(index_dir, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            version.append((name, None, None))
+            continue
+        version.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+@dataclass
+class _RegistryEntry:
+    """A loaded agent together with the index version it was built from."""
+
+    version: Tuple
+    agent: Any
+
+
+class RagAgentRegistry:
+    """Caches one RAG agent per index path and reloads it when the index changes."""
+
+    def __init__(
+        self,
+        factory: Callable[[str], Any] = create_rag_agent,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+    ):
+        self._factory = factory
+        self._answer_cache = answer_cache
+        self._entries: Dict[str, _RegistryEntry] = {}
+        # The agent replaced last for each index, closed on the next replacement
+        self._retired: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # One load lock per index so concurrent misses build the agent only once
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _load_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key: str, version: Tuple):
+        # Load exactly the version directory the fingerprint was taken from
+        agent = self._factory(version[0])
+        if self._answer_cache is None:
+            return agent
+        return CachedRagChain(
+            agent, get_query_embeddings(), self._answer_cache, key, version
+        )
+
+    def _retire(self, key: str, entry: Optional[_RegistryEntry]) -> None:
+        # Requests may still be answering from the replaced agent, so only the
+        # one replaced before it is closed
+        if entry is None:
+            return
+        with self._lock:
+            previous = self._retired.pop(key, None)
+            self._retired[key] = entry.agent
+        if previous is not None:
+            if isinstance(previous, CachedRagChain):
+                previous = previous.chain
+            close_rag_agent(previous)
+
+    def get(self, index_path: str):
+        """
+        Returns the agent for ``index_path``, loading or reloading it if needed.
+
+        Args:
+            index_path: The path to the FAISS index directory.
+
+        Returns:
+            A retrieval chain that can be used to answer questions.
+        """
+        key = os.path.abspath(index_path)
+        version = get_index_version(key)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.version == version:
+            with self._lock:
+                self.hits += 1
+            return entry.agent
+
+        with self._load_lock(key):
+            # Another request may have finished loading while we waited
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                with self._lock:
+                    self.hits += 1
+                return entry.agent
+
+            agent = self._load(key, version)
+            with self._lock:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.reloads += 1
+                # Swap in the new agent; in-flight requests keep the old one
+                self._entries[key] = _RegistryEntry(version=version, agent=agent)
+            self._retire(key, entry)
+            return agent
+
+    def refresh(self, index_path: str):
+        """
+        Eagerly reloads the agent for ``index_path`` after the index was rewritten.
+
+        Args:
+            index_path: The path to the FAISS index directory.
+
+        Returns:
+            The freshly loaded agent.
+        """
+        key = os.path.abspath(index_path)
+        with self._load_lock(key):
+            version = get_index_version(key)
+            agent = self._load(key, version)
+            if self._answer_cache is not None:
+                self._answer_cache.invalidate(key)
+            with self._lock:
+                self.reloads += 1
+                entry = self._entries.get(key)
+                self._entries[key] = _RegistryEntry(version=version, agent=agent)
+            self._retire(key, entry)
+            return agent
+
+    def invalidate(self, index_path: Optional[str] = None):
+        """Drops the cached agent for one index, or for all indexes."""
+        with self._lock:
+            if index_path is None:
+                dropped = list(self._entries.items())
+                self._entries.clear()
+            else:
+                key = os.path.abspath(index_path)
+                dropped = [(key, self._entries.pop(key, None))]
+        for key, entry in dropped:
+            self._retire(key, entry)
+        if self._answer_cache is not None:
+            self._answer_cache.invalidate(
+                None if index_path is None else os.path.abspath(index_path)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss/reload counters for the registry."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.reloads
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "loaded_indexes": len(self._entries),
+            }
+
+
+# Shared registry for the whole process
+rag_registry = RagAgentRegistry(answer_cache=answer_cache)
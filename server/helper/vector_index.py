@@ -0,0 +1,229 @@
+"""
+Selectable FAISS index types for the wiki vector store.
+
+``FAISS.from_documents`` always builds an exact flat index: 12KB per chunk
+for 3072-dim vectors and a linear scan per query. For large corpora one of
+the approximate index types trades a little recall for memory and latency:
+
+- ``flat``: exact search (the default).
+- ``ivf_flat``: vectors are bucketed into ``nlist`` k-means cells and a query
+  only scans the ``nprobe`` nearest cells. Same memory as flat.
+- ``ivf_pq``: IVF with product-quantized vectors, ``pq_m`` bytes per vector
+  instead of ``4 * dimensions``.
+- ``hnsw``: graph index, fast and accurate but more memory than flat.
+
+Only a flat index can drop vectors in place; removing or replacing a file in
+any other index type rebuilds it.
+
+IVF indexes are trained on a random sample of the vectors. Corpora too small
+to train the requested index fall back to ``flat``.
+
+Configuration (environment): ``FAISS_INDEX_TYPE``, ``FAISS_NLIST``,
+``FAISS_NPROBE``, ``FAISS_PQ_M``, ``FAISS_PQ_BITS``, ``FAISS_HNSW_M``,
+``FAISS_HNSW_EF_SEARCH``, ``FAISS_TRAIN_SAMPLE``. A value of 0 for
+``nlist``, ``pq_m`` or ``train_sample`` picks a size from the corpus.
+
+Use ``python -m benchmarks.faiss_index_types`` to compare recall and latency.
+"""
+
+import os
+import uuid
+import logging
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from langchain_core.embeddings import Embeddings
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# faiss warns below this many training points per k-means centroid
+MIN_POINTS_PER_CENTROID = 39
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexConfig:
+    """How to build and search the FAISS index."""
+
+    index_type: str = "flat"
+    nlist: int = 0
+    nprobe: int = 32
+    pq_m: int = 0
+    pq_bits: int = 8
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    hnsw_ef_search: int = 128
+    train_sample: int = 0
+
+    def __post_init__(self):
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(
+                f"Unknown FAISS index type '{self.index_type}'; "
+                f"expected one of {INDEX_TYPES}"
+            )
+
+    @classmethod
+    def from_env(cls) -> "IndexConfig":
+        """Builds the configuration from ``FAISS_*`` environment variables."""
+        defaults = cls()
+        return cls(
+            index_type=os.getenv("FAISS_INDEX_TYPE", defaults.index_type).lower(),
+            nlist=int(os.getenv("FAISS_NLIST", str(defaults.nlist))),
+            nprobe=int(os.getenv("FAISS_NPROBE", str(defaults.nprobe))),
+            pq_m=int(os.getenv("FAISS_PQ_M", str(defaults.pq_m))),
+            pq_bits=int(os.getenv("FAISS_PQ_BITS", str(defaults.pq_bits))),
+            hnsw_m=int(os.getenv("FAISS_HNSW_M", str(defaults.hnsw_m))),
+            hnsw_ef_search=int(
+                os.getenv("FAISS_HNSW_EF_SEARCH", str(defaults.hnsw_ef_search))
+            ),
+            train_sample=int(os.getenv("FAISS_TRAIN_SAMPLE", str(defaults.train_sample))),
+        )
+
+
+def supports_removal(index_type: str) -> bool:
+    """
+    Whether vectors can be deleted from an index of this type in place.
+
+    ``FAISS.delete`` renumbers the remaining vectors as if the index were
+    compacted, which only a flat index does; IVF indexes keep their original
+    ids and HNSW cannot delete at all.
+    """
+    return index_type == "flat"
+
+
+def _pick_pq_m(dimensions: int) -> int:
+    # About 16 dimensions per 8-bit code; pq_m must divide the dimensions
+    target = max(1, dimensions // 16)
+    for m in range(target, 0, -1):
+        if dimensions % m == 0:
+            return m
+    return 1
+
+
+def _resolve(config: IndexConfig, count: int, dimensions: int) -> IndexConfig:
+    """Fills in corpus-dependent sizes, falling back to flat if untrainable."""
+    if config.index_type not in ("ivf_flat", "ivf_pq"):
+        return config
+
+    nlist = config.nlist or int(4 * count**0.5)
+    nlist = min(nlist, count // MIN_POINTS_PER_CENTROID)
+    pq_m = config.pq_m
+    needed = nlist * MIN_POINTS_PER_CENTROID
+    if config.index_type == "ivf_pq":
+        pq_m = pq_m or _pick_pq_m(dimensions)
+        needed = max(needed, MIN_POINTS_PER_CENTROID * 2**config.pq_bits)
+        if dimensions % pq_m:
+            raise ValueError(f"pq_m={pq_m} does not divide {dimensions} dimensions")
+
+    if nlist < 1 or count < needed:
+        logger.info(
+            "Too few vectors to train index, using flat",
+            extra={
+                "event": "faiss.index_fallback",
+                "index_type": config.index_type,
+                "vectors": count,
+                "needed": needed,
+            },
+        )
+        return replace(config, index_type="flat")
+
+    # faiss samples at most 256 points per centroid itself; cap what we copy
+    sample = config.train_sample or max(needed, 256 * nlist)
+    return replace(config, nlist=nlist, pq_m=pq_m, train_sample=min(sample, count))
+
+
+def configure_search(index: Any, config: IndexConfig) -> None:
+    """Applies the query-time parameters (nprobe, efSearch) to a loaded index."""
+    faiss = dependable_faiss_import()
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(config.nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.hnsw_ef_search
+
+
+def build_faiss_index(
+    vectors: np.ndarray, config: IndexConfig, seed: int = 0
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Builds and fills a FAISS index of the configured type.
+
+    Args:
+        vectors: float32 array of shape (count, dimensions).
+        config: The requested index configuration.
+        seed: Seed for the training sample.
+
+    Returns:
+        The index, and a JSON-serializable description of what was built:
+        the resolved configuration, the requested type, and the number of
+        vectors it was built from and trained on.
+    """
+    faiss = dependable_faiss_import()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimensions = vectors.shape
+    requested_type = config.index_type
+    config = _resolve(config, count, dimensions)
+
+    trained_on = 0
+    if config.index_type == "flat":
+        index = faiss.IndexFlatL2(dimensions)
+    elif config.index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimensions, config.hnsw_m)
+        index.hnsw.efConstruction = config.hnsw_ef_construction
+    else:
+        quantizer = faiss.IndexFlatL2(dimensions)
+        if config.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimensions, config.nlist)
+        else:
+            index = faiss.IndexIVFPQ(
+                quantizer, dimensions, config.nlist, config.pq_m, config.pq_bits
+            )
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(count, size=config.train_sample, replace=False)
+        index.train(vectors[np.sort(sample)])
+        trained_on = config.train_sample
+
+    configure_search(index, config)
+    index.add(vectors)
+    info = {
+        **asdict(config),
+        "requested_type": requested_type,
+        "dimensions": dimensions,
+        "vectors": count,
+        "trained_on": trained_on,
+    }
+    return index, info
+
+
+def build_vector_store(
+    documents: Sequence,
+    embeddings: Embeddings,
+    ids: Optional[List[str]] = None,
+    config: Optional[IndexConfig] = None,
+) -> Tuple[FAISS, Dict[str, Any]]:
+    """
+    Embeds documents into a LangChain FAISS store backed by the configured index.
+
+    The equivalent of ``FAISS.from_documents`` for every index type.
+
+    Returns:
+        The vector store and the index description from ``build_faiss_index``.
+    """
+    config = config or IndexConfig.from_env()
+    ids = ids or [str(uuid.uuid4()) for _ in documents]
+    vectors = np.array(
+        embeddings.embed_documents([doc.page_content for doc in documents]),
+        dtype=np.float32,
+    )
+    index, info = build_faiss_index(vectors, config)
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(dict(zip(ids, documents))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    return vector_store, info
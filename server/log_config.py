@@ -0,0 +1,142 @@
+"""
+Logging setup for the API server.
+
+Records are handed to a ``QueueHandler`` and written by a ``QueueListener``
+thread, so request handlers never block on stdout/stderr. Output is plain
+text or one JSON object per line, levels can be set globally and per logger,
+and chatty per-item events can be sampled.
+
+Configuration (environment):
+
+- ``LOG_LEVEL``: root level, default ``INFO``.
+- ``LOG_LEVELS``: per-logger levels, e.g. ``outreach_service=DEBUG,helper=WARNING``.
+- ``LOG_FORMAT``: ``text`` (default) or ``json``.
+- ``LOG_SAMPLE``: keep one in N records per event below WARNING, e.g.
+  ``email.response=100,email.parsed=10``.
+
+Events are named with ``extra={"event": "..."}``; any other ``extra`` fields
+are included in JSON output.
+"""
+
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+}
+
+_traceback_formatter = logging.Formatter()
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the traceback separate from the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in N records for each sampled event; warnings always pass."""
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        every = self.rates.get(event)
+        if not every or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+        return seen % every == 0
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    pairs = {}
+    for item in value.split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+def configure_logging() -> None:
+    """Install the queue-based handler on the root logger (idempotent)."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        stream = logging.StreamHandler()
+        if os.getenv("LOG_FORMAT", "text").lower() == "json":
+            stream.setFormatter(JsonFormatter())
+        else:
+            stream.setFormatter(
+                logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+            )
+
+        # Unbounded, so logging never blocks the caller
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        queue_handler = _QueueHandler(log_queue)
+        rates = {
+            event: int(every)
+            for event, every in _parse_pairs(os.getenv("LOG_SAMPLE", "")).items()
+        }
+        if rates:
+            queue_handler.addFilter(SamplingFilter(rates))
+
+        root = logging.getLogger()
+        root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        root.addHandler(queue_handler)
+        for name, level in _parse_pairs(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        _listener = logging.handlers.QueueListener(
+            log_queue, stream, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
@@ -0,0 +1,78 @@
+"""
+Lightweight in-process latency metrics for the API server.
+"""
+
+import time
+import threading
+from collections import deque
+from typing import Dict
+
+
+class LatencyTracker:
+    """Records recent latency samples for one named operation."""
+
+    def __init__(self, max_samples: int = 1000):
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        """Record a single latency sample in seconds."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Return count, mean and percentiles (in milliseconds) of recent samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+        if not samples:
+            return {"count": count}
+
+        def percentile(p: float) -> float:
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            "count": count,
+            "mean_ms": sum(samples) / len(samples) * 1000,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "max_ms": samples[-1] * 1000,
+        }
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def latency(name: str) -> LatencyTracker:
+    """Return the process-wide tracker for ``name``, creating it on first use."""
+    with _trackers_lock:
+        return _trackers.setdefault(name, LatencyTracker())
+
+
+def latency_stats() -> Dict[str, Dict[str, float]]:
+    """Return stats for every tracker."""
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.stats() for name, tracker in sorted(trackers.items())}
+
+
+class StreamTimer:
+    """Measures time-to-first-byte and total latency of a streamed response."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.first_byte = None
+
+    def mark_first_byte(self) -> None:
+        """Record TTFB the first time it is called."""
+        if self.first_byte is None:
+            self.first_byte = time.perf_counter()
+            latency(f"{self.name}.ttfb").record(self.first_byte - self.started)
+
+    def finish(self) -> None:
+        """Record the total latency of the stream."""
+        latency(f"{self.name}.total").record(time.perf_counter() - self.started)
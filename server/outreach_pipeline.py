@@ -0,0 +1,357 @@
+"""
+Pipelined execution of outreach campaigns.
+
+A campaign runs as two bounded stages connected by queues: email generation
+(LLM calls) and sending (SMTP). Each stage has its own worker count, and the
+bounded queue between them applies backpressure so generation never runs far
+ahead of what the sender can deliver.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Marks the end of a queue for a worker
+_DONE = object()
+
+
+class StageStats:
+    """Throughput and latency counters for one pipeline stage."""
+
+    def __init__(self, name: str, concurrency: int, max_samples: int = 1000):
+        self.name = name
+        self.concurrency = concurrency
+        self.completed = 0
+        self.failed = 0
+        self.first_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self._latencies = deque(maxlen=max_samples)
+
+    def record(self, started: float, ended: float, success: bool = True) -> None:
+        """Record one processed item."""
+        if self.first_start is None or started < self.first_start:
+            self.first_start = started
+        if self.last_end is None or ended > self.last_end:
+            self.last_end = ended
+        self._latencies.append(ended - started)
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return a JSON-serializable summary of the stage."""
+        latencies = sorted(self._latencies)
+        processed = self.completed + self.failed
+        wall = (
+            self.last_end - self.first_start
+            if self.first_start is not None and self.last_end is not None
+            else 0.0
+        )
+        stats = {
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wall_seconds": wall,
+            "items_per_second": processed / wall if wall > 0 else None,
+        }
+        if latencies:
+            stats["mean_latency_ms"] = sum(latencies) / len(latencies) * 1000
+            stats["p95_latency_ms"] = (
+                latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+            )
+        return stats
+
+
+class CampaignPipeline:
+    """Runs classification, generation and sending for a list of contacts."""
+
+    def __init__(
+        self,
+        service,
+        generation_concurrency: Optional[int] = None,
+        send_concurrency: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        generation_batch_size: Optional[int] = None,
+    ):
+        self.service = service
+        self.generation_concurrency = generation_concurrency or int(
+            os.getenv("OUTREACH_GENERATION_CONCURRENCY", "4")
+        )
+        self.send_concurrency = send_concurrency or int(
+            os.getenv("OUTREACH_SEND_CONCURRENCY", "2")
+        )
+        self.queue_size = queue_size or int(os.getenv("OUTREACH_QUEUE_SIZE", "16"))
+        # Contacts per generation request (1 generates each contact on its own)
+        self.generation_batch_size = generation_batch_size or int(
+            os.getenv("OUTREACH_GENERATION_BATCH_SIZE", "1")
+        )
+
+    async def _generate_worker(
+        self, generate_queue, send_queue, stats: StageStats, cache_stats, on_generated
+    ):
+        while True:
+            item = await generate_queue.get()
+            if item is _DONE:
+                return
+            index, contact, contact_type = item
+            started = time.perf_counter()
+            try:
+                email_data = await self.service.agenerate_personalized_email(
+                    contact, contact_type, cache_stats=cache_stats
+                )
+                stats.record(started, time.perf_counter())
+                if on_generated:
+                    on_generated(index, contact, contact_type, email_data)
+            except Exception as e:
+                stats.record(started, time.perf_counter(), success=False)
+                email_data = {"error": str(e)}
+            # Blocks while the send queue is full (backpressure)
+            await send_queue.put((index, contact, contact_type, email_data))
+
+    async def _generate_batch_worker(
+        self,
+        generate_queue,
+        send_queue,
+        stats: StageStats,
+        cache_stats,
+        batch_stats,
+        on_generated,
+    ):
+        finished = False
+        while not finished:
+            item = await generate_queue.get()
+            if item is _DONE:
+                return
+            # Take whatever else is already queued, up to the batch size
+            batch = [item]
+            while len(batch) < self.generation_batch_size:
+                try:
+                    item = generate_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+
+            started = time.perf_counter()
+            try:
+                emails = await self.service.agenerate_personalized_emails(
+                    [(contact, contact_type) for _, contact, contact_type in batch],
+                    cache_stats=cache_stats,
+                    batch_stats=batch_stats,
+                )
+            except Exception as e:
+                emails = [{"error": str(e)}] * len(batch)
+            ended = time.perf_counter()
+
+            for (index, contact, contact_type), email_data in zip(batch, emails):
+                success = "error" not in email_data
+                stats.record(started, ended, success=success)
+                if success and on_generated:
+                    on_generated(index, contact, contact_type, email_data)
+                await send_queue.put((index, contact, contact_type, email_data))
+
+    async def _send_worker(
+        self, send_queue, results: Optional[Dict], summary: Dict, stats: StageStats, on_sent
+    ):
+        while True:
+            item = await send_queue.get()
+            if item is _DONE:
+                return
+            index, contact, contact_type, email_data = item
+            started = time.perf_counter()
+            if "error" in email_data:
+                result = {
+                    "success": False,
+                    "email": contact.email,
+                    "error": email_data["error"],
+                }
+            else:
+                try:
+                    result = await self.service.asend_email(
+                        contact, contact_type, email_data
+                    )
+                except Exception as e:
+                    result = {"success": False, "email": contact.email, "error": str(e)}
+            stats.record(started, time.perf_counter(), success=result["success"])
+            if on_sent:
+                on_sent(index, contact, contact_type, result)
+
+            if result["success"]:
+                summary["emails_sent"] += 1
+            else:
+                summary["emails_failed"] += 1
+            if results is not None:
+                results[index] = {
+                    "contact": contact,
+                    "contact_type": contact_type,
+                    "result": result,
+                }
+
+    async def run(
+        self,
+        contacts: Iterable,
+        contact_types: Optional[Iterable[str]] = None,
+        drafts: Optional[Iterable[Optional[Dict[str, str]]]] = None,
+        on_generated: Optional[Callable] = None,
+        on_sent: Optional[Callable] = None,
+        keep_results: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Run the campaign for ``contacts``.
+
+        Args:
+            contacts: The contacts to email. Any iterable works; it is consumed
+                lazily, so generators stream through the pipeline.
+            contact_types: Optional precomputed contact types, one per contact.
+            drafts: Optional already generated emails, one per contact (or
+                None); contacts with a draft skip the generation stage.
+            on_generated: Called as ``on_generated(index, contact, contact_type,
+                email_data)`` after each successful generation.
+            on_sent: Called as ``on_sent(index, contact, contact_type, result)``
+                after each send attempt. An exception raised by either
+                callback stops the run and is raised from it.
+            keep_results: Collect per-contact results. Callers that persist
+                results through ``on_sent`` can disable this to keep memory
+                constant for large campaigns.
+
+        Returns:
+            A dict with ``success``, a ``summary`` (including per-stage
+            throughput/latency under ``stages`` and draft cache counters under
+            ``generation_cache``) and per-contact ``results``
+            in input order (None if ``keep_results`` is False).
+        """
+        types = iter(contact_types) if contact_types is not None else None
+        draft_iter = iter(drafts) if drafts is not None else None
+        items = (
+            (
+                contact,
+                next(types) if types is not None else None,
+                next(draft_iter) if draft_iter is not None else None,
+            )
+            for contact in contacts
+        )
+        return await self.run_items(
+            items, on_generated=on_generated, on_sent=on_sent, keep_results=keep_results
+        )
+
+    async def run_items(
+        self,
+        items: Iterable,
+        on_generated: Optional[Callable] = None,
+        on_sent: Optional[Callable] = None,
+        keep_results: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Run the campaign for ``(contact, contact_type, draft)`` items.
+
+        ``contact_type`` and ``draft`` may be None, in which case the contact
+        is classified and/or generated. See :meth:`run` for the other
+        arguments and the return value.
+        """
+        results: Optional[Dict[int, Dict]] = {} if keep_results else None
+        summary = {
+            "total_contacts": 0,
+            "participants": 0,
+            "judges": 0,
+            "sponsors": 0,
+            "emails_sent": 0,
+            "emails_failed": 0,
+        }
+        generation_stats = StageStats("generation", self.generation_concurrency)
+        send_stats = StageStats("sending", self.send_concurrency)
+        # Draft cache hits/misses/deduplicated generations for this run
+        cache_stats = {"hits": 0, "misses": 0, "deduplicated": 0}
+
+        generate_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        send_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        batch_stats = {"requests": 0, "contacts": 0, "fallbacks": 0}
+        if self.generation_batch_size > 1:
+            generators = [
+                asyncio.create_task(
+                    self._generate_batch_worker(
+                        generate_queue,
+                        send_queue,
+                        generation_stats,
+                        cache_stats,
+                        batch_stats,
+                        on_generated,
+                    )
+                )
+                for _ in range(self.generation_concurrency)
+            ]
+        else:
+            generators = [
+                asyncio.create_task(
+                    self._generate_worker(
+                        generate_queue,
+                        send_queue,
+                        generation_stats,
+                        cache_stats,
+                        on_generated,
+                    )
+                )
+                for _ in range(self.generation_concurrency)
+            ]
+        senders = [
+            asyncio.create_task(
+                self._send_worker(send_queue, results, summary, send_stats, on_sent)
+            )
+            for _ in range(self.send_concurrency)
+        ]
+
+        async def feed():
+            for index, (contact, contact_type, draft) in enumerate(items):
+                if contact_type is None:
+                    contact_type = self.service.classify_contact(contact)
+                summary["total_contacts"] += 1
+                key = contact_type + "s"
+                summary[key] = summary.get(key, 0) + 1
+                if draft is not None:
+                    await send_queue.put((index, contact, contact_type, draft))
+                else:
+                    await generate_queue.put((index, contact, contact_type))
+
+            for _ in generators:
+                await generate_queue.put(_DONE)
+            await asyncio.gather(*generators)
+
+            for _ in senders:
+                await send_queue.put(_DONE)
+
+        # Supervise the feeder and the workers together: a worker that dies
+        # (e.g. a raising on_sent) would otherwise leave the queues full and
+        # the feeder blocked on put() forever
+        tasks = [asyncio.create_task(feed()), *generators, *senders]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in tasks:
+                if task.done() and not task.cancelled() and task.exception():
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        summary["generation_cache"] = cache_stats
+        generation = {**generation_stats.to_dict(), "cache": cache_stats}
+        if self.generation_batch_size > 1:
+            summary["generation_batches"] = batch_stats
+            generation["batches"] = batch_stats
+        summary["stages"] = {
+            "generation": generation,
+            "sending": send_stats.to_dict(),
+        }
+        return {
+            "success": True,
+            "summary": summary,
+            "results": (
+                [results[index] for index in sorted(results)]
+                if results is not None
+                else None
+            ),
+        }
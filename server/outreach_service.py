@@ -4,25 +4,220 @@ Handles CSV processing, contact classification, and AI-powered email generation
 """
 
 import os
+import re
+import sys
 import csv
-import smtplib
-import pandas as pd
+import json
+import codecs
+import asyncio
+import logging
+import threading
 from io import StringIO
+from itertools import islice
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-from typing import List, Dict, Any
+from typing import (
+    List,
+    Dict,
+    Any,
+    Optional,
+    Callable,
+    Iterable,
+    Iterator,
+    BinaryIO,
+    Sequence,
+    Tuple,
+)
 from dataclasses import dataclass
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from concurrency import model_limiter
+from outreach_pipeline import CampaignPipeline
+from smtp_pool import SMTPConnectionPool
+from contact_classifier import ContactClassifier, load_classifier_keywords
+from email_cache import create_email_cache, draft_key, templatize, personalize
+from structured_output import find_json
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+EMAIL_MODEL = "gemini-2.5-flash"
+
+# Generated email bodies shorter than this are regenerated or rejected
+MIN_EMAIL_WORDS = 200
+
+# responses: LLM responses parsed; recovered: JSON found only after skipping
+# fences/prose; parse_failures: no usable JSON; too_short: body under
+# MIN_EMAIL_WORDS; regenerations: extra LLM calls; fallbacks: template emails
+GENERATION_COUNTERS = (
+    "responses",
+    "recovered",
+    "parse_failures",
+    "too_short",
+    "regenerations",
+    "fallbacks",
+)
+
+# Event facts shared by the single and batch email prompts
+EMAIL_HACKATHON_DETAILS = """\
+HACKATHON DETAILS (Use these specific details throughout the email):
+- Event: "TechInnovate 2024" - A 48-hour innovation marathon
+- Date: March 15-17, 2024
+- Location: University of Maryland, College Park
+- Theme: "AI-Powered Solutions for Tomorrow's Challenges"
+- Prize Pool: $25,000+ in cash prizes and tech gadgets
+- Special Tracks: AI/ML, Sustainability, Healthcare Tech, FinTech, Education Innovation
+- Mentors: Industry experts from Google, Microsoft, Amazon, and local startups
+- Workshops: Hands-on sessions on AI tools, pitch development, and business modeling
+- Networking: 500+ participants, 50+ mentors, 20+ sponsor representatives
+- Post-Event: Demo day with VCs and potential investors
+"""
 
-@dataclass
+# Personalization, structure and length requirements shared by both prompts
+EMAIL_GUIDELINES = """\
+CRITICAL PERSONALIZATION REQUIREMENTS (Focus heavily on these):
+1. **NOTES FIELD INTEGRATION (MOST IMPORTANT)**: 
+   - Extract every detail from their notes
+   - Reference their specific interests, skills, or background mentioned
+   - Connect their notes to specific hackathon opportunities
+   - If they mention AI/ML, reference the AI track and workshops
+   - If they mention previous experience, acknowledge it
+   - If they mention specific goals, address them directly
+
+2. **Company-Specific Deep Dive**: 
+   - Research their company's industry and recent developments
+   - Mention specific company achievements, news, or projects
+   - Connect their company's mission to hackathon themes
+   - Reference their company's location if relevant to the event
+
+3. **Role-Based Specificity**:
+   - Don't just mention their job title - explain HOW their role connects to hackathon opportunities
+   - For engineers: mention specific tech stacks, tools, or challenges
+   - For managers: highlight leadership and team-building opportunities
+   - For students: emphasize learning and career development
+
+4. **Industry Context & Trends**:
+   - Reference current industry challenges or opportunities
+   - Mention specific technologies or methodologies relevant to their field
+   - Connect to broader industry trends (AI revolution, sustainability focus, etc.)
+
+EMAIL STRUCTURE (Make each section detailed and personalized):
+- **Subject Line**: 50-60 characters, specific to their notes/company/role, compelling
+- **Greeting**: Use their name naturally, reference their company
+- **Opening Hook (2-3 sentences)**: 
+  * Start with something specific from their notes or company
+  * Connect it to current industry trends or challenges
+  * Lead into the hackathon opportunity
+- **Personalized Value Proposition (3-4 sentences)**:
+  * What specific benefits will THEY get based on their notes/role
+  * Reference specific hackathon tracks, workshops, or opportunities
+  * Connect to their stated interests or goals
+- **Detailed Personalization (4-5 sentences)**:
+  * Deep dive into their notes - extract and expand on every detail
+  * Connect their background to specific hackathon elements
+  * Mention relevant mentors, workshops, or networking opportunities
+- **Specific Call to Action (2-3 sentences)**:
+  * Clear next steps based on their contact type
+  * Reference specific dates, deadlines, or contact methods
+  * Make it easy for them to respond
+- **Closing**: Professional but warm, reference their specific interests again
+
+STYLE GUIDELINES:
+- Write 4-6 detailed paragraphs (not short, generic statements)
+- Use specific details from their notes in every paragraph
+- Vary sentence structure and length for natural flow
+- Include 2-3 industry-specific references or trends
+- Make it feel like you've researched their background extensively
+- Use their notes as the foundation for the entire email
+- Don't be generic - every sentence should feel personal to them
+
+LENGTH REQUIREMENT: The email body should be 300-500 words, providing substantial detail and personalization.
+"""
+
+EMAIL_PROMPT = (
+    """\
+You are an expert email copywriter specializing in hackathon outreach campaigns.
+Your goal is to create highly personalized, compelling emails that feel like they were written specifically for each recipient.
+
+"""
+    + EMAIL_HACKATHON_DETAILS
+    + """
+CONTACT DETAILS:
+- Name: {name}
+- Role: {role}
+- Company: {company}
+- Contact Type: {contact_type}
+- Notes: {notes} (CRITICAL: This is the most important field for personalization)
+
+CONTEXT & TONE:
+- Tone: {tone}
+- Focus: {focus}
+- Call to Action: {call_to_action}
+- Key Benefits: {benefits}
+
+"""
+    + EMAIL_GUIDELINES
+    + """
+CRITICAL OUTPUT FORMAT REQUIREMENT:
+You MUST return ONLY a valid JSON object with exactly this structure:
+{{
+    "subject": "Your personalized subject line here (50-60 characters)",
+    "body": "Your detailed email body here with multiple paragraphs (300-500 words)"
+}}
+
+DO NOT include any other text, explanations, or markdown formatting.
+DO NOT use markdown code blocks.
+Return ONLY the raw JSON object.
+
+The email should feel like it was written specifically for {name} at {company} after extensive research, with their notes being the central focus of personalization.
+"""
+)
+
+# Generates one email per contact for several contacts in a single request
+BATCH_EMAIL_PROMPT = (
+    """\
+You are an expert email copywriter specializing in hackathon outreach campaigns.
+Your goal is to create highly personalized, compelling emails that feel like they were written specifically for each recipient.
+You will write one separate email for EACH contact listed below.
+
+"""
+    + EMAIL_HACKATHON_DETAILS
+    + """
+CONTACTS (JSON array). Each contact has an "id", their details (name, role,
+company, contact_type, notes - notes are the most important field for
+personalization) and the tone, focus, call_to_action and benefits to use for
+their email:
+{contacts}
+
+Apply ALL of the following requirements to EACH email independently. Never
+mix details between contacts.
+
+"""
+    + EMAIL_GUIDELINES
+    + """
+CRITICAL OUTPUT FORMAT REQUIREMENT:
+You MUST return ONLY a valid JSON array with exactly one object per contact, in this structure:
+[
+    {{
+        "id": "The contact's id, copied exactly",
+        "subject": "Their personalized subject line here (50-60 characters)",
+        "body": "Their detailed email body here with multiple paragraphs (300-500 words)"
+    }}
+]
+
+DO NOT include any other text, explanations, or markdown formatting.
+DO NOT use markdown code blocks.
+Return ONLY the raw JSON array.
+"""
+)
+
+
+@dataclass(slots=True)
 class Contact:
     """Contact information from CSV"""
 
@@ -34,12 +229,139 @@ class Contact:
     notes: str = ""
 
 
+class ContactBatch:
+    """
+    Columnar storage for many contacts.
+
+    Each field is kept in its own list instead of one object per contact, and
+    role/company values (which repeat heavily in real contact lists) are
+    interned so every repeat shares a single string. Contacts are
+    materialized on access.
+    """
+
+    __slots__ = (
+        "names",
+        "emails",
+        "roles",
+        "companies",
+        "phones",
+        "notes",
+        "contact_types",
+        "category_counts",
+    )
+
+    def __init__(self, contacts: Iterable[Contact] = ()):
+        self.names: List[str] = []
+        self.emails: List[str] = []
+        self.roles: List[str] = []
+        self.companies: List[str] = []
+        self.phones: List[str] = []
+        self.notes: List[str] = []
+        self.contact_types: Optional[Sequence[str]] = None
+        self.category_counts: Optional[Dict[str, int]] = None
+        for contact in contacts:
+            self.append(contact)
+
+    def append(self, contact: Contact) -> None:
+        """Add a contact to the batch"""
+        self.names.append(contact.name)
+        self.emails.append(contact.email)
+        self.roles.append(sys.intern(contact.role))
+        self.companies.append(sys.intern(contact.company))
+        self.phones.append(contact.phone)
+        self.notes.append(contact.notes)
+
+    def clear(self) -> None:
+        """Remove all contacts from the batch"""
+        for column in (
+            self.names,
+            self.emails,
+            self.roles,
+            self.companies,
+            self.phones,
+            self.notes,
+        ):
+            column.clear()
+        self.contact_types = None
+        self.category_counts = None
+
+    def __len__(self) -> int:
+        return len(self.emails)
+
+    def __getitem__(self, index: int) -> Contact:
+        return Contact(
+            name=self.names[index],
+            email=self.emails[index],
+            role=self.roles[index],
+            company=self.companies[index],
+            phone=self.phones[index],
+            notes=self.notes[index],
+        )
+
+    def __iter__(self) -> Iterator[Contact]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def type_counts(self) -> Dict[str, int]:
+        """Return summary counts per contact type (requires classification)"""
+        if self.category_counts is None:
+            raise ValueError("Contact batch has not been classified")
+        return {
+            category + "s": count for category, count in self.category_counts.items()
+        }
+
+
+@dataclass
+class RowError:
+    """A CSV row that could not be turned into a Contact"""
+
+    line: int
+    error: str
+
+
+CONTACT_COLUMNS = ("name", "email", "role", "company", "phone", "notes")
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+CSV_CHUNK_SIZE = 64 * 1024
+
+# DictReader key for values beyond the header's columns
+_EXTRA_FIELDS = "__extra__"
+
+
+def iter_csv_lines(
+    stream: BinaryIO, chunk_size: int = CSV_CHUNK_SIZE, encoding: str = "utf-8-sig"
+) -> Iterator[str]:
+    """
+    Decode a binary stream into lines, reading ``chunk_size`` bytes at a time.
+
+    Lines keep their newline so quoted fields spanning several lines are
+    reassembled by the csv module.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pending = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        pending += decoder.decode(chunk, final=not chunk)
+        if "\n" in pending:
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                yield line + "\n"
+        if not chunk:
+            break
+    if pending:
+        yield pending
+
+
+def _count(stats: Optional[Dict[str, int]], key: str, amount: int = 1) -> None:
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + amount
+
+
 class OutreachService:
     """Main service for handling outreach operations"""
 
     def __init__(self):
         self.gemini = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",  # Using the latest model
+            model=EMAIL_MODEL,  # Using the latest model
             google_api_key=os.getenv("GOOGLE_API_KEY"),
             temperature=0.7,  # Slightly higher creativity
         )
@@ -47,6 +369,41 @@ class OutreachService:
         # SMTP Configuration
         self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
+        self.smtp_use_tls = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+        self.smtp_username = None
+        self.smtp_password = None
+        self.from_email = None
+        self.smtp_pool: Optional[SMTPConnectionPool] = None
+
+        self.classifier = ContactClassifier(load_classifier_keywords())
+
+        # Prompts and chains are built once and shared by every generation
+        self.email_chain = self._get_email_prompt() | self.gemini | StrOutputParser()
+        self.retry_chain = self._get_retry_prompt() | self.gemini | StrOutputParser()
+        self.batch_email_chain = (
+            self._get_batch_email_prompt() | self.gemini | StrOutputParser()
+        )
+
+        # Drafts shared by contacts with identical prompt inputs
+        self.email_cache = create_email_cache()
+        self._inflight_drafts: Dict[str, asyncio.Future] = {}
+
+        # Parse/retry counters across all generations
+        self._generation_counts = dict.fromkeys(GENERATION_COUNTERS, 0)
+        self._generation_counts_lock = threading.Lock()
+
+    def _count_generation(self, key: str) -> None:
+        with self._generation_counts_lock:
+            self._generation_counts[key] += 1
+
+    def generation_stats(self) -> Dict[str, Any]:
+        """Return parse failure, regeneration and fallback counters and rates"""
+        with self._generation_counts_lock:
+            stats: Dict[str, Any] = dict(self._generation_counts)
+        responses = stats["responses"]
+        for key in ("parse_failures", "recovered", "too_short"):
+            stats[key + "_rate"] = stats[key] / responses if responses else 0.0
+        return stats
 
     def update_smtp_credentials(self, username: str, password: str, from_email: str):
         """Update SMTP credentials dynamically"""
@@ -54,53 +411,112 @@ class OutreachService:
         self.smtp_password = password
         self.from_email = from_email
 
+        # Connections authenticated with the old credentials are discarded
+        if self.smtp_pool is not None:
+            self.smtp_pool.close()
+        self.smtp_pool = SMTPConnectionPool(
+            host=self.smtp_server,
+            port=self.smtp_port,
+            username=username,
+            password=password,
+            use_tls=self.smtp_use_tls,
+            max_connections=int(os.getenv("SMTP_POOL_SIZE", "2")),
+            max_messages_per_connection=int(
+                os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100")
+            ),
+        )
+
+    def iter_contacts(
+        self,
+        lines: Iterable[str],
+        on_error: Optional[Callable[[RowError], None]] = None,
+        unique_emails: bool = False,
+    ) -> Iterator[Contact]:
+        """
+        Lazily parse CSV lines into validated contacts.
+
+        Rows that cannot be used (malformed, too many fields, missing or
+        invalid email) are skipped and reported through ``on_error``. With
+        ``unique_emails``, a row repeating an earlier row's email is skipped
+        and reported too; this keeps one line number per email in memory.
+
+        Raises:
+            ValueError: If the header is missing or has no email column.
+        """
+        reader = csv.DictReader(lines, restkey=_EXTRA_FIELDS)
+        try:
+            fieldnames = reader.fieldnames
+        except csv.Error as e:
+            raise ValueError(f"Error processing CSV: {str(e)}")
+        if not fieldnames:
+            raise ValueError("CSV is empty")
+        reader.fieldnames = [name.strip().lower() for name in fieldnames]
+        if "email" not in reader.fieldnames:
+            raise ValueError("CSV must have an 'email' column")
+
+        first_lines: Dict[str, int] = {}
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                if on_error:
+                    on_error(RowError(line=reader.line_num, error=str(e)))
+                continue
+
+            error = None
+            values = {
+                column: (row.get(column) or "").strip() for column in CONTACT_COLUMNS
+            }
+            if _EXTRA_FIELDS in row:
+                error = "Row has more fields than the header"
+            elif not values["email"]:
+                error = "Missing email"
+            elif not EMAIL_PATTERN.match(values["email"]):
+                error = f"Invalid email '{values['email']}'"
+            elif unique_emails:
+                first_line = first_lines.setdefault(values["email"], reader.line_num)
+                if first_line != reader.line_num:
+                    error = (
+                        f"Duplicate email '{values['email']}' "
+                        f"(first on line {first_line})"
+                    )
+
+            if error is not None:
+                if on_error:
+                    on_error(RowError(line=reader.line_num, error=error))
+                continue
+            yield Contact(**values)
+
     def process_csv(self, csv_content: str) -> List[Contact]:
         """Process uploaded CSV content and return structured contacts"""
-        try:
-            # Clean the CSV content and create a StringIO object for pandas
-            csv_content = csv_content.strip()
-            csv_io = StringIO(csv_content)
-
-            # Parse CSV content using StringIO
-            df = pd.read_csv(csv_io)
-
-            contacts = []
-            for _, row in df.iterrows():
-                contact = Contact(
-                    name=str(row.get("name", "")),
-                    email=str(row.get("email", "")),
-                    role=str(row.get("role", "")),
-                    company=str(row.get("company", "")),
-                    phone=str(row.get("phone", "")),
-                    notes=str(row.get("notes", "")),
-                )
-                contacts.append(contact)
+        return list(self.iter_contacts(StringIO(csv_content.strip())))
 
-            return contacts
-        except Exception as e:
-            raise ValueError(f"Error processing CSV: {str(e)}")
+    def load_contact_batch(self, csv_content: str) -> ContactBatch:
+        """Parse CSV content straight into a classified ContactBatch"""
+        batch = ContactBatch(self.iter_contacts(StringIO(csv_content.strip())))
+        self.classify_batch(batch)
+        return batch
 
     def classify_contact(self, contact: Contact) -> str:
         """Classify contact based on role and company information"""
-        role_lower = contact.role.lower()
-        company_lower = contact.company.lower()
+        return self.classifier.classify(contact.role, contact.company)
 
-        # Simple classification logic
-        if any(
-            word in role_lower
-            for word in ["judge", "mentor", "alumni", "past employee"]
-        ):
-            return "judge"
-        elif any(word in role_lower for word in ["sponsor", "partner", "corporate"]):
-            return "sponsor"
-        else:
-            return "participant"
+    def classify_batch(self, batch: ContactBatch) -> Sequence[str]:
+        """Classify every contact in a batch in one vectorized pass
 
-    def generate_personalized_email(
-        self, contact: Contact, contact_type: str
-    ) -> Dict[str, str]:
-        """Generate complete personalized email using Gemini AI"""
+        The category array and per-category counts are stored on the batch.
+        """
+        contact_types, counts = self.classifier.classify_many(
+            batch.roles, batch.companies
+        )
+        batch.contact_types = contact_types
+        batch.category_counts = counts
+        return contact_types
 
+    def _get_email_context(self, contact_type: str) -> Dict[str, str]:
+        """Return tone/focus/call-to-action guidance for a contact type"""
         # Create dynamic context based on contact type
         context_prompts = {
             "participant": {
@@ -123,190 +539,422 @@ class OutreachService:
             },
         }
 
-        context = context_prompts.get(contact_type, context_prompts["participant"])
+        return context_prompts.get(contact_type, context_prompts["participant"])
 
-        prompt_template = ChatPromptTemplate.from_template("""
-        You are an expert email copywriter specializing in hackathon outreach campaigns. 
-        Your goal is to create highly personalized, compelling emails that feel like they were written specifically for each recipient.
-        
-        HACKATHON DETAILS (Use these specific details throughout the email):
-        - Event: "TechInnovate 2024" - A 48-hour innovation marathon
-        - Date: March 15-17, 2024
-        - Location: University of Maryland, College Park
-        - Theme: "AI-Powered Solutions for Tomorrow's Challenges"
-        - Prize Pool: $25,000+ in cash prizes and tech gadgets
-        - Special Tracks: AI/ML, Sustainability, Healthcare Tech, FinTech, Education Innovation
-        - Mentors: Industry experts from Google, Microsoft, Amazon, and local startups
-        - Workshops: Hands-on sessions on AI tools, pitch development, and business modeling
-        - Networking: 500+ participants, 50+ mentors, 20+ sponsor representatives
-        - Post-Event: Demo day with VCs and potential investors
-        
-        CONTACT DETAILS:
-        - Name: {name}
-        - Role: {role}
-        - Company: {company}
-        - Contact Type: {contact_type}
-        - Notes: {notes} (CRITICAL: This is the most important field for personalization)
-        
-        CONTEXT & TONE:
-        - Tone: {tone}
-        - Focus: {focus}
-        - Call to Action: {call_to_action}
-        - Key Benefits: {benefits}
-        
-        CRITICAL PERSONALIZATION REQUIREMENTS (Focus heavily on these):
-        1. **NOTES FIELD INTEGRATION (MOST IMPORTANT)**: 
-           - Extract every detail from their notes
-           - Reference their specific interests, skills, or background mentioned
-           - Connect their notes to specific hackathon opportunities
-           - If they mention AI/ML, reference the AI track and workshops
-           - If they mention previous experience, acknowledge it
-           - If they mention specific goals, address them directly
-        
-        2. **Company-Specific Deep Dive**: 
-           - Research their company's industry and recent developments
-           - Mention specific company achievements, news, or projects
-           - Connect their company's mission to hackathon themes
-           - Reference their company's location if relevant to the event
-        
-        3. **Role-Based Specificity**:
-           - Don't just mention their job title - explain HOW their role connects to hackathon opportunities
-           - For engineers: mention specific tech stacks, tools, or challenges
-           - For managers: highlight leadership and team-building opportunities
-           - For students: emphasize learning and career development
-        
-        4. **Industry Context & Trends**:
-           - Reference current industry challenges or opportunities
-           - Mention specific technologies or methodologies relevant to their field
-           - Connect to broader industry trends (AI revolution, sustainability focus, etc.)
-        
-        EMAIL STRUCTURE (Make each section detailed and personalized):
-        - **Subject Line**: 50-60 characters, specific to their notes/company/role, compelling
-        - **Greeting**: Use their name naturally, reference their company
-        - **Opening Hook (2-3 sentences)**: 
-          * Start with something specific from their notes or company
-          * Connect it to current industry trends or challenges
-          * Lead into the hackathon opportunity
-        - **Personalized Value Proposition (3-4 sentences)**:
-          * What specific benefits will THEY get based on their notes/role
-          * Reference specific hackathon tracks, workshops, or opportunities
-          * Connect to their stated interests or goals
-        - **Detailed Personalization (4-5 sentences)**:
-          * Deep dive into their notes - extract and expand on every detail
-          * Connect their background to specific hackathon elements
-          * Mention relevant mentors, workshops, or networking opportunities
-        - **Specific Call to Action (2-3 sentences)**:
-          * Clear next steps based on their contact type
-          * Reference specific dates, deadlines, or contact methods
-          * Make it easy for them to respond
-        - **Closing**: Professional but warm, reference their specific interests again
-        
-        STYLE GUIDELINES:
-        - Write 4-6 detailed paragraphs (not short, generic statements)
-        - Use specific details from their notes in every paragraph
-        - Vary sentence structure and length for natural flow
-        - Include 2-3 industry-specific references or trends
-        - Make it feel like you've researched their background extensively
-        - Use their notes as the foundation for the entire email
-        - Don't be generic - every sentence should feel personal to them
-        
-        LENGTH REQUIREMENT: The email body should be 300-500 words, providing substantial detail and personalization.
-        
-        CRITICAL OUTPUT FORMAT REQUIREMENT:
-        You MUST return ONLY a valid JSON object with exactly this structure:
-        {{
-            "subject": "Your personalized subject line here (50-60 characters)",
-            "body": "Your detailed email body here with multiple paragraphs (300-500 words)"
-        }}
-        
-        DO NOT include any other text, explanations, or markdown formatting.
-        DO NOT use markdown code blocks.
-        Return ONLY the raw JSON object.
-        
-        The email should feel like it was written specifically for {name} at {company} after extensive research, with their notes being the central focus of personalization.
-        """)
-
-        chain = prompt_template | self.gemini | StrOutputParser()
+    def _get_email_prompt(self) -> ChatPromptTemplate:
+        """Return the prompt template used to generate personalized emails"""
+        return ChatPromptTemplate.from_template(EMAIL_PROMPT)
 
-        try:
-            response = chain.invoke(
-                {
-                    "name": contact.name,
-                    "role": contact.role,
-                    "company": contact.company,
-                    "contact_type": contact_type,
-                    "notes": contact.notes,
-                    "tone": context["tone"],
-                    "focus": context["focus"],
-                    "call_to_action": context["call_to_action"],
-                    "benefits": context["benefits"],
-                }
-            )
+    def _get_batch_email_prompt(self) -> ChatPromptTemplate:
+        """Return the prompt template used to generate several emails at once"""
+        return ChatPromptTemplate.from_template(BATCH_EMAIL_PROMPT)
 
-            # Debug logging
-            print(f"\n=== AI Response for {contact.name} ===")
-            print(f"Raw response length: {len(response)} characters")
-            print(f"Raw response preview: {response[:200]}...")
-            print(f"Response contains 'subject': {'subject' in response.lower()}")
-            print(f"Response contains 'body': {'body' in response.lower()}")
-            print(f"Response contains '{{': {'{' in response}")
-            print(f"Response contains '}}': {'}' in response}")
-            print("=" * 50)
+    def _email_inputs(
+        self, contact: Contact, contact_type: str, context: Dict[str, str]
+    ) -> Dict[str, str]:
+        """Build the prompt inputs for a contact"""
+        return {
+            "name": contact.name,
+            "role": contact.role,
+            "company": contact.company,
+            "contact_type": contact_type,
+            "notes": contact.notes,
+            "tone": context["tone"],
+            "focus": context["focus"],
+            "call_to_action": context["call_to_action"],
+            "benefits": context["benefits"],
+        }
 
-            # Clean the response and try to parse JSON
-            import json
-            import re
+    def _parse_email_response(
+        self, response: str, contact: Contact, contact_type: str
+    ) -> Tuple[Optional[Dict[str, str]], bool]:
+        """Parse the AI response into an email, or return None if it is too short
+
+        The flag tells whether the email is the model's own complete draft,
+        which may be cached; text scraped from a non-JSON response is not.
+        """
+        self._count_generation("responses")
+
+        logger.debug(
+            "AI response for %s (%d chars): %.200s",
+            contact.email,
+            len(response),
+            response,
+            extra={"event": "email.response", "response_chars": len(response)},
+        )
 
-            # Clean the response - remove markdown formatting if present
-            cleaned_response = response.strip()
-            cleaned_response = re.sub(r"```json\s*", "", cleaned_response)
-            cleaned_response = re.sub(r"\s*```", "", cleaned_response)
+        # Find the JSON object even if wrapped in fences or surrounded by prose
+        parsed = find_json(response, dict, required_keys=("subject", "body"))
+        if parsed is None or not all(
+            isinstance(parsed.value[key], str) for key in ("subject", "body")
+        ):
+            logger.warning(
+                "No JSON email object found in AI response for %s",
+                contact.email,
+                extra={"event": "email.parse_failure"},
+            )
+            self._count_generation("parse_failures")
+            # Try to extract content manually
+            return self._extract_email_from_text(response, contact, contact_type), False
+        if not parsed.clean:
+            self._count_generation("recovered")
+
+        email_data = parsed.value
+        # Ensure the body is long enough (at least MIN_EMAIL_WORDS words)
+        body_word_count = len(email_data["body"].split())
+        logger.debug(
+            "Parsed email for %s: %d words",
+            contact.email,
+            body_word_count,
+            extra={"event": "email.parsed", "words": body_word_count},
+        )
+        if body_word_count < MIN_EMAIL_WORDS:
+            logger.info(
+                "Email for %s too short (%d words), regenerating",
+                contact.email,
+                body_word_count,
+                extra={"event": "email.too_short", "words": body_word_count},
+            )
+            self._count_generation("too_short")
+            return None, False
 
-            print(f"Cleaned response: {cleaned_response[:200]}...")
+        return {"subject": email_data["subject"], "body": email_data["body"]}, True
 
-            try:
-                email_data = json.loads(cleaned_response)
-                print(
-                    f"JSON parsed successfully! Subject: {email_data.get('subject', 'N/A')}"
-                )
-                print(f"Body word count: {len(email_data.get('body', '').split())}")
-
-                # Validate the response has required fields
-                if "subject" in email_data and "body" in email_data:
-                    # Ensure the body is long enough (at least 200 words)
-                    body_word_count = len(email_data["body"].split())
-                    if body_word_count < 200:
-                        print(
-                            f"Email too short ({body_word_count} words), regenerating..."
-                        )
-                        # If too short, regenerate with a more specific prompt
-                        return self._regenerate_longer_email(
-                            contact, contact_type, context
-                        )
+    def _draft_key(self, contact: Contact, contact_type: str) -> str:
+        """Return the generation cache key for a contact's prompt inputs"""
+        return draft_key(
+            EMAIL_MODEL, contact_type, contact.role, contact.company, contact.notes
+        )
 
-                    return {
-                        "subject": email_data["subject"],
-                        "body": email_data["body"],
-                    }
-                else:
-                    print("Missing required fields in AI response")
-                    raise ValueError("Missing required fields in AI response")
+    def _generate_email(
+        self, contact: Contact, contact_type: str, context: Dict[str, str]
+    ) -> Tuple[Dict[str, str], bool]:
+        """Generate an email with the LLM, regenerating it if too short
 
-            except json.JSONDecodeError as json_error:
-                print(f"JSON parsing failed: {json_error}")
-                # If JSON parsing fails, try to extract content manually
-                return self._extract_email_from_text(response, contact, contact_type)
+        Returns the email and whether it may be cached for other contacts.
+        """
+        response = self.email_chain.invoke(
+            self._email_inputs(contact, contact_type, context)
+        )
+        email_data, cacheable = self._parse_email_response(
+            response, contact, contact_type
+        )
+        if email_data is None:
+            # If too short, regenerate with a more specific prompt
+            return self._regenerate_longer_email(contact, contact_type, context)
+        return email_data, cacheable
+
+    async def _agenerate_email(
+        self, contact: Contact, contact_type: str, context: Dict[str, str]
+    ) -> Tuple[Dict[str, str], bool]:
+        """Generate an email with the LLM without blocking the event loop"""
+        async with model_limiter(EMAIL_MODEL):
+            response = await self.email_chain.ainvoke(
+                self._email_inputs(contact, contact_type, context)
+            )
+        email_data, cacheable = self._parse_email_response(
+            response, contact, contact_type
+        )
+        if email_data is None:
+            return await self._aregenerate_longer_email(contact, contact_type, context)
+        return email_data, cacheable
 
+    def generate_personalized_email(
+        self,
+        contact: Contact,
+        contact_type: str,
+        cache_stats: Optional[Dict[str, int]] = None,
+    ) -> Dict[str, str]:
+        """Generate complete personalized email using Gemini AI
+
+        Contacts whose prompt inputs match a cached draft reuse it with their
+        own name substituted. ``cache_stats`` (if given) counts ``hits`` and
+        ``misses``.
+        """
+        key = self._draft_key(contact, contact_type)
+        template = self.email_cache.get(key)
+        if template is not None:
+            _count(cache_stats, "hits")
+            return personalize(template, contact.name)
+        _count(cache_stats, "misses")
+
+        context = self._get_email_context(contact_type)
+        try:
+            email_data, cacheable = self._generate_email(contact, contact_type, context)
         except Exception as e:
-            print(f"Error generating email for {contact.name}: {str(e)}")
+            logger.warning(
+                "Error generating email for %s: %s",
+                contact.email,
+                e,
+                extra={"event": "email.generation_error"},
+            )
             # Fallback to a more detailed generic email
             return self._generate_fallback_email(contact, contact_type, context)
 
-    def _regenerate_longer_email(
-        self, contact: Contact, contact_type: str, context: Dict
+        # Degraded drafts (scraped or padded text) are sent, never reused
+        if cacheable:
+            template = templatize(email_data, contact.name)
+            self.email_cache.put(key, template, contact.name)
+        return email_data
+
+    async def agenerate_personalized_email(
+        self,
+        contact: Contact,
+        contact_type: str,
+        cache_stats: Optional[Dict[str, int]] = None,
     ) -> Dict[str, str]:
-        """Regenerate email with more specific length requirements"""
-        retry_prompt = ChatPromptTemplate.from_template("""
+        """Generate complete personalized email without blocking the event loop
+
+        Like ``generate_personalized_email``, and concurrent requests for the
+        same prompt inputs also wait for a single in-flight generation instead
+        of each calling the LLM (counted as ``deduplicated``).
+        """
+        key = self._draft_key(contact, contact_type)
+        template = self.email_cache.get(key)
+        if template is not None:
+            _count(cache_stats, "hits")
+            return personalize(template, contact.name)
+
+        inflight = self._inflight_drafts.get(key)
+        if inflight is not None:
+            template = await asyncio.shield(inflight)
+            # None means that generation failed; fall through and try our own
+            if template is not None:
+                _count(cache_stats, "deduplicated")
+                return personalize(template, contact.name)
+        _count(cache_stats, "misses")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_drafts[key] = future
+        template = None
+        context = self._get_email_context(contact_type)
+        try:
+            email_data, cacheable = await self._agenerate_email(
+                contact, contact_type, context
+            )
+            # Degraded drafts are not shared, and waiters must not reuse a
+            # draft that still names this contact
+            if cacheable:
+                template = templatize(email_data, contact.name)
+                if not self.email_cache.put(key, template, contact.name):
+                    template = None
+            return email_data
+        except Exception as e:
+            logger.warning(
+                "Error generating email for %s: %s",
+                contact.email,
+                e,
+                extra={"event": "email.generation_error"},
+            )
+            return self._generate_fallback_email(contact, contact_type, context)
+        finally:
+            future.set_result(template)
+            if self._inflight_drafts.get(key) is future:
+                del self._inflight_drafts[key]
+
+    def _plan_batch(
+        self,
+        items: Sequence[Tuple[Contact, str]],
+        cache_stats: Optional[Dict[str, int]],
+    ) -> Tuple[List[Optional[Dict[str, str]]], List[Tuple[str, int]]]:
+        """Serve cached items and pick one contact per uncached persona
+
+        Returns the results so far (None where still missing) and the
+        ``(cache key, item index)`` pairs to generate in the batch request.
+        Contacts sharing a persona with a batched or in-flight contact are
+        left to the per-contact path, where they reuse that draft.
+        """
+        results: List[Optional[Dict[str, str]]] = [None] * len(items)
+        batch: Dict[str, int] = {}
+        for index, (contact, contact_type) in enumerate(items):
+            key = self._draft_key(contact, contact_type)
+            if key in batch or key in self._inflight_drafts:
+                continue
+            template = self.email_cache.get(key)
+            if template is not None:
+                _count(cache_stats, "hits")
+                results[index] = personalize(template, contact.name)
+            else:
+                batch[key] = index
+        return results, list(batch.items())
+
+    def _batch_inputs(
+        self, items: Sequence[Tuple[Contact, str]], batch: List[Tuple[str, int]]
+    ) -> Dict[str, str]:
+        """Build the batch prompt inputs, using the position in the batch as id"""
+        contacts = []
+        for position, (_, index) in enumerate(batch):
+            contact, contact_type = items[index]
+            context = self._get_email_context(contact_type)
+            inputs = self._email_inputs(contact, contact_type, context)
+            contacts.append({"id": str(position), **inputs})
+        return {"contacts": json.dumps(contacts, indent=2)}
+
+    def _parse_batch_response(
+        self, response: str, count: int
+    ) -> List[Optional[Dict[str, str]]]:
+        """Parse a batch response into one validated email (or None) per contact"""
+        emails: List[Optional[Dict[str, str]]] = [None] * count
+        self._count_generation("responses")
+        parsed = find_json(response, list) or find_json(
+            response, dict, required_keys=("emails",)
+        )
+        if parsed is None:
+            logger.warning(
+                "No JSON email array found in batch response",
+                extra={"event": "email.batch_parse_failure"},
+            )
+            self._count_generation("parse_failures")
+            return emails
+        if not parsed.clean:
+            self._count_generation("recovered")
+        data = parsed.value
+        if isinstance(data, dict):
+            data = data["emails"]
+        if not isinstance(data, list):
+            return emails
+
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            try:
+                position = int(item.get("id"))
+            except (TypeError, ValueError):
+                continue
+            subject, body = item.get("subject"), item.get("body")
+            if (
+                0 <= position < count
+                and isinstance(subject, str)
+                and isinstance(body, str)
+                and subject.strip()
+                and len(body.split()) >= MIN_EMAIL_WORDS
+            ):
+                emails[position] = {"subject": subject, "body": body}
+        return emails
+
+    def _store_batch_emails(
+        self,
+        items: Sequence[Tuple[Contact, str]],
+        batch: List[Tuple[str, int]],
+        emails: List[Optional[Dict[str, str]]],
+        results: List[Optional[Dict[str, str]]],
+        cache_stats: Optional[Dict[str, int]],
+        batch_stats: Optional[Dict[str, int]],
+    ) -> Dict[str, Dict[str, str]]:
+        """Record valid batch emails in the results and the draft cache"""
+        _count(batch_stats, "requests")
+        _count(batch_stats, "contacts", len(batch))
+        templates = {}
+        for (key, index), email_data in zip(batch, emails):
+            if email_data is None:
+                _count(batch_stats, "fallbacks")
+                continue
+            _count(cache_stats, "misses")
+            name = items[index][0].name
+            template = templatize(email_data, name)
+            if self.email_cache.put(key, template, name):
+                templates[key] = template
+            results[index] = email_data
+        return templates
+
+    def generate_personalized_emails(
+        self,
+        items: Sequence[Tuple[Contact, str]],
+        cache_stats: Optional[Dict[str, int]] = None,
+        batch_stats: Optional[Dict[str, int]] = None,
+    ) -> List[Dict[str, str]]:
+        """Generate emails for several ``(contact, contact_type)`` pairs at once
+
+        Cached personas are served from the draft cache and the remaining
+        distinct personas share a single LLM request. Contacts missing from
+        the response or failing validation fall back to
+        ``generate_personalized_email``. ``batch_stats`` (if given) counts
+        batch ``requests``, batched ``contacts`` and ``fallbacks``.
+        """
+        results, batch = self._plan_batch(items, cache_stats)
+        if len(batch) > 1:
+            try:
+                response = self.batch_email_chain.invoke(
+                    self._batch_inputs(items, batch)
+                )
+                emails = self._parse_batch_response(response, len(batch))
+            except Exception as e:
+                logger.warning(
+                    "Error generating batch of %d emails: %s",
+                    len(batch),
+                    e,
+                    extra={"event": "email.batch_error"},
+                )
+                emails = [None] * len(batch)
+            self._store_batch_emails(
+                items, batch, emails, results, cache_stats, batch_stats
+            )
+
+        for index, email_data in enumerate(results):
+            if email_data is None:
+                results[index] = self.generate_personalized_email(
+                    *items[index], cache_stats=cache_stats
+                )
+        return results
+
+    async def agenerate_personalized_emails(
+        self,
+        items: Sequence[Tuple[Contact, str]],
+        cache_stats: Optional[Dict[str, int]] = None,
+        batch_stats: Optional[Dict[str, int]] = None,
+    ) -> List[Dict[str, str]]:
+        """Generate emails for several contacts without blocking the event loop
+
+        See ``generate_personalized_emails``. Batched personas are registered
+        as in flight, so concurrent requests for them wait for the batch.
+        """
+        results, batch = self._plan_batch(items, cache_stats)
+        if len(batch) > 1:
+            loop = asyncio.get_running_loop()
+            futures = {}
+            for key, _ in batch:
+                futures[key] = self._inflight_drafts[key] = loop.create_future()
+            templates: Dict[str, Dict[str, str]] = {}
+            try:
+                try:
+                    async with model_limiter(EMAIL_MODEL):
+                        response = await self.batch_email_chain.ainvoke(
+                            self._batch_inputs(items, batch)
+                        )
+                    emails = self._parse_batch_response(response, len(batch))
+                except Exception as e:
+                    logger.warning(
+                        "Error generating batch of %d emails: %s",
+                        len(batch),
+                        e,
+                        extra={"event": "email.batch_error"},
+                    )
+                    emails = [None] * len(batch)
+                templates = self._store_batch_emails(
+                    items, batch, emails, results, cache_stats, batch_stats
+                )
+            finally:
+                for key, future in futures.items():
+                    future.set_result(templates.get(key))
+                    if self._inflight_drafts.get(key) is future:
+                        del self._inflight_drafts[key]
+
+        pending = [index for index, email_data in enumerate(results) if not email_data]
+        generated = await asyncio.gather(
+            *(
+                self.agenerate_personalized_email(
+                    *items[index], cache_stats=cache_stats
+                )
+                for index in pending
+            )
+        )
+        for index, email_data in zip(pending, generated):
+            results[index] = email_data
+        return results
+
+    def _get_retry_prompt(self) -> ChatPromptTemplate:
+        """Return the prompt used when the first email was too short"""
+        return ChatPromptTemplate.from_template("""
         The previous email was too short. Please generate a MUCH LONGER email for {name} at {company}.
         
         REQUIREMENTS:
@@ -320,10 +968,56 @@ class OutreachService:
         Return as JSON: {{"subject": "...", "body": "..."}}
         """)
 
-        chain = retry_prompt | self.gemini | StrOutputParser()
+    def _parse_retry_response(
+        self, response: str, contact: Contact, contact_type: str, context: Dict
+    ) -> Tuple[Dict[str, str], bool]:
+        """Parse the regenerated email, filling gaps from the fallback email
+
+        Only a complete regenerated draft of at least MIN_EMAIL_WORDS words
+        is flagged as cacheable.
+        """
+        self._count_generation("responses")
+        parsed = find_json(response, dict, required_keys=("subject", "body"))
+        if parsed is None:
+            self._count_generation("parse_failures")
+            raise ValueError("No JSON email object found in regenerated email")
+        if not parsed.clean:
+            self._count_generation("recovered")
+        subject, body = parsed.value["subject"], parsed.value["body"]
+        cacheable = (
+            isinstance(subject, str)
+            and isinstance(body, str)
+            and len(body.split()) >= MIN_EMAIL_WORDS
+        )
+        if not isinstance(subject, str):
+            subject = f"Personalized Invitation for {contact.name}"
+        # Only build (and count) the fallback email when its body is needed
+        if not isinstance(body, str):
+            body = self._generate_fallback_email(contact, contact_type, context)["body"]
+        return {"subject": subject, "body": body}, cacheable
 
-        try:
-            response = chain.invoke(
+    def _regenerate_longer_email(
+        self, contact: Contact, contact_type: str, context: Dict
+    ) -> Tuple[Dict[str, str], bool]:
+        """Regenerate email with more specific length requirements"""
+        self._count_generation("regenerations")
+        response = self.retry_chain.invoke(
+            {
+                "name": contact.name,
+                "role": contact.role,
+                "company": contact.company,
+                "notes": contact.notes,
+            }
+        )
+        return self._parse_retry_response(response, contact, contact_type, context)
+
+    async def _aregenerate_longer_email(
+        self, contact: Contact, contact_type: str, context: Dict
+    ) -> Tuple[Dict[str, str], bool]:
+        """Regenerate email with more specific length requirements, asynchronously"""
+        self._count_generation("regenerations")
+        async with model_limiter(EMAIL_MODEL):
+            response = await self.retry_chain.ainvoke(
                 {
                     "name": contact.name,
                     "role": contact.role,
@@ -331,23 +1025,7 @@ class OutreachService:
                     "notes": contact.notes,
                 }
             )
-
-            import json
-
-            email_data = json.loads(response.strip())
-            return {
-                "subject": email_data.get(
-                    "subject", f"Personalized Invitation for {contact.name}"
-                ),
-                "body": email_data.get(
-                    "body",
-                    self._generate_fallback_email(contact, contact_type, context)[
-                        "body"
-                    ],
-                ),
-            }
-        except:
-            return self._generate_fallback_email(contact, contact_type, context)
+        return self._parse_retry_response(response, contact, contact_type, context)
 
     def _extract_email_from_text(
         self, response: str, contact: Contact, contact_type: str
@@ -371,7 +1049,7 @@ class OutreachService:
             body = response.strip()
 
         # If the body is still too short, enhance it
-        if len(body.split()) < 200:
+        if len(body.split()) < MIN_EMAIL_WORDS:
             body = self._enhance_short_email(body, contact, contact_type)
 
         return {"subject": subject, "body": body}
@@ -396,6 +1074,7 @@ class OutreachService:
         self, contact: Contact, contact_type: str, context: Dict
     ) -> Dict[str, str]:
         """Generate a detailed fallback email when AI fails"""
+        self._count_generation("fallbacks")
         if contact_type == "participant":
             body = f"""Hi {contact.name},
 
@@ -474,7 +1153,9 @@ The TechInnovate 2024 Team"""
     ) -> Dict[str, Any]:
         """Send personalized email to contact"""
         try:
-            if not all([self.smtp_username, self.smtp_password, self.from_email]):
+            if self.smtp_pool is None or not all(
+                [self.smtp_username, self.smtp_password, self.from_email]
+            ):
                 raise ValueError("SMTP credentials not configured")
 
             # Create message
@@ -488,11 +1169,8 @@ The TechInnovate 2024 Team"""
 
             msg.attach(MIMEText(body, "plain"))
 
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.send_message(msg)
+            # Send email over a pooled, already-authenticated connection
+            self.smtp_pool.send_message(msg)
 
             return {
                 "success": True,
@@ -502,52 +1180,101 @@ The TechInnovate 2024 Team"""
             }
 
         except Exception as e:
+            logger.warning(
+                "Failed to send email to %s: %s",
+                contact.email,
+                e,
+                extra={"event": "email.send_error"},
+            )
             return {"success": False, "email": contact.email, "error": str(e)}
 
+    async def asend_email(
+        self, contact: Contact, contact_type: str, email_data: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """Send personalized email from a worker thread"""
+        return await asyncio.to_thread(self.send_email, contact, contact_type, email_data)
+
     def process_outreach_campaign(self, csv_content: str) -> Dict[str, Any]:
         """Process complete outreach campaign from CSV"""
         try:
-            # Process CSV
-            contacts = self.process_csv(csv_content)
+            # Process and classify CSV
+            batch = self.load_contact_batch(csv_content)
 
-            if not contacts:
+            if not batch:
                 return {"success": False, "error": "No contacts found in CSV"}
 
             results = []
+            cache_stats = {"hits": 0, "misses": 0}
             summary = {
-                "total_contacts": len(contacts),
-                "participants": 0,
-                "judges": 0,
-                "sponsors": 0,
+                "total_contacts": len(batch),
+                **batch.type_counts(),
                 "emails_sent": 0,
                 "emails_failed": 0,
+                "generation_cache": cache_stats,
             }
 
-            for contact in contacts:
-                # Classify contact
-                contact_type = self.classify_contact(contact)
-                summary[contact_type + "s"] += 1
+            # Contacts per generation request (1 disables batching)
+            batch_size = int(os.getenv("OUTREACH_GENERATION_BATCH_SIZE", "1"))
+            if batch_size > 1:
+                batch_stats = {"requests": 0, "contacts": 0, "fallbacks": 0}
+                summary["generation_batches"] = batch_stats
+
+            items = zip(batch, batch.contact_types)
+            while chunk := list(islice(items, batch_size)):
+                # Generate complete personalized emails
+                if batch_size > 1:
+                    emails = self.generate_personalized_emails(
+                        chunk, cache_stats=cache_stats, batch_stats=batch_stats
+                    )
+                else:
+                    emails = [
+                        self.generate_personalized_email(
+                            *chunk[0], cache_stats=cache_stats
+                        )
+                    ]
 
-                # Generate complete personalized email
-                email_data = self.generate_personalized_email(contact, contact_type)
+                for (contact, contact_type), email_data in zip(chunk, emails):
+                    # Send email
+                    result = self.send_email(contact, contact_type, email_data)
 
-                # Send email
-                result = self.send_email(contact, contact_type, email_data)
+                    if result["success"]:
+                        summary["emails_sent"] += 1
+                    else:
+                        summary["emails_failed"] += 1
 
-                if result["success"]:
-                    summary["emails_sent"] += 1
-                else:
-                    summary["emails_failed"] += 1
-
-                results.append(
-                    {"contact": contact, "contact_type": contact_type, "result": result}
-                )
+                    results.append(
+                        {
+                            "contact": contact,
+                            "contact_type": contact_type,
+                            "result": result,
+                        }
+                    )
 
             return {"success": True, "summary": summary, "results": results}
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    async def aprocess_outreach_campaign(self, csv_content: str) -> Dict[str, Any]:
+        """Process complete outreach campaign from CSV without blocking the event loop
+
+        Generation and sending run as a bounded, concurrent pipeline; see
+        ``outreach_pipeline.CampaignPipeline``.
+        """
+        try:
+            # Process and classify CSV
+            batch = await asyncio.to_thread(self.load_contact_batch, csv_content)
+
+            if not batch:
+                return {"success": False, "error": "No contacts found in CSV"}
+
+            return await CampaignPipeline(self).run(
+                batch, contact_types=batch.contact_types
+            )
+
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
     def test_email_generation(self, contact: Contact) -> Dict[str, str]:
         """Test email generation without sending - useful for debugging"""
         print(f"\n🧪 Testing email generation for: {contact.name}")
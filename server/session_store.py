@@ -0,0 +1,261 @@
+"""
+Session stores for chat agents.
+
+Sessions are bounded by count (least recently used sessions are evicted first)
+and by idle time. The in-memory backend keeps live agent objects; the SQLite
+backend persists each session's conversation state so sessions survive
+restarts and can be shared by several uvicorn workers.
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_TTL_SECONDS = 60 * 60
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(__file__), "sessions.sqlite")
+
+
+def estimate_state_bytes(state: Dict) -> int:
+    """Roughly estimate the memory held by a session's conversation state."""
+    size = 0
+    for turn in state.get("conversation_history", []):
+        size += sys.getsizeof(turn)
+        size += sum(sys.getsizeof(value) for value in turn.values())
+    size += sum(
+        sys.getsizeof(key) + sys.getsizeof(value)
+        for key, value in state.get("hackathon_details", {}).items()
+    )
+    return size
+
+
+class SessionStore:
+    """Base class for chat session stores."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.evictions_lru = 0
+        self.evictions_ttl = 0
+
+    def get(self, session_id: str):
+        """Return the agent for ``session_id``, or None if missing or expired."""
+        raise NotImplementedError
+
+    def put(self, session_id: str, agent) -> None:
+        """Store a new or updated agent for ``session_id``."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        """Remove a session."""
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, memory and eviction counters."""
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU + idle-TTL store of live agent objects for a single process."""
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        super().__init__(max_sessions, ttl_seconds)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        # Entries are kept in access order, so expired ones are at the front
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if now - last_access <= self.ttl_seconds:
+                break
+            del self._sessions[session_id]
+            self.evictions_ttl += 1
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def put(self, session_id: str, agent) -> None:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._sessions[session_id] = (agent, now)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions_lru += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+            memory = sum(
+                estimate_state_bytes(agent.to_state())
+                for agent, _ in self._sessions.values()
+            )
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "estimated_state_bytes": memory,
+                "evictions_lru": self.evictions_lru,
+                "evictions_ttl": self.evictions_ttl,
+            }
+
+
+class SqliteSessionStore(SessionStore):
+    """
+    Session store persisting agent state in SQLite.
+
+    Only the conversation state is stored; agents are rebuilt with
+    ``agent_from_state`` on every lookup, so any worker sharing the database
+    file sees the latest turn.
+    """
+
+    def __init__(
+        self,
+        agent_from_state: Callable[[Dict], Any],
+        path: str = DEFAULT_DB_PATH,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        super().__init__(max_sessions, ttl_seconds)
+        self._agent_from_state = agent_from_state
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)"
+        )
+        self._conn.commit()
+
+    def _expire(self, now: float) -> None:
+        cursor = self._conn.execute(
+            "DELETE FROM sessions WHERE last_access < ?", (now - self.ttl_seconds,)
+        )
+        self.evictions_ttl += cursor.rowcount
+
+    def get(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            row = self._conn.execute(
+                "SELECT state FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE sessions SET last_access = ? WHERE session_id = ?",
+                    (now, session_id),
+                )
+            self._conn.commit()
+        if row is None:
+            return None
+        return self._agent_from_state(json.loads(row[0]))
+
+    def put(self, session_id: str, agent) -> None:
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, last_access) "
+                "VALUES (?, ?, ?)",
+                (session_id, json.dumps(agent.to_state()), now),
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()
+            excess = count - self.max_sessions
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM sessions WHERE session_id IN "
+                    "(SELECT session_id FROM sessions ORDER BY last_access ASC LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions_lru += excess
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            self._expire(time.time())
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.commit()
+        return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+            self._conn.commit()
+            count, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(state)), 0) FROM sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "stored_state_bytes": stored,
+            "evictions_lru": self.evictions_lru,
+            "evictions_ttl": self.evictions_ttl,
+        }
+
+
+def create_session_store(agent_from_state: Callable[[Dict], Any]) -> SessionStore:
+    """
+    Create the session store selected by the environment.
+
+    ``SESSION_BACKEND`` is ``memory`` (default) or ``sqlite``; limits come from
+    ``SESSION_MAX`` and ``SESSION_TTL_SECONDS``, and the SQLite file from
+    ``SESSION_DB_PATH``.
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory")
+    max_sessions = int(os.getenv("SESSION_MAX", str(DEFAULT_MAX_SESSIONS)))
+    ttl_seconds = float(os.getenv("SESSION_TTL_SECONDS", str(DEFAULT_TTL_SECONDS)))
+
+    if backend == "sqlite":
+        return SqliteSessionStore(
+            agent_from_state,
+            path=os.getenv("SESSION_DB_PATH", DEFAULT_DB_PATH),
+            max_sessions=max_sessions,
+            ttl_seconds=ttl_seconds,
+        )
+    if backend == "memory":
+        return InMemorySessionStore(max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown SESSION_BACKEND '{backend}'")
@@ -1,6 +1,7 @@
 import httpx
 import os
 import shutil
+import time
 
 BASE_URL = "http://127.0.0.1:8000"
 DATA_DIR = "helper/data"
@@ -30,6 +31,17 @@ def setup():
             files = {"file": (TEST_FILE, f, "text/plain")}
             response = httpx.post(f"{BASE_URL}/api/add_wiki", files=files, timeout=30.0)
             response.raise_for_status()
+        job_id = response.json()["job_id"]
+
+        # Ingestion runs in the background; wait for the job to finish
+        while True:
+            job = httpx.get(f"{BASE_URL}/api/ingest/{job_id}", timeout=30.0).json()
+            if job["stage"] in ("completed", "failed"):
+                break
+            time.sleep(0.5)
+        if job["stage"] == "failed":
+            print(f"Ingestion failed: {job['error']}")
+            return False
         print("Successfully uploaded wiki and created index.")
     except httpx.RequestError as e:
         print(f"Error setting up: {e}")
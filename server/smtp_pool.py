@@ -0,0 +1,197 @@
+"""
+Pooled, persistent SMTP connections for bulk sending.
+
+Opening an SMTP connection costs a TCP handshake, STARTTLS and AUTH, so the
+pool keeps a few authenticated connections open and reuses them across
+messages. Idle connections are health-checked with NOOP before reuse, broken
+ones are replaced transparently, and each connection is retired after a
+configurable number of messages to stay under provider limits.
+"""
+
+import time
+import queue
+import smtplib
+import threading
+from typing import Any, Dict, Optional
+
+
+class _TrackingSMTP(smtplib.SMTP):
+    """SMTP client that records whether the current message reached DATA."""
+
+    data_started = False
+
+    def data(self, msg):
+        self.data_started = True
+        return super().data(msg)
+
+
+class _PooledConnection:
+    """An open SMTP connection and its usage counters."""
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.messages_sent = 0
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of authenticated SMTP connections."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        max_connections: int = 2,
+        max_messages_per_connection: int = 100,
+        health_check_after: float = 10.0,
+        timeout: float = 30.0,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_messages_per_connection = max_messages_per_connection
+        self.health_check_after = health_check_after
+        self.timeout = timeout
+
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.connections_opened = 0
+        self.connections_retired = 0
+        self.reconnects = 0
+        self.messages_sent = 0
+
+    def _connect(self) -> _PooledConnection:
+        server = _TrackingSMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return _PooledConnection(server)
+
+    def _is_healthy(self, conn: _PooledConnection) -> bool:
+        if time.monotonic() - conn.last_used < self.health_check_after:
+            return True
+        try:
+            status, _ = conn.server.noop()
+            return status == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> _PooledConnection:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._is_healthy(conn):
+                return conn
+            conn.close()
+            with self._lock:
+                self.reconnects += 1
+
+    def _release(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if self._closed or conn.messages_sent >= self.max_messages_per_connection:
+            conn.close()
+            with self._lock:
+                self.connections_retired += 1
+        else:
+            self._idle.put(conn)
+
+    def _reconnect_and_send(self, dead: _PooledConnection, msg) -> _PooledConnection:
+        dead.close()
+        with self._lock:
+            self.reconnects += 1
+        conn = self._connect()
+        try:
+            conn.server.send_message(msg)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def send_message(self, msg) -> None:
+        """
+        Send ``msg`` over a pooled connection.
+
+        If the connection turns out to be dead before the message reached the
+        DATA command, it is retried once on a fresh connection. A failure
+        after that is raised as is, since the message may have been delivered.
+        """
+        if self._closed:
+            raise RuntimeError("SMTP connection pool is closed")
+
+        with self._slots:
+            conn = self._acquire()
+            conn.server.data_started = False
+            try:
+                conn.server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                conn = self._resend_if_not_delivered(conn, msg)
+            except smtplib.SMTPException:
+                # Recipient/content errors leave the connection usable
+                conn.messages_sent += 1
+                self._release(conn)
+                raise
+            except OSError:
+                # Socket-level failure (reset, timeout)
+                conn = self._resend_if_not_delivered(conn, msg)
+
+            conn.messages_sent += 1
+            with self._lock:
+                self.messages_sent += 1
+            self._release(conn)
+
+    def _resend_if_not_delivered(
+        self, dead: _PooledConnection, msg
+    ) -> _PooledConnection:
+        # Called from an except block; a bare raise re-raises the send error
+        if dead.server.data_started:
+            # The server may already have accepted the message
+            dead.close()
+            with self._lock:
+                self.connections_retired += 1
+            raise
+        return self._reconnect_and_send(dead, msg)
+
+    def close(self) -> None:
+        """Close every idle connection and refuse further sends."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Return connection and message counters."""
+        with self._lock:
+            return {
+                "idle_connections": self._idle.qsize(),
+                "connections_opened": self.connections_opened,
+                "connections_retired": self.connections_retired,
+                "reconnects": self.reconnects,
+                "messages_sent": self.messages_sent,
+            }
@@ -0,0 +1,54 @@
+"""
+Tolerant parsing of JSON embedded in LLM responses.
+
+Models asked for "only JSON" still wrap it in markdown fences, prefix it with
+a sentence of prose, append a note, or put raw newlines inside strings.
+Instead of stripping known decorations with regexes, ``find_json`` scans the
+response for the first position where a complete JSON value of the expected
+shape can be decoded.
+"""
+
+import json
+from typing import Any, NamedTuple, Optional, Sequence
+
+# strict=False accepts raw control characters (e.g. newlines) inside strings
+_decoder = json.JSONDecoder(strict=False)
+
+
+class ParsedJSON(NamedTuple):
+    """A JSON value found in a response."""
+
+    value: Any
+    # True if the response contained nothing but the JSON value
+    clean: bool
+
+
+def find_json(
+    text: str, kind: type = dict, required_keys: Sequence[str] = ()
+) -> Optional[ParsedJSON]:
+    """
+    Finds the first JSON value of type ``kind`` in ``text``.
+
+    Args:
+        text: The raw model response.
+        kind: ``dict`` or ``list``.
+        required_keys: For objects, keys the value must contain; objects
+            missing any of them are skipped.
+
+    Returns:
+        The decoded value, or None if the response contains no such value.
+    """
+    opening = "{" if kind is dict else "["
+    content_start = len(text) - len(text.lstrip())
+    content_end = len(text.rstrip())
+
+    index = text.find(opening)
+    while index != -1:
+        try:
+            value, end = _decoder.raw_decode(text, index)
+        except json.JSONDecodeError:
+            value, end = None, index
+        if isinstance(value, kind) and all(key in value for key in required_keys):
+            return ParsedJSON(value, index == content_start and end == content_end)
+        index = text.find(opening, index + 1)
+    return None
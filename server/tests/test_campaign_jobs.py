@@ -0,0 +1,60 @@
+"""Tests for persisted outreach campaigns."""
+
+import io
+
+import pytest
+
+pytest.importorskip("langchain_google_genai")
+
+from campaign_jobs import CampaignManager, CampaignStore  # noqa: E402
+from outreach_service import Contact, OutreachService  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CampaignStore(str(tmp_path / "campaigns.sqlite"))
+    store.create(
+        "campaign", [Contact("Ada Lovelace", "ada@example.com", "Engineer")],
+        ["participant"],
+    )
+    return store
+
+
+@pytest.mark.parametrize(
+    "status, error", [("completed", None), ("failed", "SMTP server unreachable")]
+)
+def test_cancel_leaves_a_finished_campaign_untouched(store, status, error):
+    store.set_status("campaign", status, error=error)
+
+    assert CampaignManager(service=None, store=store).cancel("campaign") is False
+
+    campaign = store.get_campaign("campaign")
+    assert (campaign["status"], campaign["error"]) == (status, error)
+
+
+class ParsingService:
+    """The CSV side of OutreachService, without a model client."""
+
+    iter_contacts = OutreachService.iter_contacts
+
+    def classify_batch(self, batch):
+        return ["participant"] * len(batch)
+
+
+def test_repeated_email_is_reported_as_a_row_error(tmp_path):
+    store = CampaignStore(str(tmp_path / "campaigns.sqlite"))
+    manager = CampaignManager(ParsingService(), store)
+    csv = (
+        "name,email,role\n"
+        "Ada Lovelace,ada@example.com,Engineer\n"
+        "Grace Hopper,grace@example.com,Admiral\n"
+        "Ada L.,ada@example.com,Engineer\n"
+    )
+    manager._load_contacts("campaign", io.BytesIO(csv.encode()))
+
+    campaign = store.get_campaign("campaign")
+    assert campaign["summary"]["total_contacts"] == 2
+    assert campaign["summary"]["invalid_rows"] == 1
+    assert campaign["row_errors"] == [
+        {"line": 4, "error": "Duplicate email 'ada@example.com' (first on line 2)"}
+    ]
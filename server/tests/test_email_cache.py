@@ -0,0 +1,79 @@
+"""Tests of draft templatizing and the email draft cache."""
+
+import pytest
+
+from email_cache import EmailDraftCache, mentions_name, personalize, templatize
+
+
+def draft(subject: str, body: str):
+    return {"subject": subject, "body": body}
+
+
+def test_honorific_and_every_name_part_are_replaced():
+    template = templatize(draft("Hi Jane", "Dear Dr. Doe, hi Jane."), "Dr. Jane Doe")
+
+    assert not mentions_name(template, "Dr. Jane Doe")
+    assert personalize(template, "Bob Lee") == draft(
+        "Hi Bob", "Dear Bob Lee, hi Bob."
+    )
+
+
+def test_full_name_with_middle_initial_and_possessive():
+    template = templatize(
+        draft("For Jane Q. Doe", "JANE, Jane's team and Ms. Doe."), "Jane Q. Doe"
+    )
+
+    assert personalize(template, "Bob Lee") == draft(
+        "For Bob Lee", "Bob, Bob's team and Bob Lee."
+    )
+
+
+def test_last_name_alone_uses_the_recipients_last_name():
+    template = templatize(draft("Team Doe", "Welcome to team Doe."), "Jane Doe")
+
+    assert personalize(template, "Bob Lee")["body"] == "Welcome to team Lee."
+
+
+@pytest.mark.parametrize(
+    "name, body",
+    [
+        ("Alexander Smith", "Dear Alex Smith,"),
+        ("Jane Mary Doe", "Mary, we saved you a seat."),
+        ("Theodore Nott", "Theo, we saved you a seat."),
+    ],
+)
+def test_nicknames_and_unplaced_name_parts_are_detected(name, body):
+    template = templatize(draft("Invitation", body), name)
+
+    assert mentions_name(template, name)
+
+
+@pytest.mark.parametrize("name", ["Theodore Nott", "Theresa May", "Alice Liddell"])
+def test_sentence_starts_and_short_words_are_not_nicknames(name):
+    body = "The workshop starts at noon. There is parking nearby.\nAll the best,"
+    template = templatize(draft("The schedule for Al's Diner", body), name)
+
+    assert not mentions_name(template, name)
+
+
+def test_put_refuses_drafts_that_still_name_the_recipient(tmp_path):
+    cache = EmailDraftCache(str(tmp_path / "drafts.sqlite"))
+    name = "Alexander Smith"
+
+    stored = cache.put("key", templatize(draft("Hi", "Dear Alex,"), name), name)
+
+    assert not stored
+    assert cache.get("key") is None
+    assert cache.stats()["rejected"] == 1
+
+
+def test_cache_stays_within_max_entries(tmp_path):
+    cache = EmailDraftCache(str(tmp_path / "drafts.sqlite"), max_entries=10)
+
+    for i in range(25):
+        assert cache.put(f"key{i}", draft("Hi", "Dear {{recipient_name}},"), "Jane")
+    cache.put("key24", draft("Hi", "Hello {{recipient_name}},"), "Jane")
+
+    (count,) = cache._conn.execute("SELECT COUNT(*) FROM drafts").fetchone()
+    assert count == cache.stats()["entries"] <= 10
+    assert cache.get("key24")["body"] == "Hello {{recipient_name}},"
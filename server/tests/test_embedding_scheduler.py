@@ -0,0 +1,125 @@
+"""Offline tests of EmbeddingScheduler, using the deterministic HashEmbeddings backend."""
+
+import pytest
+
+import helper.embeddings as embeddings
+from helper.embedding_cache import CachedEmbeddings, EmbeddingCache, text_hash
+from helper.embeddings import EmbeddingScheduler, HashEmbeddings
+
+DIMENSIONS = 8
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Four characters per token, so batch sizes do not depend on tiktoken
+    monkeypatch.setattr(embeddings, "count_tokens", embeddings._count_tokens_estimate)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(embeddings.time, "sleep", delays.append)
+    return delays
+
+
+class RecordingEmbeddings(HashEmbeddings):
+    """HashEmbeddings that records every request and can fail on demand."""
+
+    def __init__(self, failures: int = 0, fail_on: str = None):
+        super().__init__(DIMENSIONS)
+        self.failures = failures
+        self.fail_on = fail_on
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("rate limited")
+        if self.fail_on in texts:
+            raise ConnectionError("bad batch")
+        return super().embed_documents(texts)
+
+
+def test_batches_respect_token_budget_and_size():
+    scheduler = EmbeddingScheduler(max_batch_tokens=10, max_batch_size=3)
+    # 4, 4, 4, 1, 1, 1, 1 and 20 tokens
+    texts = ["a" * 16] * 3 + ["b" * 4] * 4 + ["c" * 80]
+    items = {str(i): text for i, text in enumerate(texts)}
+
+    batches = scheduler.make_batches(items)
+
+    assert [[key for key, _, _ in batch] for batch in batches] == [
+        ["0", "1"],
+        ["2", "3", "4"],
+        ["5", "6"],
+        ["7"],
+    ]
+    for batch in batches[:-1]:
+        assert sum(tokens for _, _, tokens in batch) <= 10
+        assert len(batch) <= 3
+    # A text over the budget on its own still gets a batch of its own
+    assert batches[-1][0][2] == 20
+
+
+def test_run_embeds_every_item_once():
+    scheduler = EmbeddingScheduler(max_batch_tokens=8, max_concurrency=3)
+    backend = RecordingEmbeddings()
+    items = {f"k{i}": f"chunk number {i}" for i in range(20)}
+
+    results = scheduler.run(items, embed_fn=backend.embed_documents)
+
+    expected = HashEmbeddings(DIMENSIONS)
+    assert results == {key: expected.embed_query(text) for key, text in items.items()}
+    embedded = [text for request in backend.requests for text in request]
+    assert sorted(embedded) == sorted(items.values())
+    assert len(backend.requests) > 1
+
+
+def test_failed_batch_is_retried_with_exponential_backoff(sleeps):
+    scheduler = EmbeddingScheduler(max_retries=3, base_delay=1.0)
+    backend = RecordingEmbeddings(failures=2)
+
+    results = scheduler.run(
+        {"a": "hello", "b": "world"}, embed_fn=backend.embed_documents
+    )
+
+    assert results["a"] == HashEmbeddings(DIMENSIONS).embed_query("hello")
+    assert len(backend.requests) == 3
+    assert len(sleeps) == 2
+    # base_delay * 2**attempt, with up to 100% jitter
+    assert 1.0 <= sleeps[0] <= 2.0
+    assert 2.0 <= sleeps[1] <= 4.0
+
+
+def test_error_is_raised_once_retries_are_exhausted(sleeps):
+    scheduler = EmbeddingScheduler(max_retries=2, base_delay=0.5)
+    backend = RecordingEmbeddings(failures=10)
+
+    with pytest.raises(ConnectionError):
+        scheduler.run({"a": "hello"}, embed_fn=backend.embed_documents)
+
+    assert len(backend.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_interrupted_run_resumes_from_cached_batches(tmp_path, sleeps):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    scheduler = EmbeddingScheduler(max_batch_size=2, max_concurrency=1, max_retries=0)
+    texts = [f"chunk {i}" for i in range(6)]
+
+    # The batch holding "chunk 3" fails; the other batches are checkpointed
+    failing = RecordingEmbeddings(fail_on="chunk 3")
+    with pytest.raises(ConnectionError):
+        CachedEmbeddings(failing, cache, "hash", scheduler).embed_documents(texts)
+    cached = cache.get_many("hash", [text_hash(text) for text in texts])
+    assert len(cached) == 4
+
+    backend = RecordingEmbeddings()
+    vectors = CachedEmbeddings(backend, cache, "hash", scheduler).embed_documents(texts)
+
+    assert backend.requests == [["chunk 2", "chunk 3"]]
+    # The cache stores float32
+    expected = HashEmbeddings(DIMENSIONS).embed_documents(texts)
+    assert vectors == [pytest.approx(vector, rel=1e-6) for vector in expected]
@@ -0,0 +1,48 @@
+"""Tests for the pipelined campaign runner."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from outreach_pipeline import CampaignPipeline
+
+
+class FakeService:
+    def classify_contact(self, contact):
+        return "participant"
+
+    async def agenerate_personalized_email(self, contact, contact_type, cache_stats):
+        return {"subject": "Hi", "body": f"Hello {contact.name}"}
+
+    async def asend_email(self, contact, contact_type, email_data):
+        return {"success": True, "email": contact.email}
+
+
+def contacts(count: int):
+    return [
+        SimpleNamespace(name=f"Contact {i}", email=f"c{i}@example.com")
+        for i in range(count)
+    ]
+
+
+def test_run_sends_every_contact_in_order():
+    pipeline = CampaignPipeline(FakeService(), 2, 2, queue_size=2)
+    result = asyncio.run(pipeline.run(contacts(10)))
+
+    assert result["summary"]["emails_sent"] == 10
+    assert [r["result"]["email"] for r in result["results"]] == [
+        f"c{i}@example.com" for i in range(10)
+    ]
+
+
+def test_raising_on_sent_fails_the_run_instead_of_hanging():
+    def fail(*args):
+        raise RuntimeError("database is locked")
+
+    # More contacts than the queues hold, so the feeder would block on put()
+    pipeline = CampaignPipeline(FakeService(), 2, 2, queue_size=2)
+    run = pipeline.run(contacts(50), on_sent=fail)
+
+    with pytest.raises(RuntimeError, match="database is locked"):
+        asyncio.run(asyncio.wait_for(run, timeout=5))
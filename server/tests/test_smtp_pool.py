@@ -0,0 +1,155 @@
+"""Tests of SMTPConnectionPool against a local stand-in SMTP server."""
+
+import socketserver
+import threading
+from email.message import EmailMessage
+
+import pytest
+
+from smtp_pool import SMTPConnectionPool
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Minimal SMTP server that records delivered messages.
+
+    ``drop_on`` makes it hang up on the next matching event of any
+    connection: "MAIL" before replying to MAIL FROM, or "DATA_END" after it
+    stored a message but before acknowledging it.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.drop_on = None
+        self.lock = threading.Lock()
+
+    def should_drop(self, event: str) -> bool:
+        with self.lock:
+            if self.drop_on == event:
+                self.drop_on = None
+                return True
+            return False
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline().decode().rstrip("\r\n")
+            if not line:
+                return
+            command = line.split(" ", 1)[0].upper()
+            if command == "EHLO":
+                self.reply("250-stand-in")
+                self.reply("250 8BITMIME")
+            elif command == "MAIL":
+                if server.should_drop("MAIL"):
+                    return
+                self.reply("250 OK")
+            elif command in ("RCPT", "NOOP", "RSET"):
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data = self.rfile.readline().decode()
+                    if data in (".\r\n", ""):
+                        break
+                    body.append(data)
+                with server.lock:
+                    server.messages.append("".join(body))
+                if server.should_drop("DATA_END"):
+                    return
+                self.reply("250 OK queued")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_pool(server, **kwargs) -> SMTPConnectionPool:
+    host, port = server.server_address
+    return SMTPConnectionPool(host, port, use_tls=False, timeout=5, **kwargs)
+
+
+def make_message(subject: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "organizer@example.com"
+    msg["To"] = "hacker@example.com"
+    msg["Subject"] = subject
+    msg.set_content("See you at the hackathon.")
+    return msg
+
+
+def test_connection_is_reused_across_messages(smtp_server):
+    pool = make_pool(smtp_server)
+
+    for i in range(5):
+        pool.send_message(make_message(f"message {i}"))
+    pool.close()
+
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections == 1
+    assert pool.stats()["messages_sent"] == 5
+
+
+def test_connection_is_retired_after_message_limit(smtp_server):
+    pool = make_pool(smtp_server, max_messages_per_connection=2)
+
+    for i in range(5):
+        pool.send_message(make_message(f"message {i}"))
+
+    assert len(smtp_server.messages) == 5
+    assert smtp_server.connections == 3
+    assert pool.stats()["connections_retired"] == 2
+
+
+def test_disconnect_before_data_is_resent_once(smtp_server):
+    pool = make_pool(smtp_server)
+    pool.send_message(make_message("first"))
+
+    smtp_server.drop_on = "MAIL"
+    pool.send_message(make_message("second"))
+
+    assert [m.count("Subject: second") for m in smtp_server.messages] == [0, 1]
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_disconnect_after_data_is_not_resent(smtp_server):
+    pool = make_pool(smtp_server)
+    pool.send_message(make_message("first"))
+
+    # The server stores the message, then hangs up instead of acknowledging
+    smtp_server.drop_on = "DATA_END"
+    with pytest.raises(OSError):
+        pool.send_message(make_message("second"))
+
+    assert sum("Subject: second" in m for m in smtp_server.messages) == 1
+    assert pool.stats()["reconnects"] == 0
+
+    # The broken connection was discarded; the next message opens a new one
+    pool.send_message(make_message("third"))
+    assert len(smtp_server.messages) == 3
+    assert smtp_server.connections == 2